@@ -0,0 +1,240 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Ограничение одновременных обращений к PouchDB (переопределяется переменными окружения)
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "50"))
+DEFAULT_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "500"))
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+DEFAULT_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Приоритеты обращений: чем меньше число, тем раньше обращение получает слот
+PRIORITY_READ = 0
+PRIORITY_WRITE = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {PRIORITY_READ: "read", PRIORITY_WRITE: "write", PRIORITY_BULK: "bulk"}
+
+# Наблюдатель ожидания в очереди: (приоритет, время ожидания в сек)
+WaitObserver = Callable[[str, float], None]
+
+
+class RequestAdmission:
+    """
+    Допуск одного HTTP-запроса к базе.
+
+    Перегрузка может отклонить только первое обращение запроса (или
+    проверку admit перед потоковым ответом): после допуска запрос уже
+    мог что-то записать или начать отдавать ответ, поэтому его
+    следующие обращения ждут слот без ограничения очереди и времени.
+    """
+
+    def __init__(self, priority: int, admitted: bool = False):
+        self.priority = priority
+        self.admitted = admitted
+
+
+# Допуск текущего запроса; вне HTTP-запросов (лента изменений, подготовка
+# базы) обращения не ограничиваются
+_current_request: ContextVar[Optional[RequestAdmission]] = ContextVar("admission", default=None)
+
+
+def current_request() -> Optional[RequestAdmission]:
+    return _current_request.get()
+
+
+@contextmanager
+def admission_scope(priority: int, admitted: bool = False):
+    """Обращения внутри блока выполняются с заданным приоритетом"""
+    token = _current_request.set(RequestAdmission(priority, admitted))
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+class Overloaded(Exception):
+    """Обращение к базе отклонено: очередь переполнена или ожидание слишком долгое"""
+
+    def __init__(self, message: str, retry_after: int = DEFAULT_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Ограничение числа одновременных обращений к PouchDB.
+
+    Не больше max_concurrency обращений выполняются одновременно, остальные
+    ждут в очереди. Освободившийся слот получает сначала обращение уже
+    допущенного запроса, затем ожидающий с наименьшим приоритетом (чтения
+    раньше записей, записи раньше пакетного импорта), при равных
+    приоритетах - пришедший раньше.
+
+    Первое обращение запроса ждет не дольше queue_timeout секунд. Если
+    очередь таких обращений заполнена, новое вытесняет ожидающее с худшим
+    приоритетом, а если такого нет - сразу отклоняется. Отклоненное
+    обращение завершается исключением Overloaded, которое превращается в
+    ответ 503 с заголовком Retry-After, вместо ожидания до таймаута.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+        retry_after: int = DEFAULT_RETRY_AFTER,
+        observer: Optional[WaitObserver] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.observer = observer
+        self.active = 0
+        # Куча ожидающих: [0 для допущенных запросов и 1 для новых, приоритет,
+        # порядковый номер, future]
+        self._waiters: List[list] = []
+        self._order = itertools.count()
+        # Число ожидающих обращений, которые можно отклонить
+        self._sheddable = 0
+        # Число отклоненных обращений по приоритетам
+        self.rejected: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Число ожидающих обращений по приоритетам"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for _, priority, _, _ in self._waiters:
+            depth[PRIORITY_NAMES[priority]] += 1
+        return depth
+
+    async def admit(self):
+        """
+        Допустить текущий запрос, не занимая слот (например, перед
+        потоковым ответом, первое обращение которого произойдет уже после
+        отправки заголовков); при перегрузке - Overloaded
+        """
+        request = current_request()
+        if request is None or request.admitted:
+            return
+        await self.acquire(request.priority)
+        self.release()
+        request.admitted = True
+
+    async def acquire(self, priority: int, sheddable: bool = True):
+        """
+        Дождаться свободного слота.
+
+        Args:
+            priority: Приоритет обращения
+            sheddable: Можно ли отклонить обращение при перегрузке
+                (Overloaded); обращения допущенных запросов ждут слот
+                без ограничения очереди и времени
+        """
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self._observe(priority, 0.0)
+            return
+        if sheddable and self._sheddable >= self.max_queue and not self._shed(priority):
+            raise self._reject(priority, "очередь обращений к базе данных заполнена")
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        entry = [int(sheddable), priority, next(self._order), future]
+        heapq.heappush(self._waiters, entry)
+        self._sheddable += entry[0]
+        try:
+            if sheddable:
+                await asyncio.wait_for(future, self.queue_timeout)
+            else:
+                await future
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            raise self._reject(priority, "превышено время ожидания обращения к базе данных")
+        except BaseException:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Слот уже передан этому обращению, но оно отменено
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+        self._observe(priority, time.perf_counter() - started)
+
+    def release(self):
+        """Освободить слот и передать его следующему ожидающему"""
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            self._sheddable -= entry[0]
+            future = entry[3]
+            if not future.done():
+                # Слот переходит к ожидающему, число активных не меняется
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _shed(self, priority: int) -> bool:
+        """Вытеснить из заполненной очереди ожидающего с худшим приоритетом"""
+        candidates = [entry for entry in self._waiters if entry[0]]
+        if not candidates:
+            return False
+        worst = max(candidates, key=lambda entry: (entry[1], entry[2]))
+        if worst[1] <= priority:
+            return False
+        self._remove(worst)
+        worst[3].set_exception(self._reject(worst[1], "обращение вытеснено более приоритетным"))
+        return True
+
+    def _remove(self, entry: list):
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            self._sheddable -= entry[0]
+
+    def _reject(self, priority: int, reason: str) -> Overloaded:
+        self.rejected[PRIORITY_NAMES[priority]] += 1
+        return Overloaded(f"Сервис перегружен: {reason}", self.retry_after)
+
+    def _observe(self, priority: int, waited: float):
+        if self.observer is not None:
+            self.observer(PRIORITY_NAMES[priority], waited)
+
+
+def default_priority(scope: Scope) -> int:
+    """Чтения (GET, HEAD) обслуживаются раньше изменений"""
+    return PRIORITY_READ if scope["method"] in ("GET", "HEAD") else PRIORITY_WRITE
+
+
+class AdmissionMiddleware:
+    """
+    Допуск к базе для каждого HTTP-запроса.
+
+    Запрос, начавший отдавать ответ, считается допущенным: отказ в
+    середине тела ответа превратился бы в обрезанный ответ с кодом 200.
+    """
+
+    def __init__(self, app: ASGIApp, classify: Callable[[Scope], int] = default_priority):
+        self.app = app
+        self.classify = classify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestAdmission(self.classify(scope))
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                request.admitted = True
+            await send(message)
+
+        token = _current_request.set(request)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
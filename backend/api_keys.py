@@ -0,0 +1,69 @@
+import hashlib
+import hmac
+import secrets
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Схема заголовка Authorization для ключей API: "ApiKey <ключ>"
+API_KEY_SCHEME = "ApiKey"
+
+# Ключ имеет вид sk_<идентификатор>.<секрет>; идентификатор открыт и
+# служит _id документа, а секрет хранится только в виде HMAC
+API_KEY_PREFIX = "sk_"
+
+
+def api_key_id(key_id: str) -> str:
+    return f"apikey:{key_id}"
+
+
+def hash_secret(secret: str, hmac_key: str) -> str:
+    """HMAC-SHA256 секрета ключа; в отличие от bcrypt вычисляется за микросекунды"""
+    return hmac.new(hmac_key.encode("utf-8"), secret.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def generate_api_key(username: str, name: str, hmac_key: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Новый ключ API и документ для базы users.
+
+    Returns:
+        tuple: (ключ, который показывается пользователю один раз, документ ключа)
+    """
+    key_id = secrets.token_hex(8)
+    secret = secrets.token_urlsafe(32)
+    doc = {
+        "_id": api_key_id(key_id),
+        "type": "apikey",
+        "username": username,
+        "name": name,
+        "key_hash": hash_secret(secret, hmac_key),
+        "created_at": datetime.utcnow().isoformat(),
+        "revoked": False,
+    }
+    return f"{API_KEY_PREFIX}{key_id}.{secret}", doc
+
+
+def parse_api_key(key: str) -> Optional[Tuple[str, str]]:
+    """Идентификатор и секрет ключа или None, если ключ имеет неверный формат"""
+    if not key.startswith(API_KEY_PREFIX):
+        return None
+    key_id, _, secret = key[len(API_KEY_PREFIX):].partition(".")
+    if not key_id or not secret:
+        return None
+    return key_id, secret
+
+
+def verify_api_key(doc: Dict[str, Any], secret: str, hmac_key: str) -> bool:
+    """Действителен ли ключ: не отозван и секрет совпадает (сравнение за постоянное время)"""
+    if doc.get("type") != "apikey" or doc.get("revoked"):
+        return False
+    return hmac.compare_digest(doc.get("key_hash", ""), hash_secret(secret, hmac_key))
+
+
+def public_key_info(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Сведения о ключе без хэша секрета"""
+    return {
+        "id": doc["_id"][len("apikey:"):],
+        "name": doc.get("name"),
+        "created_at": doc.get("created_at"),
+        "revoked": doc.get("revoked", False),
+    }
@@ -0,0 +1,114 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ExpiringCache:
+    """
+    LRU-кэш ограниченного размера, записи которого истекают по времени.
+
+    Используется для данных аутентификации: записей пользователей,
+    ключей API и разобранных JWT. Срок жизни задается для
+    каждой записи отдельно во времени часов clock.
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Номер версии меняется при каждой инвалидации, чтобы результат
+        # чтения, начатого до изменения, не попал в кэш после него
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if self.clock() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, expires_at: float, version: Optional[int] = None):
+        """
+        Сохранить значение до момента expires_at.
+
+        Если передан version и с тех пор кэш инвалидировался, значение
+        могло устареть и не сохраняется.
+        """
+        if self.max_entries <= 0 or (version is not None and version != self.version):
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self.version += 1
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self.version += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class UserCache(ExpiringCache):
+    """
+    Кэш документов базы users: пользователей по username или ключей API
+    по идентификатору ключа (в зависимости от prefix).
+
+    Как и кэш зон, отвечает на чтения только пока лента _changes базы
+    users работает: изменение документа (например, отключение пользователя
+    или отзыв ключа) сбрасывает его запись. TTL ограничивает время жизни
+    записи на случай задержки ленты.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, prefix: str = "user:"):
+        super().__init__(max_entries)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.active = False
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.active:
+            return None
+        return super().get(key)
+
+    def remember(self, key: Hashable, value: Any, version: int):
+        if self.active:
+            self.put(key, value, self.clock() + self.ttl, version)
+
+    def apply_change(self, change: Dict[str, Any]):
+        """Сбросить запись, документ которой изменился"""
+        doc_id = change.get("id", "")
+        if doc_id.startswith(self.prefix):
+            self.invalidate(doc_id[len(self.prefix):])
+
+    async def activate(self):
+        """Включить кэш после (пере)подключения к ленте изменений"""
+        self.clear()
+        self.active = True
+
+    def deactivate(self):
+        self.active = False
+        self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(super().stats(), active=self.active, ttl=self.ttl)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Настройки
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+USERNAME = "admin"
+PASSWORD = "admin"
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def latency_summary(name, latencies):
+    """Строка со статистикой задержек в миллисекундах"""
+    ms = [value * 1000 for value in latencies]
+    return (
+        f"{name}: запросов {len(ms)}, "
+        f"p50 {percentile(ms, 0.5):.1f} мс, p95 {percentile(ms, 0.95):.1f} мс, "
+        f"среднее {statistics.mean(ms) if ms else 0.0:.1f} мс"
+    )
+
+async def login(client, username, password):
+    started = time.perf_counter()
+    response = await client.post("/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return time.perf_counter() - started, response.json()["access_token"]
+
+async def read_zones(client, token, stop, latencies):
+    """Чтение первой страницы зон, пока не выставлен stop"""
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/zones/", params={"limit": 1}, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+async def measure_reads(client, token, duration):
+    """Задержки чтения зон без нагрузки на /token"""
+    stop = asyncio.Event()
+    latencies = []
+    reader = asyncio.create_task(read_zones(client, token, stop, latencies))
+    await asyncio.sleep(duration)
+    stop.set()
+    await reader
+    return latencies
+
+async def benchmark(logins, concurrency, username, password):
+    """
+    Пропускная способность /token и задержки чтения зон во время
+    одновременных входов.
+
+    Если проверка пароля блокирует цикл событий, задержки чтения зон под
+    нагрузкой вырастают до времени работы bcrypt.
+    """
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=API_URL, limits=limits, timeout=120) as client:
+        _, token = await login(client, username, password)
+        idle_reads = await measure_reads(client, token, duration=1.0)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies = []
+
+        async def limited_login():
+            async with semaphore:
+                latency, _ = await login(client, username, password)
+                login_latencies.append(latency)
+
+        stop = asyncio.Event()
+        busy_reads = []
+        reader = asyncio.create_task(read_zones(client, token, stop, busy_reads))
+        started = time.perf_counter()
+        await asyncio.gather(*(limited_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await reader
+
+    print(f"Входов: {logins}, одновременно: {concurrency}, время: {elapsed:.2f} с")
+    print(f"Пропускная способность: {logins / elapsed:.1f} входов/с")
+    print(latency_summary("Вход", login_latencies))
+    print(latency_summary("Чтение зон без нагрузки", idle_reads))
+    print(latency_summary("Чтение зон во время входов", busy_reads))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест входа через /token")
+    parser.add_argument("--logins", type=int, default=200, help="Общее число входов")
+    parser.add_argument("--concurrency", type=int, default=20, help="Число одновременных входов")
+    parser.add_argument("--username", default=USERNAME, help="Имя пользователя")
+    parser.add_argument("--password", default=PASSWORD, help="Пароль")
+    args = parser.parse_args()
+
+    print(f"Нагрузочный тест входа: {API_URL}")
+    asyncio.run(benchmark(args.logins, args.concurrency, args.username, args.password))
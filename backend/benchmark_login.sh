@@ -0,0 +1,11 @@
+#!/bin/bash
+
+# Активация виртуального окружения
+source venv/bin/activate
+
+# Запуск нагрузочного теста входа (бэкенд должен быть запущен)
+echo "Запуск нагрузочного теста входа..."
+python benchmark_login.py "$@"
+
+# Деактивация виртуального окружения
+deactivate
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Настройки повторов при подготовке базы данных (0 попыток - без ограничения)
+DEFAULT_BOOTSTRAP_ATTEMPTS = 0
+DEFAULT_BOOTSTRAP_INITIAL_DELAY = 0.5
+DEFAULT_BOOTSTRAP_MAX_DELAY = 10.0
+
+
+class StartupTimer:
+    """
+    Замеры времени запуска бэкенда по шагам.
+
+    Время отсчитывается от started_at (обычно начала импорта main.py),
+    поэтому отчет показывает и время импорта, и время каждого шага
+    подготовки, и момент готовности к работе.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.steps: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+
+    def mark(self, name: str):
+        """Запомнить время от начала запуска до текущего момента"""
+        self.steps[name] = time.perf_counter() - self.started_at
+
+    @contextmanager
+    def step(self, name: str):
+        """Замерить длительность шага"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = time.perf_counter() - started
+
+    def ready(self):
+        self.ready_at = time.perf_counter() - self.started_at
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready_at is not None,
+            "ready_after": self.ready_at,
+            "steps": dict(self.steps),
+        }
+
+    def summary(self) -> str:
+        steps = ", ".join(f"{name} {duration * 1000:.0f} мс" for name, duration in self.steps.items())
+        total = f"{self.ready_at * 1000:.0f} мс" if self.ready_at is not None else "не завершен"
+        return f"Запуск: {total} ({steps})"
+
+
+async def retry_with_backoff(
+    func: Callable[[], Awaitable[Any]],
+    attempts: int = DEFAULT_BOOTSTRAP_ATTEMPTS,
+    initial_delay: float = DEFAULT_BOOTSTRAP_INITIAL_DELAY,
+    max_delay: float = DEFAULT_BOOTSTRAP_MAX_DELAY,
+    description: str = "операция",
+) -> Any:
+    """
+    Выполнить корутину, повторяя ее при ошибке с экспоненциальной паузой.
+
+    Нужна при запуске, когда PouchDB может быть еще недоступен. Если
+    attempts больше нуля, после последней неудачной попытки исключение
+    пробрасывается, иначе попытки продолжаются, пока не будут успешны
+    (пауза не превышает max_delay).
+    """
+    delay = initial_delay
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if 0 < attempts <= attempt:
+                raise
+            of_total = f" из {attempts}" if attempts > 0 else ""
+            print(f"{description}: ошибка ({str(e)}), попытка {attempt}{of_total}, повтор через {delay:.1f} с")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
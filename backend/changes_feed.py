@@ -0,0 +1,98 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pouchdb_client import PouchDBClient
+
+# Настройки ленты изменений (переопределяются переменными окружения)
+DEFAULT_CHANGES_TIMEOUT = float(os.getenv("CHANGES_FEED_TIMEOUT", "30"))
+DEFAULT_CHANGES_RETRY_DELAY = float(os.getenv("CHANGES_FEED_RETRY_DELAY", "1"))
+
+
+class ChangesFollower:
+    """
+    Фоновая задача, следящая за лентой _changes базы PouchDB.
+
+    При запуске (и после каждой ошибки) запоминает текущий update_seq базы
+    и вызывает on_reset, чтобы подписчик загрузил полный снимок данных.
+    Затем в режиме longpoll читает изменения начиная с этого номера и
+    передает каждое из них в on_change. При ошибке чтения вызывается
+    on_error, а после паузы лента перезапускается со снимка.
+    """
+
+    def __init__(
+        self,
+        client: PouchDBClient,
+        db_name: str,
+        on_change: Callable[[Dict[str, Any]], None],
+        on_reset: Optional[Callable[[], Awaitable[None]]] = None,
+        on_error: Optional[Callable[[], None]] = None,
+        timeout: float = DEFAULT_CHANGES_TIMEOUT,
+        retry_delay: float = DEFAULT_CHANGES_RETRY_DELAY,
+    ):
+        """
+        Инициализация ленты изменений.
+
+        Args:
+            client: Клиент PouchDB
+            db_name: Имя базы данных
+            on_change: Обработчик одной записи ленты изменений
+            on_reset: Корутина загрузки полного снимка данных
+            on_error: Обработчик потери ленты изменений
+            timeout: Время ожидания изменений в одном запросе longpoll (сек)
+            retry_delay: Пауза перед повторным подключением (сек)
+        """
+        self.client = client
+        self.db_name = db_name
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.on_error = on_error
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.since: Any = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sync(self):
+        """Запомнить текущий номер последовательности и загрузить снимок"""
+        info = await self.client.get_db_info(self.db_name)
+        since = info.get("update_seq", 0) if info else 0
+        if self.on_reset is not None:
+            await self.on_reset()
+        self.since = since
+
+    async def _run(self):
+        while True:
+            try:
+                if self.since is None:
+                    await self._sync()
+                result = await self.client.changes(
+                    self.db_name, since=self.since, timeout=self.timeout
+                )
+                for change in result.get("results", []):
+                    self.on_change(change)
+                self.since = result.get("last_seq", self.since)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка чтения ленты изменений {self.db_name}: {str(e)}")
+                self.since = None
+                if self.on_error is not None:
+                    self.on_error()
+                await asyncio.sleep(self.retry_delay)
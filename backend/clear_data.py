@@ -11,9 +11,13 @@ load_dotenv()
 API_URL = "http://localhost:8000"
 USERNAME = "admin"
 PASSWORD = "admin"
+# Ключ API (POST /api-keys); если задан, вход по паролю не выполняется
+API_KEY = os.getenv("API_KEY")
 
 # Функция для получения токена
 def get_token():
+    if API_KEY:
+        return API_KEY
     response = requests.post(
         f"{API_URL}/token",
         data={"username": USERNAME, "password": PASSWORD},
@@ -26,9 +30,14 @@ def get_token():
         print(response.text)
         exit(1)
 
+# Заголовок авторизации для токена или ключа API
+def auth_headers(token):
+    scheme = "ApiKey" if API_KEY else "Bearer"
+    return {"Authorization": f"{scheme} {token}"}
+
 # Функция для получения списка всех зон
 def get_all_zones(token):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     response = requests.get(f"{API_URL}/zones/", headers=headers)
     
     if response.status_code == 200:
@@ -40,7 +49,7 @@ def get_all_zones(token):
 
 # Функция для удаления зоны
 def delete_zone(token, zone_name):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     response = requests.delete(f"{API_URL}/zones/{zone_name}", headers=headers)
     
     if response.status_code == 200:
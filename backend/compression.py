@@ -0,0 +1,209 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard необязателен
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен
+    brotli = None
+
+# Типы содержимого, которые имеет смысл сжимать
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        # wbits=31 - формат gzip с заголовком и контрольной суммой
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # Z_SYNC_FLUSH отдает клиенту все, что уже сжато, не завершая поток
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=min(level, 19)).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, level: int):
+        # Высокие уровни brotli слишком медленны для ответов API
+        self._compressor = brotli.Compressor(quality=min(level, 5))
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+def available_encoders() -> Dict[str, type]:
+    """Доступные алгоритмы сжатия в порядке предпочтения сервера"""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> List[Tuple[str, float]]:
+    """Кодировки из заголовка Accept-Encoding с их весами"""
+    result = []
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        result.append((name, quality))
+    return result
+
+
+def choose_encoding(header: str, encoders: Dict[str, type]) -> Optional[str]:
+    """
+    Кодировка с наибольшим весом из поддерживаемых сервером.
+
+    При равных весах выбирается алгоритм, который сервер предпочитает.
+    """
+    accepted = dict(parse_accept_encoding(header))
+    best, best_quality = None, 0.0
+    for name in encoders:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов по заголовку Accept-Encoding.
+
+    Ответ, целиком умещающийся в одно сообщение, сжимается, только если
+    он не меньше minimum_size. Потоковые ответы (StreamingResponse)
+    сжимаются по частям: каждая часть сразу отправляется клиенту, поэтому
+    постраничная и NDJSON-выдача остаются потоковыми.
+
+    Строгий ETag сжатого ответа заменяется слабым (W/"..."), так как у
+    несжатого ответа тот же ETag.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.encoders = available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encoders)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, self.encoders[encoding], self.level, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoder_class: type, level: int, minimum_size: int):
+        self._send = send
+        self._encoder_class = encoder_class
+        self._level = level
+        self._minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._encoder = None
+        # None - решение о сжатии еще не принято
+        self._compress: Optional[bool] = None
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            if not self._compressible(Headers(raw=message["headers"]), message["status"]):
+                self._compress = False
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self._compress is False:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._compress is None:
+            if not more_body and len(body) < self._minimum_size:
+                self._compress = False
+                await self._send(self._start)
+                await self._send(message)
+                return
+            self._compress = True
+            self._encoder = self._encoder_class(self._level)
+            headers = MutableHeaders(raw=self._start["headers"])
+            headers["Content-Encoding"] = self._encoder.name
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                # Сжатое тело отличается от несжатого побайтно, поэтому
+                # строгий ETag исходного ответа становится слабым
+                headers["ETag"] = "W/" + etag
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                data = self._encoder.finish(body)
+                headers["Content-Length"] = str(len(data))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": data})
+                return
+            await self._send(self._start)
+
+        if more_body:
+            data = self._encoder.compress(body)
+            if data:
+                await self._send({"type": "http.response.body", "body": data, "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": self._encoder.finish(body)})
+
+    @staticmethod
+    def _compressible(headers: Headers, status_code: int) -> bool:
+        if status_code < 200 or status_code in (204, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
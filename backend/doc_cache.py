@@ -0,0 +1,177 @@
+import bisect
+import itertools
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def rev_generation(rev: Optional[str]) -> int:
+    """Номер поколения ревизии PouchDB ("3-abc" -> 3)"""
+    if not rev:
+        return 0
+    try:
+        return int(rev.split("-", 1)[0])
+    except ValueError:
+        return 0
+
+
+class DocumentCache:
+    """
+    Кэш декодированных документов PouchDB в памяти процесса.
+
+    Документы хранятся по _id вместе с ревизией и ограничены бюджетом памяти:
+    при превышении бюджета вытесняются давно не читавшиеся документы (LRU).
+    Кэш отвечает на чтения только пока он активен, то есть пока фоновая
+    задача следит за лентой _changes и поддерживает его в актуальном
+    состоянии. Документы, возвращаемые кэшем, нельзя изменять.
+
+    Кроме порядка LRU кэш хранит отсортированный список _id, поэтому
+    выборка по префиксу стоит O(log n + k), а не сортировку всего кэша.
+    """
+
+    def __init__(self, max_bytes: int, prefixes: Iterable[str] = ()):
+        """
+        Инициализация кэша.
+
+        Args:
+            max_bytes: Бюджет памяти (оценка по размеру JSON документов)
+            prefixes: Префиксы _id документов, которые хранит кэш
+        """
+        self.max_bytes = max_bytes
+        self.prefixes = tuple(prefixes)
+        self._docs: "OrderedDict[str, Tuple[str, Dict[str, Any], int]]" = OrderedDict()
+        # Идентификаторы документов кэша в порядке _id
+        self._ids: List[str] = []
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Кэш отвечает на чтения только при работающей ленте изменений
+        self.active = False
+        # Все документы с нужными префиксами загружены и ни один не вытеснен
+        self.complete = False
+
+    @property
+    def authoritative(self) -> bool:
+        """Можно ли считать отсутствие документа в кэше отсутствием в базе"""
+        return self.active and self.complete
+
+    def handles(self, doc_id: str) -> bool:
+        return not self.prefixes or doc_id.startswith(self.prefixes)
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Получить документ из кэша или None"""
+        if not self.active:
+            return None
+        entry = self._docs.get(doc_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._docs.move_to_end(doc_id)
+        self.hits += 1
+        return entry[1]
+
+    def scan(self, prefix: str, start: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Документы кэша с заданным префиксом _id, упорядоченные по _id.
+
+        Args:
+            prefix: Префикс _id
+            start: Первый возможный _id (включительно)
+            limit: Максимальное число документов
+        """
+        self.hits += 1
+        position = bisect.bisect_left(self._ids, max(prefix, start) if start else prefix)
+        docs = []
+        for doc_id in itertools.islice(self._ids, position, None):
+            if not doc_id.startswith(prefix) or (limit is not None and len(docs) >= limit):
+                break
+            docs.append(self._docs[doc_id][1])
+        return docs
+
+    def put(self, doc: Dict[str, Any]):
+        """Добавить или обновить документ, если его ревизия новее известной"""
+        doc_id = doc.get("_id")
+        if not self.active or not doc_id or not self.handles(doc_id):
+            return
+        if doc.get("_deleted"):
+            self.invalidate(doc_id)
+            return
+        existing = self._docs.get(doc_id)
+        if existing is not None and rev_generation(existing[0]) > rev_generation(doc.get("_rev")):
+            return
+        self._store(doc)
+
+    def invalidate(self, doc_id: str):
+        entry = self._docs.pop(doc_id, None)
+        if entry is not None:
+            self.size -= entry[2]
+            self._remove_id(doc_id)
+
+    def apply_change(self, change: Dict[str, Any]):
+        """Применить запись из ленты _changes"""
+        if change.get("deleted"):
+            self.invalidate(change["id"])
+        elif "doc" in change:
+            self.put(change["doc"])
+        else:
+            self.invalidate(change["id"])
+
+    def load(self, docs: Iterable[Dict[str, Any]]):
+        """Заполнить кэш полным набором документов и включить его"""
+        self.clear()
+        self.active = True
+        self.complete = True
+        # _all_docs отдает документы по порядку _id, поэтому вставка в
+        # отсортированный список идентификаторов сводится к добавлению в конец
+        for doc in docs:
+            if self.handles(doc["_id"]) and not doc.get("_deleted"):
+                self._store(doc)
+
+    def deactivate(self):
+        """Выключить кэш, например при потере ленты изменений"""
+        self.active = False
+        self.clear()
+
+    def clear(self):
+        self._docs.clear()
+        self._ids.clear()
+        self.size = 0
+        self.complete = False
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "active": self.active,
+            "complete": self.complete,
+            "entries": len(self._docs),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, doc: Dict[str, Any]):
+        doc_id = doc["_id"]
+        doc_size = len(json.dumps(doc, separators=(",", ":")))
+        self.invalidate(doc_id)
+        if doc_size > self.max_bytes:
+            self.complete = False
+            return
+        self._docs[doc_id] = (doc.get("_rev"), doc, doc_size)
+        bisect.insort(self._ids, doc_id)
+        self.size += doc_size
+        while self.size > self.max_bytes:
+            evicted_id, (_, _, evicted_size) = self._docs.popitem(last=False)
+            self._remove_id(evicted_id)
+            self.size -= evicted_size
+            self.evictions += 1
+            # После вытеснения отсутствие документа в кэше ничего не значит
+            self.complete = False
+
+    def _remove_id(self, doc_id: str):
+        position = bisect.bisect_left(self._ids, doc_id)
+        if position < len(self._ids) and self._ids[position] == doc_id:
+            del self._ids[position]
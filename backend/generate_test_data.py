@@ -13,9 +13,13 @@ load_dotenv()
 API_URL = "http://localhost:8000"
 USERNAME = "admin"
 PASSWORD = "admin"
+# Ключ API (POST /api-keys); если задан, вход по паролю не выполняется
+API_KEY = os.getenv("API_KEY")
 
 # Функция для получения токена
 def get_token():
+    if API_KEY:
+        return API_KEY
     response = requests.post(
         f"{API_URL}/token",
         data={"username": USERNAME, "password": PASSWORD},
@@ -28,9 +32,14 @@ def get_token():
         print(response.text)
         exit(1)
 
+# Заголовок авторизации для токена или ключа API
+def auth_headers(token):
+    scheme = "ApiKey" if API_KEY else "Bearer"
+    return {"Authorization": f"{scheme} {token}"}
+
 # Функция для получения списка всех зон
 def get_all_zones(token):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     response = requests.get(f"{API_URL}/zones/", headers=headers)
     
     if response.status_code == 200:
@@ -50,7 +59,7 @@ def zone_exists(token, zone_name):
 
 # Функция для создания зоны
 def create_zone(token, name):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     data = {"name": name, "type": "zone", "environments": []}
     
     # Проверяем, существует ли уже зона
@@ -72,7 +81,7 @@ def create_zone(token, name):
 
 # Функция для получения информации о зоне
 def get_zone(token, zone_name):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     response = requests.get(f"{API_URL}/zones/{zone_name}", headers=headers)
     
     if response.status_code == 200:
@@ -84,7 +93,7 @@ def get_zone(token, zone_name):
 
 # Функция для создания окружения
 def create_environment(token, zone_name, env_name):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     data = {"name": env_name, "servers": []}
     
     # Проверяем, существует ли зона
@@ -117,7 +126,7 @@ def create_environment(token, zone_name, env_name):
 
 # Функция для создания сервера
 def create_server(token, zone_name, env_name, server_data):
-    headers = {"Authorization": f"Bearer {token}"}
+    headers = auth_headers(token)
     
     # Проверяем, существует ли зона и окружение
     zone_data = get_zone(token, zone_name)
@@ -0,0 +1,285 @@
+import codecs
+import json
+import re
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+
+# Формат файла инвентаря: NDJSON (одна зона на строку) или JSON
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+
+# Начало массива зон: {"zones": [ ... или просто [ ...
+_ZONES_ARRAY_START = re.compile(r'\s*(?:\{\s*"zones"\s*:\s*)?\[')
+
+# Максимальный размер одной зоны в теле запроса (символов)
+MAX_ZONE_SIZE = 16 * 1024 * 1024
+
+
+def invalid_body(detail: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Некорректные данные импорта: {detail}")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_zone_size: int = MAX_ZONE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Объекты NDJSON по мере поступления строк.
+
+    Разбивается только новый чанк, а начало незавершенной строки копится
+    в списке частей, поэтому длинная строка не копируется заново с каждым
+    чанком. Строка длиннее max_zone_size байт отклоняется.
+    """
+    pending: List[bytes] = []
+    pending_size = 0
+    line_number = 0
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        for line in lines:
+            if pending:
+                line = b"".join(pending) + line
+                pending = []
+                pending_size = 0
+            line_number += 1
+            if len(line) > max_zone_size:
+                raise invalid_body(f"строка {line_number}: зона слишком велика")
+            if line.strip():
+                yield _parse_line(line, line_number)
+        if rest:
+            pending.append(rest)
+            pending_size += len(rest)
+            if pending_size > max_zone_size:
+                raise invalid_body(f"строка {line_number + 1}: зона слишком велика")
+    line = b"".join(pending)
+    if line.strip():
+        yield _parse_line(line, line_number + 1)
+
+
+def _parse_line(line: bytes, line_number: int) -> Dict[str, Any]:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise invalid_body(f"строка {line_number}: {str(e)}")
+
+
+async def iter_json_zones(chunks: AsyncIterator[bytes], max_zone_size: int = MAX_ZONE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Зоны из JSON вида {"zones": [...]} или [...] без чтения всего тела.
+
+    Элементы массива зон извлекаются по одному, поэтому в памяти
+    одновременно находится не больше одной зоны и одного чанка.
+    """
+    decoder = _Utf8Decoder()
+    scanner = _ZonesArrayScanner(max_zone_size)
+    async for chunk in chunks:
+        for zone in scanner.feed(decoder.decode(chunk)):
+            yield zone
+    decoder.decode(b"", final=True)
+    scanner.close()
+
+
+# Пробелы между элементами массива
+_WHITESPACE = re.compile(r"\s*")
+# Текст до ближайшей скобки вместе с целиком пришедшими строками JSON;
+# останавливается на скобке или на кавычке строки, не дошедшей до конца
+_SKIP_TO_BRACKET = re.compile(r'(?:[^{}\[\]"]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.S)
+# Продолжение строки JSON до закрывающей кавычки
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+# Конец числа, true, false или null
+_SCALAR_END = re.compile(r"[,\]\s]")
+
+
+class _ZonesArrayScanner:
+    """
+    Разбор массива зон, поступающего по частям.
+
+    Каждый символ просматривается один раз: сканер помнит глубину
+    вложенности скобок и находится ли он внутри строки, поэтому конец
+    элемента находится без повторного разбора накопленного текста. Части
+    незавершенного элемента копятся в списке, и элемент декодируется
+    ровно один раз, когда он пришел целиком.
+    """
+
+    def __init__(self, max_zone_size: int):
+        self.max_zone_size = max_zone_size
+        # Текст до начала массива
+        self.head = ""
+        self.in_array = False
+        self.finished = False
+        # После элемента массива ожидается "," или "]"
+        self.after_item = False
+        self.items = 0
+        # Незавершенный элемент: части текста и состояние сканирования
+        self.in_element = False
+        self.parts: List[str] = []
+        self.size = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.scalar = False
+
+    def feed(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Зоны, завершенные очередной частью текста"""
+        if not self.in_array:
+            self.head += text
+            match = _ZONES_ARRAY_START.match(self.head)
+            if match is None:
+                if "[" in self.head or len(self.head) > self.max_zone_size:
+                    raise invalid_body('ожидается {"zones": [...]} или массив зон')
+                return
+            text = self.head[match.end():]
+            self.head = ""
+            self.in_array = True
+        position = 0
+        while position < len(text) and not self.finished:
+            if not self.in_element:
+                position = _WHITESPACE.match(text, position).end()
+                if position == len(text):
+                    break
+                char = text[position]
+                if char == "]" and (self.after_item or self.items == 0):
+                    self.finished = True
+                    break
+                if self.after_item:
+                    if char != ",":
+                        raise invalid_body("ожидается ',' или ']' после зоны")
+                    position += 1
+                    self.after_item = False
+                    continue
+                self._start_element(char)
+            end = self._scan(text, position)
+            if end is None:
+                self._append(text[position:])
+                break
+            self._append(text[position:end])
+            position = end
+            yield self._finish_element()
+
+    def close(self):
+        if not self.in_array:
+            raise invalid_body('ожидается {"zones": [...]} или массив зон')
+        if not self.finished:
+            raise invalid_body("массив зон не завершен или содержит ошибку")
+
+    def _start_element(self, char: str):
+        self.in_element = True
+        self.parts = []
+        self.size = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.scalar = char not in '{["'
+
+    def _append(self, part: str):
+        self.parts.append(part)
+        self.size += len(part)
+        if self.size > self.max_zone_size:
+            raise invalid_body("зона слишком велика")
+
+    def _finish_element(self) -> Dict[str, Any]:
+        text = "".join(self.parts)
+        self.parts = []
+        self.in_element = False
+        self.after_item = True
+        self.items += 1
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            raise invalid_body(f"зона {self.items}: {str(e)}")
+
+    def _scan(self, text: str, position: int) -> Optional[int]:
+        """Позиция сразу после конца текущего элемента или None, если он продолжается"""
+        if self.scalar:
+            match = _SCALAR_END.search(text, position)
+            return match.start() if match else None
+        while True:
+            if self.in_string:
+                if self.escape:
+                    if position >= len(text):
+                        return None
+                    position += 1
+                    self.escape = False
+                position = _STRING_REST.match(text, position).end()
+                if position == len(text):
+                    return None
+                if text[position] == "\\":
+                    # Граница чанка пришлась на экранирование
+                    self.escape = True
+                    return None
+                position += 1
+                self.in_string = False
+                if self.depth == 0:
+                    return position
+                continue
+            if self.depth > 0:
+                position = _SKIP_TO_BRACKET.match(text, position).end()
+            if position == len(text):
+                return None
+            char = text[position]
+            position += 1
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return position
+
+
+class _Utf8Decoder:
+    """Декодирование UTF-8 с учетом символов, разрезанных границей чанка"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            raise invalid_body(str(e))
+
+
+async def dump_json(zones: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Зоны в формате {"zones": [...]}, который понимают импорт и BatchClient"""
+    yield b'{"zones": ['
+    first = True
+    async for zone in zones:
+        prefix = b"\n" if first else b",\n"
+        first = False
+        yield prefix + json.dumps(zone, ensure_ascii=False).encode("utf-8")
+    yield b"\n]}\n"
+
+
+async def dump_ndjson(zones: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Зоны по одной на строку"""
+    async for zone in zones:
+        yield json.dumps(zone, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Сжатие потока в формат gzip без накопления всех данных в памяти"""
+    # wbits=31 - формат gzip с заголовком и контрольной суммой
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def dump_zones(zones: AsyncIterator[Dict[str, Any]], data_format: str) -> AsyncIterator[bytes]:
+    """Зоны в заданном формате"""
+    if data_format == FORMAT_NDJSON:
+        return dump_ndjson(zones)
+    if data_format == FORMAT_JSON:
+        return dump_json(zones)
+    raise HTTPException(status_code=400, detail=f"Неизвестный формат данных: {data_format}")
+
+
+def iter_zones(chunks: AsyncIterator[bytes], data_format: str) -> AsyncIterator[Dict[str, Any]]:
+    """Зоны из тела запроса в заданном формате"""
+    if data_format == FORMAT_NDJSON:
+        return iter_ndjson(chunks)
+    if data_format == FORMAT_JSON:
+        return iter_json_zones(chunks)
+    raise HTTPException(status_code=400, detail=f"Неизвестный формат данных: {data_format}")
@@ -1,20 +1,51 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+import time
+
+# Момент начала импорта: от него отсчитывается время запуска бэкенда
+IMPORT_STARTED_AT = time.perf_counter()
+
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-import requests
 import json
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+from pouchdb_client import PouchDBClient, PouchDBError
+from admission import AdmissionController, AdmissionMiddleware, Overloaded, PRIORITY_BULK, default_priority
+from changes_feed import ChangesFollower
+from zone_store import create_zone_store, encode_cursor, decode_cursor, etag_matches, IMPORT_MERGE
+from inventory_io import iter_zones, dump_zones, gzip_stream, FORMAT_JSON, FORMAT_NDJSON
+from serialization import FastJSONResponse, model_projector
+from compression import CompressionMiddleware
+from auth_cache import ExpiringCache, UserCache
+from api_keys import (
+    API_KEY_SCHEME, api_key_id, generate_api_key, parse_api_key, public_key_info, verify_api_key
+)
+from bootstrap import StartupTimer, retry_with_backoff
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, Registry
+from profiling import ProfilingMiddleware
+from unit_of_work import UnitOfWorkMiddleware
+from single_flight import SingleFlight
+
 # Загрузка переменных окружения
 load_dotenv()
 
-app = FastAPI(title="Сервис управления серверными ресурсами")
+startup_timer = StartupTimer(IMPORT_STARTED_AT)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    yield
+    await shutdown()
+
+app = FastAPI(title="Сервис управления серверными ресурсами", lifespan=lifespan)
 
 # Настройка CORS
 app.add_middleware(
@@ -23,71 +54,209 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
 
+# Карта документов запроса: документ, прочитанный или записанный в запросе,
+# повторно из PouchDB не читается
+UNIT_OF_WORK_ENABLED = os.getenv("UNIT_OF_WORK_ENABLED", "true").lower() == "true"
+UNIT_OF_WORK_MAX_DOCS = int(os.getenv("UNIT_OF_WORK_MAX_DOCS", "1000"))
+if UNIT_OF_WORK_ENABLED:
+    app.add_middleware(UnitOfWorkMiddleware, max_docs=UNIT_OF_WORK_MAX_DOCS)
+
+# Учет обращений к PouchDB в каждом запросе (заголовок Server-Timing)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_FOOTER = os.getenv("PROFILING_FOOTER", "false").lower() == "true"
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, footer=PROFILING_FOOTER)
+
+# Сжатие ответов (gzip, а также zstd и brotli, если установлены)
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE, level=COMPRESSION_LEVEL)
+
+# Метрики в формате Prometheus (GET /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+metrics_registry = Registry()
+http_request_duration = metrics_registry.histogram(
+    "http_request_duration_seconds", "Длительность обработки HTTP-запросов", ("method", "route", "status")
+)
+http_requests_in_progress = metrics_registry.gauge(
+    "http_requests_in_progress", "Число HTTP-запросов, обрабатываемых в данный момент"
+)
+pouchdb_request_duration = metrics_registry.histogram(
+    "pouchdb_request_duration_seconds", "Длительность операций с PouchDB", ("operation", "outcome")
+)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, duration=http_request_duration, in_progress=http_requests_in_progress)
+
+def observe_pouchdb_call(operation: str, outcome: str, duration: float):
+    pouchdb_request_duration.observe(duration, (operation, outcome))
+
 # Настройка подключения к PouchDB
 POUCHDB_URL = os.getenv("POUCHDB_URL", "http://localhost:5984")
 
+# Ограничение одновременных обращений к PouchDB: лишние обращения ждут в
+# очереди, а при ее переполнении запрос сразу получает 503
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+admission_wait = metrics_registry.histogram(
+    "pouchdb_admission_wait_seconds", "Время ожидания обращения к PouchDB в очереди", ("priority",)
+)
+admission = AdmissionController(
+    observer=(lambda priority, waited: admission_wait.observe(waited, (priority,))) if METRICS_ENABLED else None
+)
+
+def request_priority(scope) -> int:
+    """Импорт, экспорт и пакетные операции обслуживаются после остальных запросов"""
+    path = scope["path"]
+    if path in ("/import", "/export") or path.endswith("/_bulk"):
+        return PRIORITY_BULK
+    return default_priority(scope)
+
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, classify=request_priority)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Пул соединений с PouchDB, общий для всех запросов
+db = PouchDBClient(
+    POUCHDB_URL,
+    observer=observe_pouchdb_call if METRICS_ENABLED else None,
+    admission=admission if ADMISSION_ENABLED else None,
+)
+
+# Кэш документов зон, поддерживаемый лентой _changes базы server_resources
+ZONE_CACHE_ENABLED = os.getenv("ZONE_CACHE_ENABLED", "true").lower() == "true"
+ZONE_CACHE_MAX_BYTES = int(os.getenv("ZONE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Схема размещения данных: embedded (зона одним документом) или normalized
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "embedded")
+zone_store = create_zone_store(STORAGE_LAYOUT, db, ZONE_CACHE_MAX_BYTES)
+zone_cache = zone_store.cache
+
+# Постраничная выдача и потоковый режим списка зон
+ZONES_PAGE_MAX_LIMIT = int(os.getenv("ZONES_PAGE_MAX_LIMIT", "1000"))
+ZONES_STREAM_BATCH_SIZE = int(os.getenv("ZONES_STREAM_BATCH_SIZE", "100"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Быстрая выдача зон: документы из базы отдаются без повторной валидации
+# моделью ответа и сериализуются orjson (если установлен)
+FAST_ZONE_RESPONSES = os.getenv("FAST_ZONE_RESPONSES", "true").lower() == "true"
+
+# Максимальное число операций в одном пакетном запросе
+BULK_MAX_OPERATIONS = int(os.getenv("BULK_MAX_OPERATIONS", "1000"))
+
+# Подготовка базы данных при запуске: число попыток (0 - повторять, пока
+# PouchDB не станет доступен) и начальная пауза
+BOOTSTRAP_ATTEMPTS = int(os.getenv("BOOTSTRAP_ATTEMPTS", "0"))
+BOOTSTRAP_RETRY_DELAY = float(os.getenv("BOOTSTRAP_RETRY_DELAY", "0.5"))
+
+# Импорт инвентаря: число зон в одном запросе _bulk_docs
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "100"))
+import_lock = asyncio.Lock()
+import_progress: Dict[str, Any] = {}
+
 # Функции для работы с PouchDB через HTTP API
-def create_db_if_not_exists(db_name):
-    response = requests.put(f"{POUCHDB_URL}/{db_name}")
-    return response.status_code == 201 or response.status_code == 412
-
-def get_doc(db_name, doc_id):
-    response = requests.get(f"{POUCHDB_URL}/{db_name}/{doc_id}")
-    if response.status_code == 200:
-        return response.json()
-    return None
+async def create_db_if_not_exists(db_name):
+    return await db.create_db_if_not_exists(db_name)
 
-def save_doc(db_name, doc):
-    if '_id' in doc:
-        doc_id = doc['_id']
-        existing_doc = get_doc(db_name, doc_id)
-        if existing_doc:
-            doc['_rev'] = existing_doc['_rev']
-            response = requests.put(f"{POUCHDB_URL}/{db_name}/{doc_id}", json=doc)
-        else:
-            response = requests.put(f"{POUCHDB_URL}/{db_name}/{doc_id}", json=doc)
-    else:
-        response = requests.post(f"{POUCHDB_URL}/{db_name}", json=doc)
-    
-    if response.status_code in [201, 200]:
-        return response.json()
-    else:
-        raise Exception(f"Ошибка сохранения документа: {response.text}")
-
-def delete_doc(db_name, doc_id):
-    doc = get_doc(db_name, doc_id)
-    if doc:
-        response = requests.delete(f"{POUCHDB_URL}/{db_name}/{doc_id}?rev={doc['_rev']}")
-        return response.status_code == 200
-    return False
-
-def query_view(db_name, view_name, **params):
-    response = requests.get(f"{POUCHDB_URL}/{db_name}/_design/{view_name}/_view/{view_name}", params=params)
-    if response.status_code == 200:
-        return response.json()
-    return {"rows": []}
-
-def get_all_docs(db_name, include_docs=True):
-    params = {"include_docs": "true" if include_docs else "false"}
-    response = requests.get(f"{POUCHDB_URL}/{db_name}/_all_docs", params=params)
-    if response.status_code == 200:
-        return response.json()
-    return {"rows": []}
-
-# Создание БД, если не существует
-create_db_if_not_exists("server_resources")
-create_db_if_not_exists("users")
-
-# Настройка безопасности
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+async def get_doc(db_name, doc_id):
+    return await db.get_doc(db_name, doc_id)
+
+async def save_doc(db_name, doc):
+    return await db.save_doc(db_name, doc)
+
+async def delete_doc(db_name, doc_id):
+    return await db.delete_doc(db_name, doc_id)
+
+async def query_view(db_name, view_name, **params):
+    return await db.query_view(db_name, view_name, **params)
+
+async def get_all_docs(db_name, include_docs=True, **params):
+    return await db.get_all_docs(db_name, include_docs=include_docs, **params)
+
+zone_changes = ChangesFollower(
+    db,
+    "server_resources",
+    on_change=zone_store.apply_change,
+    on_reset=zone_store.load_cache,
+    on_error=zone_store.deactivate,
+)
+
+# Настройка безопасности. passlib и jose импортируются при первом
+# использовании, чтобы не замедлять импорт модуля и сбор тестов
+_pwd_context = None
+
+def password_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+# Заголовок Authorization принимает JWT ("Bearer <токен>") или ключ API
+# ("ApiKey <ключ>"), поэтому обе схемы не отклоняют запрос сами
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+api_key_scheme = APIKeyHeader(
+    name="Authorization", scheme_name=API_KEY_SCHEME, auto_error=False,
+    description="Ключ API в виде: ApiKey <ключ>",
+)
+
+# Хеширование и проверка паролей (bcrypt) выполняются в отдельном пуле
+# потоков, чтобы не блокировать цикл событий. bcrypt освобождает GIL,
+# поэтому потоки пула работают на разных ядрах параллельно
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+# Кэш пользователей, поддерживаемый лентой _changes базы users, и кэш
+# разобранных JWT, записи которого живут до истечения токена
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+user_cache = UserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
+token_cache = ExpiringCache(TOKEN_CACHE_MAX_ENTRIES, clock=time.time)
+
+# Ключи API для автоматизации: секрет ключа проверяется через HMAC,
+# документы ключей кэшируются так же, как пользователи
+API_KEY_SECRET = os.getenv("API_KEY_SECRET") or SECRET_KEY
+api_key_cache = UserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL, prefix="apikey:")
+
+def apply_user_change(change: Dict[str, Any]):
+    user_cache.apply_change(change)
+    # Поиск, начатый до изменения, не должен достаться новым запросам
+    doc_id = change.get("id", "")
+    if doc_id.startswith("user:"):
+        username = doc_id[len("user:"):]
+        user_lookups.forget(lambda key: key == username)
+    api_key_cache.apply_change(change)
+
+async def activate_user_caches():
+    await user_cache.activate()
+    await api_key_cache.activate()
+
+def deactivate_user_caches():
+    user_cache.deactivate()
+    api_key_cache.deactivate()
+
+user_changes = ChangesFollower(
+    db,
+    "users",
+    on_change=apply_user_change,
+    on_reset=activate_user_caches,
+    on_error=deactivate_user_caches,
+)
+
 # Модели данных
 class Server(BaseModel):
     fqdn: str
@@ -104,6 +273,25 @@ class Zone(BaseModel):
     type: str = "zone"
     environments: List[Environment] = []
     
+class BulkServerOperation(BaseModel):
+    op: str  # "create", "update" или "delete"
+    fqdn: Optional[str] = None  # FQDN изменяемого или удаляемого сервера
+    server: Optional[Server] = None
+
+class BulkServerResult(BaseModel):
+    op: Optional[str] = None
+    fqdn: Optional[str] = None
+    status_code: int
+    detail: Optional[str] = None
+
+class ServerLocation(BaseModel):
+    zone: str
+    environment: str
+    server: Server
+
+# Проекция документа на поля модели Zone, построенная один раз при запуске
+project_zone = model_projector(Zone)
+
 class ZoneInDB(Zone):
     _id: str
     _rev: Optional[str] = None
@@ -124,28 +312,86 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+class ApiKeyCreate(BaseModel):
+    name: str  # Назначение ключа, например имя бота или CI-задачи
+
+class ApiKeyInfo(BaseModel):
+    id: str
+    name: Optional[str] = None
+    created_at: Optional[str] = None
+    revoked: bool = False
+
+class ApiKeyCreated(ApiKeyInfo):
+    key: str  # Показывается только при создании
+
 # Функции для работы с безопасностью
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
-def get_user(username: str):
+async def run_password_task(func, *args):
+    """Выполнить verify_password или get_password_hash в пуле потоков"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, func, *args)
+
+# Одновременные поиски одного пользователя (например, сразу после
+# запуска или сброса кэша) выполняются одним чтением
+user_lookups = SingleFlight()
+
+async def load_user(username: str):
+    version = user_cache.version
     user_id = f"user:{username}"
-    user_data = get_doc("users", user_id)
+    user_data = await get_doc("users", user_id)
     if user_data:
-        return UserInDB(**user_data)
+        user = UserInDB(**user_data)
+        user_cache.remember(username, user, version)
+        return user
     return None
 
-def authenticate_user(username: str, password: str):
-    user = get_user(username)
+async def get_user(username: str):
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    return await user_lookups.do(username, lambda: load_user(username))
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Данные JWT; подпись повторно используемого токена не проверяется заново"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    from jose import jwt
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if isinstance(payload.get("exp"), (int, float)):
+        token_cache.put(token, payload, payload["exp"])
+    return payload
+
+async def authenticate_user(username: str, password: str):
+    user = await get_user(username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await run_password_task(verify_password, password, user.hashed_password):
         return False
     return user
 
+async def authenticate_api_key(key: str):
+    """Пользователь, которому принадлежит действующий ключ API, или None"""
+    parsed = parse_api_key(key)
+    if parsed is None:
+        return None
+    key_id, secret = parsed
+    key_doc = api_key_cache.get(key_id)
+    if key_doc is None:
+        version = api_key_cache.version
+        key_doc = await get_doc("users", api_key_id(key_id))
+        if not key_doc:
+            return None
+        api_key_cache.remember(key_id, key_doc, version)
+    if not verify_api_key(key_doc, secret, API_KEY_SECRET):
+        return None
+    return await get_user(key_doc["username"])
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -153,24 +399,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(
+    token: Optional[str] = Depends(oauth2_scheme),
+    authorization: Optional[str] = Depends(api_key_scheme)
+):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Невалидные учетные данные",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() == API_KEY_SCHEME.lower():
+        user = await authenticate_api_key(credentials.strip())
+        if user is None:
+            raise credentials_exception
+        return user
+    if token is None:
+        raise credentials_exception
+    from jose import JWTError
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user(username=token_data.username)
+    user = await get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -183,7 +442,7 @@ async def get_current_active_user(current_user: UserInDB = Depends(get_current_u
 # Маршруты для аутентификации
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -200,12 +459,45 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
-# Создание тестового пользователя при первом запуске
-@app.on_event("startup")
-async def startup_event():
-    user_doc = get_doc("users", "user:admin")
+# Маршруты для ключей API
+@app.post("/api-keys", response_model=ApiKeyCreated)
+async def create_api_key(key_request: ApiKeyCreate, current_user: User = Depends(get_current_active_user)):
+    """Создать ключ API текущего пользователя; ключ возвращается только в этом ответе"""
+    key, key_doc = generate_api_key(current_user.username, key_request.name, API_KEY_SECRET)
+    await db.create_doc("users", key_doc)
+    return dict(public_key_info(key_doc), key=key)
+
+@app.get("/api-keys", response_model=List[ApiKeyInfo])
+async def list_api_keys(current_user: User = Depends(get_current_active_user)):
+    """Ключи API текущего пользователя"""
+    result = await db.get_docs_by_prefix("users", "apikey:")
+    return [
+        public_key_info(row["doc"]) for row in result.get("rows", [])
+        if row.get("doc") and row["doc"].get("username") == current_user.username
+    ]
+
+@app.delete("/api-keys/{key_id}", response_model=dict)
+async def revoke_api_key(key_id: str, current_user: User = Depends(get_current_active_user)):
+    """Отозвать ключ API"""
+    key_doc = await get_doc("users", api_key_id(key_id))
+    if not key_doc or key_doc.get("username") != current_user.username:
+        raise HTTPException(status_code=404, detail="Ключ API не найден")
+    key_doc["revoked"] = True
+    await save_doc("users", key_doc)
+    api_key_cache.invalidate(key_id)
+    return {"message": f"Ключ API {key_id} отозван"}
+
+# Создание БД и тестового пользователя при первом запуске
+async def create_databases():
+    # Создание БД, если не существует
+    for db_name in ["server_resources", "users"]:
+        if not await create_db_if_not_exists(db_name):
+            raise PouchDBError(f"Не удалось создать базу данных {db_name}")
+
+async def create_admin_user():
+    user_doc = await get_doc("users", "user:admin")
     if not user_doc:
-        hashed_password = get_password_hash("admin")
+        hashed_password = await run_password_task(get_password_hash, "admin")
         user = {
             "_id": "user:admin",
             "username": "admin",
@@ -214,76 +506,256 @@ async def startup_event():
             "disabled": False,
             "hashed_password": hashed_password
         }
-        save_doc("users", user)
+        await save_doc("users", user)
         print("Создан тестовый пользователь: admin/admin")
 
+async def bootstrap():
+    """
+    Подготовка базы данных и фоновых задач.
+
+    Выполняется в фоне, поэтому процесс начинает принимать запросы сразу,
+    а недоступный при запуске PouchDB не мешает запуску: обращения к нему
+    повторяются с экспоненциальной паузой.
+    """
+    # Ленты изменений сами переподключаются к PouchDB, поэтому кэши
+    # включатся, как только база станет доступна, независимо от исхода
+    # подготовки
+    if ZONE_CACHE_ENABLED:
+        zone_changes.start()
+    if USER_CACHE_ENABLED:
+        user_changes.start()
+    with startup_timer.step("create_databases"):
+        await retry_with_backoff(
+            create_databases, BOOTSTRAP_ATTEMPTS, BOOTSTRAP_RETRY_DELAY, description="Создание баз данных"
+        )
+    with startup_timer.step("create_admin_user"):
+        await retry_with_backoff(
+            create_admin_user, BOOTSTRAP_ATTEMPTS, BOOTSTRAP_RETRY_DELAY, description="Создание пользователя admin"
+        )
+    # passlib загружается заранее, но не в цикле событий
+    with startup_timer.step("password_context"):
+        await run_password_task(password_context)
+    startup_timer.ready()
+    print(startup_timer.summary())
+
+bootstrap_task: Optional[asyncio.Task] = None
+
+async def startup():
+    global bootstrap_task
+    startup_timer.mark("import_and_setup")
+    bootstrap_task = asyncio.create_task(bootstrap())
+
+async def shutdown():
+    if bootstrap_task is not None and not bootstrap_task.done():
+        bootstrap_task.cancel()
+        try:
+            await bootstrap_task
+        except asyncio.CancelledError:
+            pass
+    await zone_changes.stop()
+    await user_changes.stop()
+    zone_store.deactivate()
+    deactivate_user_caches()
+    await db.aclose()
+
+@app.get("/health", response_model=dict)
+async def get_health(response: Response):
+    """
+    Готовность бэкенда и время запуска по шагам (без аутентификации).
+
+    Пока подготовка не завершена, возвращается 503, чтобы балансировщик
+    не направлял запросы в процесс, который еще не готов к работе.
+    """
+    report = startup_timer.report()
+    if bootstrap_task is not None and bootstrap_task.done() and not bootstrap_task.cancelled():
+        error = bootstrap_task.exception()
+        if error is not None:
+            report["error"] = str(error)
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+@app.get("/cache/stats", response_model=dict)
+async def get_cache_stats(current_user: User = Depends(get_current_active_user)):
+    """Статистика кэшей зон, пользователей и токенов и индекса серверов"""
+    return {
+        "zones": zone_cache.stats(),
+        "servers": zone_store.servers.stats(),
+        "users": user_cache.stats(),
+        "api_keys": api_key_cache.stats(),
+        "tokens": token_cache.stats(),
+    }
+
+# Метрики кэшей и обращений к PouchDB для /metrics
+def cache_metric(field: str) -> Dict[tuple, float]:
+    caches = {
+        "zones": zone_cache,
+        "users": user_cache,
+        "api_keys": api_key_cache,
+        "tokens": token_cache,
+    }
+    return {(name,): cache.stats()[field] for name, cache in caches.items()}
+
+# Значения кэшей и счетчики конфликтов вычисляются только при выдаче /metrics
+metrics_registry.callback(
+    "cache_hits_total", "Число попаданий в кэш", "counter", ("cache",), lambda: cache_metric("hits")
+)
+metrics_registry.callback(
+    "cache_misses_total", "Число промахов кэша", "counter", ("cache",), lambda: cache_metric("misses")
+)
+metrics_registry.callback(
+    "cache_hit_ratio", "Доля попаданий в кэш", "gauge", ("cache",), lambda: cache_metric("hit_ratio")
+)
+metrics_registry.callback(
+    "cache_entries", "Число записей в кэше", "gauge", ("cache",), lambda: cache_metric("entries")
+)
+metrics_registry.callback(
+    "pouchdb_conflict_retries_total", "Число повторов записи после конфликта ревизий", "counter", (),
+    lambda: {(): db.conflicts_retried},
+)
+metrics_registry.callback(
+    "pouchdb_conflicts_total", "Число записей, не выполненных из-за конфликта ревизий", "counter", (),
+    lambda: {(): db.conflicts_failed},
+)
+metrics_registry.callback(
+    "pouchdb_admission_queue_depth", "Число обращений к PouchDB, ожидающих в очереди", "gauge", ("priority",),
+    lambda: {(priority,): depth for priority, depth in admission.queue_depth().items()},
+)
+metrics_registry.callback(
+    "pouchdb_admission_active", "Число выполняющихся обращений к PouchDB из HTTP-запросов", "gauge", (),
+    lambda: {(): admission.active},
+)
+metrics_registry.callback(
+    "pouchdb_admission_rejected_total", "Число обращений к PouchDB, отклоненных из-за перегрузки", "counter",
+    ("priority",), lambda: {(priority,): count for priority, count in admission.rejected.items()},
+)
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        """Метрики процесса в текстовом формате Prometheus (без аутентификации)"""
+        return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 # API для работы с зонами
+def not_modified(etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """Ответ 304, если у клиента уже есть актуальная версия"""
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+def zones_response(zones: Any, response: Response):
+    """
+    Ответ со списком зон или одной зоной.
+
+    В быстром режиме ответ формируется сразу, минуя валидацию по
+    response_model и jsonable_encoder, поэтому заголовки переносятся явно.
+    """
+    if not FAST_ZONE_RESPONSES:
+        return zones
+    if isinstance(zones, list):
+        content = [project_zone(zone) for zone in zones]
+    else:
+        content = project_zone(zones)
+    return FastJSONResponse(content, headers=dict(response.headers))
+
+async def set_zone_etag(response: Response, zone_name: str, if_match: Optional[str]):
+    """
+    ETag зоны после условной записи, чтобы следующий запрос с If-Match
+    можно было отправить без повторного чтения зоны.
+    """
+    if if_match is None:
+        return
+    _, etag = await zone_store.get_zone_versioned(zone_name)
+    if etag is not None:
+        response.headers["ETag"] = etag
+
+async def stream_zones(start: Optional[str], limit: Optional[int]):
+    """Зоны по одной на строку, пока из PouchDB читаются следующие пакеты"""
+    count = 0
+    async for zone in zone_store.iter_zones(start, batch_size=min(limit or ZONES_STREAM_BATCH_SIZE, ZONES_STREAM_BATCH_SIZE)):
+        yield json.dumps(zone, ensure_ascii=False) + "\n"
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
 @app.get("/zones/", response_model=List[Zone])
-async def get_all_zones(current_user: User = Depends(get_current_active_user)):
-    """Получить список всех зон"""
-    zones = []
-    result = get_all_docs("server_resources", include_docs=True)
-    for row in result.get("rows", []):
-        doc = row.get("doc", {})
-        if doc.get('type') == 'zone':
-            # Исключаем служебные поля PouchDB
-            zone = {k: v for k, v in doc.items() if not k.startswith('_')}
-            zones.append(zone)
-    return zones
+async def get_all_zones(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=ZONES_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Получить список всех зон.
+
+    С параметром limit возвращается одна страница, а курсор следующей
+    страницы передается в заголовке X-Next-Cursor. С заголовком
+    Accept: application/x-ndjson зоны отдаются потоком по одной на строку.
+    Полный список отдается с ETag и поддерживает If-None-Match.
+    """
+    start = decode_cursor(cursor) if cursor else None
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # После отправки заголовков запрос уже нельзя отклонить ответом 503
+        await db.admit()
+        return StreamingResponse(stream_zones(start, limit), media_type=NDJSON_MEDIA_TYPE)
+    if limit is None and start is None:
+        zones, etag = await zone_store.list_zones_versioned()
+        cached = not_modified(etag, if_none_match)
+        if cached is not None:
+            return cached
+        response.headers["ETag"] = etag
+        return zones_response(zones, response)
+    zones, next_start = await zone_store.list_zones_page(start, limit or ZONES_PAGE_MAX_LIMIT)
+    if next_start is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_start)
+    return zones_response(zones, response)
 
 @app.post("/zones/", response_model=dict)
 async def create_zone(zone: Zone, current_user: User = Depends(get_current_active_user)):
     """Создать новую зону"""
-    # Проверяем, что зона с таким именем еще не существует
-    result = get_all_docs("server_resources", include_docs=True)
-    for row in result.get("rows", []):
-        doc = row.get("doc", {})
-        if doc.get('type') == 'zone' and doc.get('name') == zone.name:
-            raise HTTPException(status_code=400, detail="Зона с таким именем уже существует")
-    
-    # Добавляем _id для PouchDB
-    doc_id = f"zone:{zone.name}"
-    zone_dict = zone.dict()
-    zone_dict["_id"] = doc_id
-    
-    # Сохраняем в БД
-    save_doc("server_resources", zone_dict)
-    
+    doc_id = await zone_store.create_zone(zone.dict())
     return {"message": f"Зона {zone.name} успешно создана", "id": doc_id}
 
 @app.get("/zones/{zone_name}", response_model=Zone)
-async def get_zone(zone_name: str, current_user: User = Depends(get_current_active_user)):
-    """Получить зону по имени"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Исключаем служебные поля PouchDB
-        zone = {k: v for k, v in zone_data.items() if not k.startswith('_')}
-        return zone
+async def get_zone(
+    zone_name: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Получить зону по имени (с ETag и поддержкой If-None-Match)"""
+    zone, etag = await zone_store.get_zone_versioned(zone_name)
+    if zone:
+        cached = not_modified(etag, if_none_match)
+        if cached is not None:
+            return cached
+        response.headers["ETag"] = etag
+        return zones_response(zone, response)
     raise HTTPException(status_code=404, detail="Зона не найдена")
 
 @app.put("/zones/{zone_name}", response_model=dict)
-async def update_zone(zone_name: str, zone_update: Zone, current_user: User = Depends(get_current_active_user)):
+async def update_zone(
+    zone_name: str,
+    zone_update: Zone,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
     """Обновить зону"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Обновляем данные
-        zone_dict = zone_update.dict()
-        for key, value in zone_dict.items():
-            zone_data[key] = value
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Зона {zone_name} успешно обновлена"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.update_zone(zone_name, zone_update.dict(), if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Зона {zone_name} успешно обновлена"}
 
 @app.delete("/zones/{zone_name}", response_model=dict)
-async def delete_zone(zone_name: str, current_user: User = Depends(get_current_active_user)):
+async def delete_zone(
+    zone_name: str,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
     """Удалить зону"""
-    doc_id = f"zone:{zone_name}"
-    if delete_doc("server_resources", doc_id):
+    if await zone_store.delete_zone(zone_name, if_match=if_match):
         return {"message": f"Зона {zone_name} успешно удалена"}
     raise HTTPException(status_code=404, detail="Зона не найдена")
 
@@ -292,89 +764,41 @@ async def delete_zone(zone_name: str, current_user: User = Depends(get_current_a
 async def create_environment(
     zone_name: str,
     environment: Environment,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Добавить окружение в зону"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Проверяем, существует ли окружение с таким именем
-        environments = zone_data.get("environments", [])
-        for env in environments:
-            if env["name"] == environment.name:
-                raise HTTPException(status_code=400, detail=f"Окружение с именем {environment.name} уже существует в зоне {zone_name}")
-        
-        # Добавляем новое окружение
-        if "environments" not in zone_data:
-            zone_data["environments"] = []
-        zone_data["environments"].append(environment.dict())
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Окружение {environment.name} успешно добавлено в зону {zone_name}"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.create_environment(zone_name, environment.dict(), if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Окружение {environment.name} успешно добавлено в зону {zone_name}"}
 
 @app.put("/zones/{zone_name}/environments/{env_name}", response_model=dict)
 async def update_environment(
     zone_name: str,
     env_name: str,
     environment: Environment,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Обновить окружение в зоне"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Проверяем, существует ли окружение с таким именем
-        environments = zone_data.get("environments", [])
-        env_index = None
-        for i, env in enumerate(environments):
-            if env["name"] == env_name:
-                env_index = i
-                break
-        
-        if env_index is None:
-            raise HTTPException(status_code=404, detail=f"Окружение {env_name} не найдено в зоне {zone_name}")
-        
-        # Обновляем окружение
-        zone_data["environments"][env_index] = environment.dict()
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Окружение {env_name} успешно обновлено в зоне {zone_name}"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.update_environment(zone_name, env_name, environment.dict(), if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Окружение {env_name} успешно обновлено в зоне {zone_name}"}
 
 @app.delete("/zones/{zone_name}/environments/{env_name}", response_model=dict)
 async def delete_environment(
     zone_name: str,
     env_name: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Удалить окружение из зоны"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Проверяем, существует ли окружение с таким именем
-        environments = zone_data.get("environments", [])
-        env_index = None
-        for i, env in enumerate(environments):
-            if env["name"] == env_name:
-                env_index = i
-                break
-        
-        if env_index is None:
-            raise HTTPException(status_code=404, detail=f"Окружение {env_name} не найдено в зоне {zone_name}")
-        
-        # Удаляем окружение
-        zone_data["environments"].pop(env_index)
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Окружение {env_name} успешно удалено из зоны {zone_name}"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.delete_environment(zone_name, env_name, if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Окружение {env_name} успешно удалено из зоны {zone_name}"}
 
 # API для работы с серверами
 @app.post("/zones/{zone_name}/environments/{env_name}/servers/", response_model=dict)
@@ -382,39 +806,30 @@ async def add_server(
     zone_name: str,
     env_name: str,
     server: Server,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Добавить сервер в окружение"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Проверяем, существует ли окружение с таким именем
-        environments = zone_data.get("environments", [])
-        env_index = None
-        for i, env in enumerate(environments):
-            if env["name"] == env_name:
-                env_index = i
-                break
-        
-        if env_index is None:
-            raise HTTPException(status_code=404, detail=f"Окружение {env_name} не найдено в зоне {zone_name}")
-        
-        # Проверяем, существует ли сервер с таким FQDN
-        servers = zone_data["environments"][env_index].get("servers", [])
-        for existing_server in servers:
-            if existing_server["fqdn"] == server.fqdn:
-                raise HTTPException(status_code=400, detail=f"Сервер с FQDN {server.fqdn} уже существует в окружении {env_name}")
-        
-        # Добавляем сервер
-        if "servers" not in zone_data["environments"][env_index]:
-            zone_data["environments"][env_index]["servers"] = []
-        zone_data["environments"][env_index]["servers"].append(server.dict())
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Сервер {server.fqdn} успешно добавлен в окружение {env_name} зоны {zone_name}"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.add_server(zone_name, env_name, server.dict(), if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Сервер {server.fqdn} успешно добавлен в окружение {env_name} зоны {zone_name}"}
+
+@app.post("/zones/{zone_name}/environments/{env_name}/servers/_bulk", response_model=List[BulkServerResult])
+async def bulk_servers(
+    zone_name: str,
+    env_name: str,
+    operations: List[BulkServerOperation],
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Пакетное добавление, обновление и удаление серверов окружения"""
+    if len(operations) > BULK_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Слишком много операций в пакете (максимум {BULK_MAX_OPERATIONS})")
+    results = await zone_store.bulk_servers(zone_name, env_name, [operation.dict() for operation in operations], if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return results
 
 @app.put("/zones/{zone_name}/environments/{env_name}/servers/{server_fqdn}", response_model=dict)
 async def update_server(
@@ -422,84 +837,123 @@ async def update_server(
     env_name: str,
     server_fqdn: str,
     server: Server,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Обновить сервер в окружении"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Проверяем, существует ли окружение с таким именем
-        environments = zone_data.get("environments", [])
-        env_index = None
-        for i, env in enumerate(environments):
-            if env["name"] == env_name:
-                env_index = i
-                break
-        
-        if env_index is None:
-            raise HTTPException(status_code=404, detail=f"Окружение {env_name} не найдено в зоне {zone_name}")
-        
-        # Проверяем, существует ли сервер с таким FQDN
-        servers = zone_data["environments"][env_index].get("servers", [])
-        server_index = None
-        for i, s in enumerate(servers):
-            if s["fqdn"] == server_fqdn:
-                server_index = i
-                break
-        
-        if server_index is None:
-            raise HTTPException(status_code=404, detail=f"Сервер с FQDN {server_fqdn} не найден в окружении {env_name}")
-        
-        # Обновляем сервер
-        zone_data["environments"][env_index]["servers"][server_index] = server.dict()
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Сервер {server_fqdn} успешно обновлен в окружении {env_name} зоны {zone_name}"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.update_server(zone_name, env_name, server_fqdn, server.dict(), if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Сервер {server_fqdn} успешно обновлен в окружении {env_name} зоны {zone_name}"}
 
 @app.delete("/zones/{zone_name}/environments/{env_name}/servers/{server_fqdn}", response_model=dict)
 async def delete_server(
     zone_name: str,
     env_name: str,
     server_fqdn: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Удалить сервер из окружения"""
-    doc_id = f"zone:{zone_name}"
-    zone_data = get_doc("server_resources", doc_id)
-    if zone_data:
-        # Проверяем, существует ли окружение с таким именем
-        environments = zone_data.get("environments", [])
-        env_index = None
-        for i, env in enumerate(environments):
-            if env["name"] == env_name:
-                env_index = i
-                break
-        
-        if env_index is None:
-            raise HTTPException(status_code=404, detail=f"Окружение {env_name} не найдено в зоне {zone_name}")
-        
-        # Проверяем, существует ли сервер с таким FQDN
-        servers = zone_data["environments"][env_index].get("servers", [])
-        server_index = None
-        for i, s in enumerate(servers):
-            if s["fqdn"] == server_fqdn:
-                server_index = i
-                break
-        
-        if server_index is None:
-            raise HTTPException(status_code=404, detail=f"Сервер с FQDN {server_fqdn} не найден в окружении {env_name}")
-        
-        # Удаляем сервер
-        zone_data["environments"][env_index]["servers"].pop(server_index)
-        
-        # Сохраняем обновленную зону
-        save_doc("server_resources", zone_data)
-        
-        return {"message": f"Сервер {server_fqdn} успешно удален из окружения {env_name} зоны {zone_name}"}
-    raise HTTPException(status_code=404, detail="Зона не найдена")
+    await zone_store.delete_server(zone_name, env_name, server_fqdn, if_match=if_match)
+    await set_zone_etag(response, zone_name, if_match)
+    return {"message": f"Сервер {server_fqdn} успешно удален из окружения {env_name} зоны {zone_name}"}
+
+# API для поиска серверов во всех зонах
+@app.get("/servers/by-fqdn/{fqdn}", response_model=ServerLocation)
+async def find_server_by_fqdn(fqdn: str, current_user: User = Depends(get_current_active_user)):
+    """Найти сервер по FQDN"""
+    locations = await zone_store.find_servers(fqdn=fqdn)
+    if locations:
+        return locations[0]
+    raise HTTPException(status_code=404, detail=f"Сервер с FQDN {fqdn} не найден")
+
+@app.get("/servers/by-ip/{ip}", response_model=List[ServerLocation])
+async def find_servers_by_ip(ip: str, current_user: User = Depends(get_current_active_user)):
+    """Найти серверы по IP-адресу"""
+    locations = await zone_store.find_servers(ip=ip)
+    if locations:
+        return locations
+    raise HTTPException(status_code=404, detail=f"Серверы с IP {ip} не найдены")
+
+# API для импорта инвентаря
+def parse_import_zone(raw: Any) -> Dict[str, Any]:
+    if not isinstance(raw, dict):
+        raise ValueError("Зона должна быть JSON-объектом")
+    return Zone(**raw).dict()
+
+@app.post("/import", response_model=dict)
+async def import_inventory(
+    request: Request,
+    mode: str = IMPORT_MERGE,
+    data_format: Optional[str] = Query(None, alias="format"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Импорт зон из тела запроса в формате JSON ({"zones": [...]} или массив)
+    или NDJSON (одна зона на строку).
+
+    Тело разбирается по мере поступления, зоны записываются пакетами.
+    Ход импорта доступен через GET /import/progress.
+    """
+    if import_lock.locked():
+        raise HTTPException(status_code=409, detail="Импорт уже выполняется")
+    if data_format is None:
+        content_type = request.headers.get("content-type", "")
+        data_format = FORMAT_NDJSON if NDJSON_MEDIA_TYPE in content_type else FORMAT_JSON
+    async with import_lock:
+        import_progress.clear()
+        import_progress.update({"mode": mode, "started_at": datetime.utcnow().isoformat(), "done": False})
+        try:
+            summary = await zone_store.import_zones(
+                iter_zones(request.stream(), data_format),
+                mode,
+                parse=parse_import_zone,
+                batch_size=IMPORT_BATCH_SIZE,
+                on_batch=import_progress.update,
+            )
+        except HTTPException as e:
+            import_progress["error"] = e.detail
+            raise
+        except Overloaded as e:
+            import_progress["error"] = str(e)
+            raise
+        finally:
+            import_progress["done"] = True
+        import_progress.update(summary)
+        return summary
+
+@app.get("/import/progress", response_model=dict)
+async def get_import_progress(current_user: User = Depends(get_current_active_user)):
+    """Ход текущего или последнего импорта"""
+    return import_progress
+
+# API для экспорта инвентаря
+@app.get("/export")
+async def export_inventory(
+    data_format: str = Query(FORMAT_JSON, alias="format"),
+    compress: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Экспорт всех зон потоком в формате JSON ({"zones": [...]}) или NDJSON,
+    при compress=true - в виде gzip-файла.
+
+    Зоны читаются из PouchDB постранично и сразу отправляются клиенту.
+    При перегрузке экспорт отклоняется ответом 503 до начала потока.
+    """
+    await db.admit()
+    body = dump_zones(zone_store.iter_zones(batch_size=ZONES_STREAM_BATCH_SIZE), data_format)
+    media_type = NDJSON_MEDIA_TYPE if data_format == FORMAT_NDJSON else "application/json"
+    filename = f"inventory.{data_format}"
+    if compress:
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 if __name__ == "__main__":
     import uvicorn
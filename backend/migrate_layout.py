@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+import argparse
+import requests
+import json
+import os
+from dotenv import load_dotenv
+
+from zone_store import DB_NAME, LAYOUT_NORMALIZED, environment_docs
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Настройка подключения к PouchDB
+POUCHDB_URL = os.getenv("POUCHDB_URL", "http://localhost:5984")
+
+# Число документов в одном запросе _bulk_docs
+BATCH_SIZE = 500
+
+def get_zone_docs():
+    response = requests.get(
+        f"{POUCHDB_URL}/{DB_NAME}/_all_docs",
+        params={
+            "include_docs": "true",
+            "startkey": json.dumps("zone:"),
+            "endkey": json.dumps("zone:\ufff0"),
+        }
+    )
+    if response.status_code != 200:
+        print(f"Ошибка чтения зон: {response.status_code} - {response.text}")
+        return []
+    return [row["doc"] for row in response.json().get("rows", []) if row.get("doc")]
+
+def get_revs(doc_ids):
+    """Текущие ревизии документов, чтобы повторный запуск перезаписал их"""
+    response = requests.post(f"{POUCHDB_URL}/{DB_NAME}/_all_docs", json={"keys": doc_ids})
+    revs = {}
+    if response.status_code == 200:
+        for row in response.json().get("rows", []):
+            if "value" in row and not row["value"].get("deleted"):
+                revs[row["id"]] = row["value"]["rev"]
+    return revs
+
+def bulk_save(docs):
+    """Пакетная запись документов, возвращает число ошибок"""
+    errors = 0
+    for i in range(0, len(docs), BATCH_SIZE):
+        batch = docs[i:i + BATCH_SIZE]
+        revs = get_revs([doc["_id"] for doc in batch])
+        for doc in batch:
+            if doc["_id"] in revs:
+                doc["_rev"] = revs[doc["_id"]]
+        response = requests.post(f"{POUCHDB_URL}/{DB_NAME}/_bulk_docs", json={"docs": batch})
+        if response.status_code not in [200, 201]:
+            print(f"Ошибка пакетной записи: {response.status_code} - {response.text}")
+            errors += len(batch)
+            continue
+        for result in response.json():
+            if "error" in result:
+                print(f"Ошибка записи документа {result['id']}: {result['error']}")
+                errors += 1
+    return errors
+
+def migrate_zone(zone_doc, dry_run=False):
+    """
+    Перенос одной зоны в нормализованную схему.
+
+    Сначала записываются документы окружений и серверов, и только после
+    этого из документа зоны удаляется вложенный список environments.
+    Если запись прервется, повторный запуск скрипта продолжит перенос.
+
+    Returns:
+        tuple: (число окружений, число серверов) или None при ошибке
+    """
+    zone_name = zone_doc["_id"][len("zone:"):]
+    environments = zone_doc.get("environments", [])
+    for env in environments:
+        if ":" in zone_name or ":" in env["name"]:
+            print(f"Зона {zone_name} пропущена: имена не должны содержать символ ':'")
+            return None
+
+    docs = []
+    for env in environments:
+        docs.extend(environment_docs(zone_name, env))
+    servers_count = len(docs) - len(environments)
+    if dry_run:
+        return len(environments), servers_count
+
+    if bulk_save(docs):
+        print(f"Зона {zone_name} не перенесена: документ зоны оставлен без изменений")
+        return None
+
+    zone_doc.pop("environments", None)
+    zone_doc["layout"] = LAYOUT_NORMALIZED
+    response = requests.put(f"{POUCHDB_URL}/{DB_NAME}/{zone_doc['_id']}", json=zone_doc)
+    if response.status_code not in [200, 201]:
+        print(f"Ошибка обновления зоны {zone_name}: {response.status_code} - {response.text}")
+        return None
+    return len(environments), servers_count
+
+def migrate(dry_run=False):
+    """Перенос всех зон из встроенной схемы в нормализованную"""
+    summary = {"zones": 0, "environments": 0, "servers": 0, "skipped": 0, "errors": 0}
+    for zone_doc in get_zone_docs():
+        if zone_doc.get("layout") == LAYOUT_NORMALIZED and "environments" not in zone_doc:
+            summary["skipped"] += 1
+            continue
+        result = migrate_zone(zone_doc, dry_run=dry_run)
+        if result is None:
+            summary["errors"] += 1
+            continue
+        summary["zones"] += 1
+        summary["environments"] += result[0]
+        summary["servers"] += result[1]
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос данных в нормализованную схему (STORAGE_LAYOUT=normalized)")
+    parser.add_argument("--dry-run", action="store_true", help="Только подсчитать документы, ничего не записывая")
+    args = parser.parse_args()
+
+    print("Перенос зон в нормализованную схему...")
+    summary = migrate(dry_run=args.dry_run)
+    print(f"Зон перенесено: {summary['zones']}")
+    print(f"Окружений: {summary['environments']}")
+    print(f"Серверов: {summary['servers']}")
+    print(f"Уже перенесено ранее: {summary['skipped']}")
+    print(f"Ошибок: {summary['errors']}")
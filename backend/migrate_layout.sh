@@ -0,0 +1,13 @@
+#!/bin/bash
+
+# Активация виртуального окружения
+source venv/bin/activate
+
+# Запуск переноса данных в нормализованную схему
+echo "Запуск переноса данных в нормализованную схему..."
+python migrate_layout.py "$@"
+
+# Деактивация виртуального окружения
+deactivate
+
+echo "Перенос данных завершен. Для работы с новой схемой запустите бэкенд с STORAGE_LAYOUT=normalized"
@@ -0,0 +1,556 @@
+import functools
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from admission import AdmissionController, Overloaded, current_request
+from profiling import current_profile, enter_operation, leave_operation
+from single_flight import SingleFlight
+from unit_of_work import current_unit
+
+# Настройки пула соединений с PouchDB (переопределяются переменными окружения)
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("POUCHDB_MAX_CONNECTIONS", "100"))
+DEFAULT_MAX_KEEPALIVE = int(os.getenv("POUCHDB_MAX_KEEPALIVE", "20"))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.getenv("POUCHDB_KEEPALIVE_EXPIRY", "30"))
+DEFAULT_TIMEOUT = float(os.getenv("POUCHDB_TIMEOUT", "10"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("POUCHDB_CONNECT_TIMEOUT", "5"))
+DEFAULT_POOL_TIMEOUT = float(os.getenv("POUCHDB_POOL_TIMEOUT", "5"))
+
+# Кэш ревизий документов и повтор записи при конфликте
+DEFAULT_REV_CACHE_SIZE = int(os.getenv("POUCHDB_REV_CACHE_SIZE", "10000"))
+DEFAULT_CONFLICT_RETRIES = int(os.getenv("POUCHDB_CONFLICT_RETRIES", "3"))
+
+# Объединение одинаковых одновременных чтений в один запрос к PouchDB
+DEFAULT_COALESCE_READS = os.getenv("POUCHDB_COALESCE_READS", "true").lower() == "true"
+
+
+class PouchDBError(Exception):
+    """Ошибка при обращении к PouchDB"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ConflictError(PouchDBError):
+    """Конфликт ревизий документа (HTTP 409)"""
+
+    def __init__(self, message: str):
+        super().__init__(message, 409)
+
+
+# Наблюдатель вызовов клиента: (операция, исход "ok" или "error", длительность в сек)
+CallObserver = Callable[[str, str, float], None]
+
+
+def instrumented(operation: str):
+    """
+    Замер длительности метода клиента для наблюдателя self.observer.
+
+    Кроме того, если запрос профилируется, обращения к базе внутри
+    метода учитываются в профиле под именем операции. Пока нет ни
+    наблюдателя, ни профиля, метод вызывается напрямую, без замеров.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            observer = self.observer
+            profiled = current_profile() is not None
+            if observer is None and not profiled:
+                return await func(self, *args, **kwargs)
+            token = enter_operation(operation) if profiled else None
+            outcome = "error"
+            started = time.perf_counter()
+            try:
+                result = await func(self, *args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                if token is not None:
+                    leave_operation(token)
+                if observer is not None:
+                    observer(operation, outcome, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class PouchDBClient:
+    """
+    Асинхронный клиент для работы с PouchDB через HTTP API.
+
+    Использует один httpx.AsyncClient с пулом keep-alive соединений,
+    поэтому запросы к базе не блокируют цикл событий и не открывают
+    новое TCP-соединение на каждый вызов.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        pool_timeout: float = DEFAULT_POOL_TIMEOUT,
+        rev_cache_size: int = DEFAULT_REV_CACHE_SIZE,
+        conflict_retries: int = DEFAULT_CONFLICT_RETRIES,
+        coalesce_reads: bool = DEFAULT_COALESCE_READS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        observer: Optional[CallObserver] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
+        """
+        Инициализация клиента.
+
+        Args:
+            base_url: URL сервера PouchDB
+            max_connections: Максимальное число одновременных соединений
+            max_keepalive_connections: Число соединений, удерживаемых открытыми
+            keepalive_expiry: Время жизни простаивающего соединения (сек)
+            timeout: Таймаут чтения и записи (сек)
+            connect_timeout: Таймаут установки соединения (сек)
+            pool_timeout: Время ожидания свободного соединения в пуле (сек)
+            rev_cache_size: Число ревизий документов, запоминаемых клиентом
+            conflict_retries: Число повторов записи при конфликте ревизий
+            coalesce_reads: Объединять одинаковые одновременные чтения
+            transport: Транспорт httpx (используется в тестах)
+            observer: Функция, получающая длительность каждой операции
+            admission: Ограничение одновременных обращений из HTTP-запросов
+        """
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout, pool=pool_timeout)
+        self.rev_cache_size = rev_cache_size
+        self.conflict_retries = conflict_retries
+        self.coalesce_reads = coalesce_reads
+        # Выполняющиеся чтения по (путь, параметры)
+        self._reads = SingleFlight()
+        self._transport = transport
+        self.observer = observer
+        self.admission = admission
+        # Число повторов записи после конфликта и записей, так и не выполненных
+        self.conflicts_retried = 0
+        self.conflicts_failed = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        # Последние известные ревизии документов: (db_name, doc_id) -> _rev
+        self._revs: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP-клиент создается лениво, внутри работающего цикла событий"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        """Закрыть пул соединений"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _read(self, path: str, params: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        GET-запрос, объединяемый с таким же выполняющимся запросом.
+
+        Все ожидающие получают один и тот же ответ и разбирают его сами,
+        поэтому изменение разобранного документа одним вызывающим не
+        затрагивает других.
+        """
+        if not self.coalesce_reads:
+            return await self._request("GET", path, params=params)
+        key = (path, tuple(sorted(params.items())) if params else ())
+        try:
+            return await self._reads.do(key, lambda: self._request("GET", path, params=params))
+        except Overloaded:
+            request = current_request()
+            if request is None or not request.admitted:
+                raise
+            # Отклонено первое обращение другого запроса, к которому
+            # присоединилось чтение уже допущенного запроса
+            return await self._request("GET", path, params=params)
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        if method != "GET" and len(self._reads):
+            # Чтение, начатое после записи, не должно получить ответ,
+            # прочитанный до нее
+            db_path = "/" + path.split("/")[1]
+            self._reads.forget(lambda key: key[0] == db_path or key[0].startswith(db_path + "/"))
+        request = current_request() if self.admission is not None else None
+        if request is None:
+            return await self._send(method, path, **kwargs)
+        # Отклонить можно только первое обращение запроса: следующие
+        # продолжают уже начатую работу
+        await self.admission.acquire(request.priority, sheddable=not request.admitted)
+        request.admitted = True
+        try:
+            return await self._send(method, path, **kwargs)
+        finally:
+            self.admission.release()
+
+    async def admit(self):
+        """Допустить текущий запрос к базе до его первого обращения (Overloaded при перегрузке)"""
+        if self.admission is not None:
+            await self.admission.admit()
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        profile = current_profile()
+        if profile is None:
+            return await self.client.request(method, path, **kwargs)
+        started = time.perf_counter()
+        response = await self.client.request(method, path, **kwargs)
+        profile.record(
+            method, path, response.status_code, time.perf_counter() - started,
+            len(response.request.content), len(response.content),
+        )
+        return response
+
+    def get_cached_rev(self, db_name: str, doc_id: str) -> Optional[str]:
+        """Последняя известная клиенту ревизия документа"""
+        return self._revs.get((db_name, doc_id))
+
+    def remember_rev(self, db_name: str, doc_id: str, rev: str):
+        key = (db_name, doc_id)
+        self._revs[key] = rev
+        self._revs.move_to_end(key)
+        while len(self._revs) > self.rev_cache_size:
+            self._revs.popitem(last=False)
+
+    def forget_rev(self, db_name: str, doc_id: str):
+        self._revs.pop((db_name, doc_id), None)
+
+    @staticmethod
+    def _remember_doc(db_name: str, doc_id: str, raw: Optional[bytes], **fields):
+        """
+        Запомнить документ (JSON из ответа или тела запроса) или его
+        отсутствие в карте документов текущего запроса
+        """
+        unit = current_unit()
+        if unit is not None:
+            unit.remember(db_name, doc_id, raw, **fields)
+
+    @staticmethod
+    def _forget_doc(db_name: str, doc_id: str):
+        unit = current_unit()
+        if unit is not None:
+            unit.forget(db_name, doc_id)
+
+    @instrumented("get_db_info")
+    async def get_db_info(self, db_name: str) -> Optional[Dict[str, Any]]:
+        response = await self._read(f"/{db_name}")
+        if response.status_code == 200:
+            return response.json()
+        return None
+
+    async def changes(
+        self,
+        db_name: str,
+        since: Any = "now",
+        timeout: float = 30,
+        include_docs: bool = True,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Чтение ленты изменений базы в режиме longpoll.
+
+        Запрос ждет новых изменений до timeout секунд, поэтому таймаут
+        чтения HTTP-клиента для него увеличивается.
+
+        Args:
+            db_name: Имя базы данных
+            since: Номер последовательности, с которого читать изменения
+            timeout: Время ожидания изменений на стороне PouchDB (сек)
+            include_docs: Включать ли тела документов
+            limit: Максимальное число изменений в ответе
+
+        Returns:
+            Dict[str, Any]: Ответ PouchDB со списком results и last_seq
+        """
+        params = {
+            "feed": "longpoll",
+            "since": str(since),
+            "timeout": str(int(timeout * 1000)),
+            "include_docs": "true" if include_docs else "false",
+        }
+        if limit is not None:
+            params["limit"] = str(limit)
+        request_timeout = httpx.Timeout(
+            timeout + self.timeout.read, connect=self.timeout.connect, pool=self.timeout.pool
+        )
+        response = await self._request(
+            "GET", f"/{db_name}/_changes", params=params, timeout=request_timeout
+        )
+        if response.status_code == 200:
+            return response.json()
+        raise PouchDBError(f"Ошибка чтения ленты изменений: {response.text}", response.status_code)
+
+    @instrumented("create_db_if_not_exists")
+    async def create_db_if_not_exists(self, db_name: str) -> bool:
+        response = await self._request("PUT", f"/{db_name}")
+        return response.status_code == 201 or response.status_code == 412
+
+    @instrumented("get_doc")
+    async def get_doc(self, db_name: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Чтение документа.
+
+        Внутри запроса с картой документов (unit_of_work) документ, уже
+        прочитанный или записанный этим запросом, повторно не читается.
+        """
+        unit = current_unit()
+        if unit is not None:
+            known, doc = unit.lookup(db_name, doc_id)
+            if known:
+                return doc
+        response = await self._read(f"/{db_name}/{doc_id}")
+        if response.status_code == 200:
+            doc = response.json()
+            self.remember_rev(db_name, doc_id, doc["_rev"])
+            self._remember_doc(db_name, doc_id, response.content)
+            return doc
+        if response.status_code == 404:
+            self.forget_rev(db_name, doc_id)
+            self._remember_doc(db_name, doc_id, None)
+        return None
+
+    @instrumented("save_doc")
+    async def save_doc(
+        self, db_name: str, doc: Dict[str, Any], retries: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Сохранение документа.
+
+        Для записи используется _rev, уже содержащийся в документе, либо
+        ревизия из кэша клиента, поэтому перед PUT не нужен лишний GET.
+        При конфликте (409) актуальная ревизия перечитывается и запись
+        повторяется, но не более retries раз.
+
+        Args:
+            db_name: Имя базы данных
+            doc: Документ для сохранения
+            retries: Число повторов при конфликте (по умолчанию conflict_retries)
+
+        Returns:
+            Dict[str, Any]: Ответ PouchDB с id и новой ревизией
+        """
+        if '_id' not in doc:
+            response = await self._request("POST", f"/{db_name}", json=doc)
+            if response.status_code in [201, 200]:
+                result = response.json()
+                self.remember_rev(db_name, result["id"], result["rev"])
+                self._remember_doc(db_name, result["id"], response.request.content, _id=result["id"], _rev=result["rev"])
+                return result
+            raise PouchDBError(f"Ошибка сохранения документа: {response.text}", response.status_code)
+
+        doc_id = doc['_id']
+        if '_rev' not in doc:
+            cached_rev = self.get_cached_rev(db_name, doc_id)
+            if cached_rev:
+                doc['_rev'] = cached_rev
+
+        retries = self.conflict_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            response = await self._request("PUT", f"/{db_name}/{doc_id}", json=doc)
+            if response.status_code in [201, 200]:
+                result = response.json()
+                self.remember_rev(db_name, doc_id, result["rev"])
+                self._remember_doc(db_name, doc_id, response.request.content, _rev=result["rev"])
+                return result
+            # Запомненная версия документа устарела
+            self._forget_doc(db_name, doc_id)
+            if response.status_code != 409 or attempt == retries:
+                break
+            self.conflicts_retried += 1
+            # Ревизия устарела: перечитываем актуальную и повторяем запись
+            existing_doc = await self.get_doc(db_name, doc_id)
+            if existing_doc:
+                doc['_rev'] = existing_doc['_rev']
+            else:
+                doc.pop('_rev', None)
+
+        if response.status_code == 409:
+            self.conflicts_failed += 1
+            raise ConflictError(f"Конфликт ревизий документа {doc_id}: {response.text}")
+        raise PouchDBError(f"Ошибка сохранения документа: {response.text}", response.status_code)
+
+    @instrumented("create_doc")
+    async def create_doc(self, db_name: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Создание нового документа.
+
+        Документ записывается без _rev, поэтому если документ с таким _id
+        уже существует, PouchDB отвечает 409 и выбрасывается ConflictError.
+        """
+        doc_id = doc['_id']
+        doc.pop('_rev', None)
+        response = await self._request("PUT", f"/{db_name}/{doc_id}", json=doc)
+        if response.status_code in [201, 200]:
+            result = response.json()
+            self.remember_rev(db_name, doc_id, result["rev"])
+            self._remember_doc(db_name, doc_id, response.request.content, _rev=result["rev"])
+            return result
+        self._forget_doc(db_name, doc_id)
+        if response.status_code == 409:
+            raise ConflictError(f"Документ {doc_id} уже существует")
+        raise PouchDBError(f"Ошибка сохранения документа: {response.text}", response.status_code)
+
+    @instrumented("delete_doc")
+    async def delete_doc(self, db_name: str, doc_id: str, retries: Optional[int] = None) -> bool:
+        rev = self.get_cached_rev(db_name, doc_id)
+        if rev is None:
+            doc = await self.get_doc(db_name, doc_id)
+            if not doc:
+                return False
+            rev = doc['_rev']
+
+        retries = self.conflict_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            response = await self._request("DELETE", f"/{db_name}/{doc_id}", params={"rev": rev})
+            if response.status_code == 200:
+                self.forget_rev(db_name, doc_id)
+                self._remember_doc(db_name, doc_id, None)
+                return True
+            self._forget_doc(db_name, doc_id)
+            if response.status_code != 409 or attempt == retries:
+                break
+            self.conflicts_retried += 1
+            doc = await self.get_doc(db_name, doc_id)
+            if not doc:
+                return False
+            rev = doc['_rev']
+
+        if response.status_code == 409:
+            self.conflicts_failed += 1
+        self.forget_rev(db_name, doc_id)
+        return False
+
+    @instrumented("bulk_docs")
+    async def bulk_docs(self, db_name: str, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Запись нескольких документов одним запросом _bulk_docs.
+
+        Документы без _rev получают ревизию из кэша клиента. Для удаления
+        документ передается с полем _deleted. Результат содержит по одной
+        записи на документ: {"ok": true, "id", "rev"} или {"id", "error"}.
+        """
+        if not docs:
+            return []
+        for doc in docs:
+            if '_id' in doc and '_rev' not in doc:
+                cached_rev = self.get_cached_rev(db_name, doc['_id'])
+                if cached_rev:
+                    doc['_rev'] = cached_rev
+        # Тело собирается из JSON отдельных документов, чтобы запомнить
+        # каждый из них в карте документов без повторной сериализации
+        parts = [json.dumps(doc).encode("utf-8") for doc in docs]
+        response = await self._request(
+            "POST", f"/{db_name}/_bulk_docs",
+            content=b'{"docs":[' + b",".join(parts) + b"]}",
+            headers={"Content-Type": "application/json"},
+        )
+        if response.status_code not in [201, 200]:
+            raise PouchDBError(f"Ошибка пакетной записи документов: {response.text}", response.status_code)
+        results = response.json()
+        for doc, raw, result in zip(docs, parts, results):
+            if "rev" in result and "error" not in result:
+                if doc.get('_deleted'):
+                    self.forget_rev(db_name, result["id"])
+                    self._remember_doc(db_name, result["id"], None)
+                else:
+                    self.remember_rev(db_name, result["id"], result["rev"])
+                    self._remember_doc(db_name, result["id"], raw, _id=result["id"], _rev=result["rev"])
+            else:
+                self._forget_doc(db_name, result["id"])
+        return results
+
+    @instrumented("query_view")
+    async def query_view(self, db_name: str, view_name: str, **params) -> Dict[str, Any]:
+        response = await self._read(f"/{db_name}/_design/{view_name}/_view/{view_name}", params=params)
+        if response.status_code == 200:
+            return response.json()
+        return {"rows": []}
+
+    @instrumented("get_all_docs")
+    async def get_all_docs(
+        self,
+        db_name: str,
+        include_docs: bool = True,
+        startkey: Optional[str] = None,
+        endkey: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Чтение _all_docs, при необходимости по диапазону идентификаторов.
+
+        Args:
+            db_name: Имя базы данных
+            include_docs: Включать ли тела документов
+            startkey: Первый идентификатор диапазона
+            endkey: Последний идентификатор диапазона (включительно)
+            limit: Максимальное число строк
+
+        Returns:
+            Dict[str, Any]: Ответ PouchDB со списком строк
+        """
+        params = {"include_docs": "true" if include_docs else "false"}
+        # Ключи в запросах к _all_docs передаются в виде JSON
+        if startkey is not None:
+            params["startkey"] = json.dumps(startkey)
+        if endkey is not None:
+            params["endkey"] = json.dumps(endkey)
+        if limit is not None:
+            params["limit"] = str(limit)
+        response = await self._read(f"/{db_name}/_all_docs", params=params)
+        if response.status_code == 200:
+            return response.json()
+        return {"rows": []}
+
+    @instrumented("get_docs")
+    async def get_docs(self, db_name: str, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Чтение нескольких документов одним запросом (_all_docs с keys).
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Найденные документы по _id
+        """
+        docs = {}
+        unit = current_unit()
+        if unit is not None:
+            missing = []
+            for doc_id in doc_ids:
+                known, doc = unit.lookup(db_name, doc_id)
+                if not known:
+                    missing.append(doc_id)
+                elif doc is not None:
+                    docs[doc_id] = doc
+            doc_ids = missing
+        if not doc_ids:
+            return docs
+        response = await self._request(
+            "POST", f"/{db_name}/_all_docs", params={"include_docs": "true"}, json={"keys": doc_ids}
+        )
+        if response.status_code != 200:
+            raise PouchDBError(f"Ошибка чтения документов: {response.text}", response.status_code)
+        for row in response.json().get("rows", []):
+            if row.get("doc"):
+                docs[row["id"]] = row["doc"]
+                self.remember_rev(db_name, row["id"], row["doc"]["_rev"])
+        return docs
+
+    async def get_docs_by_prefix(self, db_name: str, prefix: str, include_docs: bool = True) -> Dict[str, Any]:
+        """Чтение всех документов, идентификатор которых начинается с prefix"""
+        return await self.get_all_docs(
+            db_name, include_docs=include_docs, startkey=prefix, endkey=prefix + "\ufff0"
+        )
@@ -0,0 +1,142 @@
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Заголовок запроса, которым клиент просит добавить отладочный итог в конец тела
+DEBUG_FOOTER_HEADER = "x-debug-profile"
+
+# Профиль текущего запроса и операция клиента PouchDB, внутри которой
+# выполняется обращение к базе (например, get_doc внутри save_doc)
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_current_operation: ContextVar[Optional[str]] = ContextVar("storage_operation", default=None)
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    return _current_profile.get()
+
+
+def current_operation() -> Optional[str]:
+    return _current_operation.get()
+
+
+@contextmanager
+def profile_scope(profile: "RequestProfile"):
+    """Учитывать обращения к базе внутри блока в профиле profile"""
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def enter_operation(operation: str):
+    """Отметить начало операции хранилища; возвращает токен для leave_operation"""
+    return _current_operation.set(operation)
+
+
+def leave_operation(token):
+    _current_operation.reset(token)
+
+
+class RequestProfile:
+    """
+    Обращения к PouchDB, выполненные при обработке одного запроса.
+
+    Каждое обращение - это один HTTP-запрос к базе: операция клиента,
+    метод, путь, статус, длительность и объем переданных данных.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls: List[Dict[str, Any]] = []
+
+    def record(
+        self, method: str, path: str, status_code: int, duration: float, bytes_sent: int, bytes_received: int
+    ):
+        self.calls.append({
+            "operation": current_operation() or "request",
+            "method": method,
+            "path": path,
+            "status": status_code,
+            "duration": duration,
+            "bytes_sent": bytes_sent,
+            "bytes_received": bytes_received,
+        })
+
+    def by_operation(self) -> Dict[str, Dict[str, Any]]:
+        operations: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            totals = operations.setdefault(call["operation"], {"calls": 0, "duration": 0.0, "bytes": 0})
+            totals["calls"] += 1
+            totals["duration"] += call["duration"]
+            totals["bytes"] += call["bytes_sent"] + call["bytes_received"]
+        return operations
+
+    def server_timing(self) -> str:
+        """
+        Значение заголовка Server-Timing: общее время обращений к базе и
+        время по каждой операции, длительности в миллисекундах
+        """
+        total = sum(call["duration"] for call in self.calls)
+        entries = [f'db;dur={total * 1000:.1f};desc="{len(self.calls)} calls"']
+        for operation, totals in self.by_operation().items():
+            entries.append(
+                f'{operation};dur={totals["duration"] * 1000:.1f};desc="{totals["calls"]} calls, {totals["bytes"]} B"'
+            )
+        entries.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "duration": time.perf_counter() - self.started,
+            "db_calls": len(self.calls),
+            "db_duration": sum(call["duration"] for call in self.calls),
+            "operations": self.by_operation(),
+            "calls": self.calls,
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Учет обращений к PouchDB в каждом запросе.
+
+    Ответ получает заголовок Server-Timing, который показывают инструменты
+    разработчика браузера. Если footer включен и клиент прислал заголовок
+    X-Debug-Profile, после тела ответа дописывается строка с подробным
+    отчетом в JSON, включающим и обращения, выполненные во время потоковой
+    выдачи. Заголовок Server-Timing отражает только обращения, выполненные
+    до начала ответа.
+    """
+
+    def __init__(self, app: ASGIApp, footer: bool = False):
+        self.app = app
+        self.footer = footer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile()
+        with_footer = self.footer and DEBUG_FOOTER_HEADER in Headers(scope=scope)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers["Timing-Allow-Origin"] = "*"
+                if with_footer:
+                    # Длина тела изменится на длину отчета
+                    del headers["Content-Length"]
+            elif with_footer and message["type"] == "http.response.body" and not message.get("more_body", False):
+                await send({"type": "http.response.body", "body": message.get("body", b""), "more_body": True})
+                footer = "\n" + json.dumps(profile.report(), ensure_ascii=False) + "\n"
+                message = {"type": "http.response.body", "body": footer.encode("utf-8")}
+            await send(message)
+
+        with profile_scope(profile):
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,68 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Type, get_args, get_origin
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+_MISSING = object()
+
+
+def dumps(data: Any) -> bytes:
+    """JSON в UTF-8: через orjson, если он установлен, иначе стандартным модулем json"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON-ответ без jsonable_encoder: данные уже состоят из dict, list и скаляров"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_projector(model: Type[BaseModel]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Функция, оставляющая в словаре только поля модели (включая вложенные).
+
+    Повторяет то, что делает response_model при выдаче ответа, но без
+    валидации: предназначена для документов из нашей базы, которые уже
+    прошли валидацию при записи. Список полей вычисляется один раз при
+    построении функции, а не на каждый ответ.
+    """
+    fields = []
+    for name, field in model.model_fields.items():
+        default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+        fields.append((name, _value_projector(field.annotation), default))
+
+    def project(data: Dict[str, Any]) -> Dict[str, Any]:
+        result = {}
+        for name, project_value, default in fields:
+            if name in data:
+                value = data[name]
+                result[name] = project_value(value) if project_value is not None and value is not None else value
+            elif default is not _MISSING:
+                result[name] = default
+        return result
+
+    return project
+
+
+def _value_projector(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Проекция значения поля или None, если значение отдается как есть"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return model_projector(annotation)
+    if get_origin(annotation) in (list, List):
+        args = get_args(annotation)
+        item_projector = _value_projector(args[0]) if args else None
+        if item_projector is not None:
+            return lambda items: [item_projector(item) for item in items]
+    return None
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+import argparse
+import importlib.util
+import os
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Загрузка переменных окружения
+load_dotenv()
+
+APP = "main:app"
+
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def cpu_count() -> int:
+    """Число ядер, доступных процессу (с учетом ограничений affinity)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def worker_count(workers: Optional[int] = None) -> int:
+    """
+    Число рабочих процессов: явно заданное, из WEB_CONCURRENCY или по
+    числу ядер.
+
+    Каждый процесс обслуживает запросы в своем цикле событий, поэтому
+    одного процесса на ядро достаточно, чтобы загрузить все ядра.
+    """
+    if workers:
+        return workers
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    return cpu_count()
+
+
+def uvicorn_options(host: str, port: int, workers: int, graceful_timeout: int) -> Dict[str, Any]:
+    """Параметры uvicorn: uvloop и httptools используются, если установлены"""
+    return {
+        "host": host,
+        "port": port,
+        "workers": workers,
+        "loop": "uvloop" if available("uvloop") else "asyncio",
+        "http": "httptools" if available("httptools") else "h11",
+        "timeout_graceful_shutdown": graceful_timeout,
+        "proxy_headers": True,
+        "access_log": False,
+    }
+
+
+def gunicorn_options(host: str, port: int, workers: int, graceful_timeout: int) -> Dict[str, Any]:
+    """Параметры gunicorn с рабочими процессами uvicorn"""
+    return {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "graceful_timeout": graceful_timeout,
+        # Процесс, не ответивший за это время, перезапускается
+        "timeout": max(graceful_timeout * 2, 60),
+        # Все процессы импортируют main.py сами: общий импорт до fork
+        # привязал бы пул соединений и задачи к циклу событий мастера
+        "preload_app": False,
+    }
+
+
+def run_uvicorn(options: Dict[str, Any]):
+    import uvicorn
+    uvicorn.run(APP, **options)
+
+
+def run_gunicorn(options: Dict[str, Any]):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def serve(server: str, host: str, port: int, workers: Optional[int], graceful_timeout: int):
+    """
+    Запуск бэкенда в нескольких процессах.
+
+    С gunicorn (если установлен) доступен плавный перезапуск процессов
+    по сигналу HUP; без него используется менеджер процессов uvicorn.
+    Кэши каждого процесса поддерживаются собственными лентами _changes,
+    поэтому запись, выполненная одним процессом, видна всем остальным.
+    """
+    workers = worker_count(workers)
+    if server == "auto":
+        server = "gunicorn" if available("gunicorn") else "uvicorn"
+    print(f"Запуск бэкенда: {server}, процессов: {workers}, адрес: {host}:{port}")
+    if server == "gunicorn":
+        run_gunicorn(gunicorn_options(host, port, workers, graceful_timeout))
+    else:
+        run_uvicorn(uvicorn_options(host, port, workers, graceful_timeout))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запуск бэкенда в продакшн-режиме")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"), help="Адрес для входящих соединений")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Порт")
+    parser.add_argument("--workers", type=int, default=None, help="Число процессов (по умолчанию по числу ядер)")
+    parser.add_argument("--server", choices=["auto", "uvicorn", "gunicorn"], default="auto", help="Менеджер процессов")
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        help="Время на завершение текущих запросов при остановке, сек",
+    )
+    args = parser.parse_args()
+
+    serve(args.server, args.host, args.port, args.workers, args.graceful_timeout)
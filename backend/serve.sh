@@ -0,0 +1,11 @@
+#!/bin/bash
+
+# Активация виртуального окружения
+source venv/bin/activate
+
+# Запуск бэкенда в продакшн-режиме (несколько процессов, без перезагрузки при изменении кода)
+echo "Запуск бэкенда в продакшн-режиме..."
+python serve.py "$@"
+
+# Деактивация виртуального окружения
+deactivate
@@ -0,0 +1,123 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from doc_cache import rev_generation
+
+
+def server_locations(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Серверы, которые содержит документ, вместе с их зоной и окружением.
+
+    Понимает обе схемы размещения данных: документ зоны со вложенными
+    окружениями (embedded) и отдельный документ сервера (normalized).
+    """
+    if doc.get("type") == "zone":
+        zone_name = doc["_id"][len("zone:"):]
+        return [
+            {"zone": zone_name, "environment": env["name"], "server": server}
+            for env in doc.get("environments", [])
+            for server in env.get("servers", [])
+        ]
+    if doc.get("type") == "server":
+        server = {k: v for k, v in doc.items() if not k.startswith('_') and k not in ("type", "zone", "environment")}
+        return [{"zone": doc["zone"], "environment": doc["environment"], "server": server}]
+    return []
+
+
+class ServerIndex:
+    """
+    Индекс серверов по FQDN и IP-адресу в памяти процесса.
+
+    Строится из полного набора документов при запуске ленты _changes и
+    обновляется по каждому изменению, поэтому поиск сервера не требует
+    чтения всех зон. В отличие от кэша документов индекс не вытесняет
+    записи: он хранит только серверы и занимает мало памяти. Индекс
+    отвечает на запросы только пока он активен.
+    """
+
+    def __init__(self):
+        self._revs: Dict[str, Optional[str]] = {}
+        self._by_doc: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_fqdn: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_ip: Dict[str, List[Dict[str, Any]]] = {}
+        self.active = False
+
+    def by_fqdn(self, fqdn: str) -> List[Dict[str, Any]]:
+        return list(self._by_fqdn.get(fqdn, []))
+
+    def by_ip(self, ip: str) -> List[Dict[str, Any]]:
+        return list(self._by_ip.get(ip, []))
+
+    def put(self, doc: Dict[str, Any]):
+        """Проиндексировать документ, если его ревизия не старше известной"""
+        doc_id = doc.get("_id")
+        if not self.active or not doc_id:
+            return
+        if doc.get("_deleted"):
+            self.invalidate(doc_id)
+            return
+        known_rev = self._revs.get(doc_id)
+        if known_rev is not None and rev_generation(known_rev) > rev_generation(doc.get("_rev")):
+            return
+        self._index(doc)
+
+    def invalidate(self, doc_id: str):
+        self._revs.pop(doc_id, None)
+        for location in self._by_doc.pop(doc_id, []):
+            self._unlink(self._by_fqdn, location["server"].get("fqdn"), location)
+            self._unlink(self._by_ip, location["server"].get("ip"), location)
+
+    def apply_change(self, change: Dict[str, Any]):
+        """Применить запись из ленты _changes"""
+        if change.get("deleted") or "doc" not in change:
+            self.invalidate(change["id"])
+        else:
+            self.put(change["doc"])
+
+    def load(self, docs: Iterable[Dict[str, Any]]):
+        """Построить индекс по полному набору документов и включить его"""
+        self.clear()
+        self.active = True
+        for doc in docs:
+            if not doc.get("_deleted"):
+                self._index(doc)
+
+    def deactivate(self):
+        self.active = False
+        self.clear()
+
+    def clear(self):
+        self._revs.clear()
+        self._by_doc.clear()
+        self._by_fqdn.clear()
+        self._by_ip.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "servers": sum(len(locations) for locations in self._by_doc.values()),
+            "fqdns": len(self._by_fqdn),
+            "ips": len(self._by_ip),
+        }
+
+    def _index(self, doc: Dict[str, Any]):
+        doc_id = doc["_id"]
+        self.invalidate(doc_id)
+        locations = server_locations(doc)
+        self._revs[doc_id] = doc.get("_rev")
+        if not locations:
+            return
+        self._by_doc[doc_id] = locations
+        for location in locations:
+            if location["server"].get("fqdn"):
+                self._by_fqdn.setdefault(location["server"]["fqdn"], []).append(location)
+            if location["server"].get("ip"):
+                self._by_ip.setdefault(location["server"]["ip"], []).append(location)
+
+    @staticmethod
+    def _unlink(index: Dict[str, List[Dict[str, Any]]], key: Optional[str], location: Dict[str, Any]):
+        locations = index.get(key)
+        if not locations:
+            return
+        locations[:] = [item for item in locations if item is not location]
+        if not locations:
+            del index[key]
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных операций.
+
+    Пока операция с ключом key выполняется, остальные вызовы с тем же
+    ключом не запускают ее повторно, а ждут и получают тот же результат
+    (или то же исключение). Операция выполняется в отдельной задаче,
+    поэтому отмена запроса, запустившего ее, не затрагивает остальных
+    ожидающих.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        # Сколько вызовов получили результат чужой операции
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Ошибка забирается здесь, даже если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
+
+    def forget(self, predicate: Callable[[Hashable], bool]):
+        """
+        Не присоединять новые вызовы к выполняющимся операциям, ключи
+        которых удовлетворяют predicate (например, после записи, чтобы
+        следующее чтение не вернуло данные, прочитанные до нее)
+        """
+        for key in [key for key in self._calls if predicate(key)]:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -2,6 +2,12 @@ import pytest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import json
+import uuid
+import asyncio
+from urllib.parse import unquote
+
+import httpx
 
 # Добавляем родительскую директорию в sys.path для импорта модулей
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -40,4 +46,188 @@ def mock_env_vars(monkeypatch):
     monkeypatch.setenv("POUCHDB_URL", "http://localhost:5984")
     monkeypatch.setenv("SECRET_KEY", "test_secret_key")
     monkeypatch.setenv("ALGORITHM", "HS256")
-    monkeypatch.setenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30") 
\ No newline at end of file
+    monkeypatch.setenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+
+class FakePouchDB:
+    """
+    Упрощенная реализация HTTP API PouchDB в памяти.
+
+    Используется как транспорт httpx.MockTransport, чтобы проверять
+    асинхронный клиент без запущенного pouchdb-server.
+    """
+
+    def __init__(self):
+        self.dbs = {}
+        self.requests = []
+        self.seq = 0
+        # Журнал изменений: имя базы -> список (seq, id, rev, deleted)
+        self.changes = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        parts = [unquote(p) for p in request.url.raw_path.decode().split("?")[0].split("/") if p]
+        params = request.url.params
+        db_name = parts[0]
+        if len(parts) == 1:
+            return self._db_request(request, db_name)
+        if db_name not in self.dbs:
+            return httpx.Response(404, json={"error": "not_found", "reason": "no_db_file"})
+        db = self.dbs[db_name]
+        doc_id = "/".join(parts[1:])
+        if doc_id == "_all_docs":
+            if request.method == "POST":
+                return self._all_docs_by_keys(db, params, json.loads(request.content)["keys"])
+            return self._all_docs(db, params)
+        if doc_id == "_changes":
+            return self._changes_longpoll(db_name, params)
+        if doc_id == "_bulk_docs":
+            return self._bulk_docs(db, json.loads(request.content)["docs"])
+        if request.method == "GET":
+            doc = db.get(doc_id)
+            if doc is None:
+                return httpx.Response(404, json={"error": "not_found", "reason": "missing"})
+            return httpx.Response(200, json=doc)
+        if request.method == "PUT":
+            return self._put(db, doc_id, json.loads(request.content))
+        if request.method == "DELETE":
+            doc = db.get(doc_id)
+            if doc is None:
+                return httpx.Response(404, json={"error": "not_found", "reason": "missing"})
+            if params.get("rev") != doc["_rev"]:
+                return httpx.Response(409, json={"error": "conflict"})
+            del db[doc_id]
+            rev = self._next_rev(doc["_rev"])
+            self._log_change(db, doc_id, rev, deleted=True)
+            return httpx.Response(200, json={"ok": True, "id": doc_id, "rev": rev})
+        return httpx.Response(405, json={"error": "method_not_allowed"})
+
+    def _db_request(self, request, db_name):
+        if request.method == "GET":
+            if db_name not in self.dbs:
+                return httpx.Response(404, json={"error": "not_found"})
+            return httpx.Response(200, json={"db_name": db_name, "update_seq": self.seq})
+        if request.method == "PUT":
+            if db_name in self.dbs:
+                return httpx.Response(412, json={"error": "file_exists"})
+            self.dbs[db_name] = {}
+            return httpx.Response(201, json={"ok": True})
+        if request.method == "POST":
+            doc = json.loads(request.content)
+            return self._put(self.dbs.setdefault(db_name, {}), uuid.uuid4().hex, doc)
+        return httpx.Response(405, json={"error": "method_not_allowed"})
+
+    @staticmethod
+    def _next_rev(rev):
+        number = int(rev.split("-")[0]) if rev else 0
+        return f"{number + 1}-{uuid.uuid4().hex[:8]}"
+
+    def _put(self, db, doc_id, doc):
+        existing = db.get(doc_id)
+        if existing is not None and doc.get("_rev") != existing["_rev"]:
+            return httpx.Response(409, json={"error": "conflict", "reason": "Document update conflict."})
+        if existing is None and doc.get("_rev"):
+            return httpx.Response(409, json={"error": "conflict", "reason": "Document update conflict."})
+        stored = dict(doc, _id=doc_id, _rev=self._next_rev(existing["_rev"] if existing else None))
+        db[doc_id] = stored
+        self._log_change(db, doc_id, stored["_rev"])
+        return httpx.Response(201, json={"ok": True, "id": doc_id, "rev": stored["_rev"]})
+
+    def _bulk_docs(self, db, docs):
+        results = []
+        for doc in docs:
+            doc_id = doc.get("_id") or uuid.uuid4().hex
+            existing = db.get(doc_id)
+            if doc.get("_deleted"):
+                if existing is None or doc.get("_rev") != existing["_rev"]:
+                    results.append({"id": doc_id, "error": "conflict", "reason": "Document update conflict."})
+                    continue
+                del db[doc_id]
+                rev = self._next_rev(existing["_rev"])
+                self._log_change(db, doc_id, rev, deleted=True)
+                results.append({"ok": True, "id": doc_id, "rev": rev})
+                continue
+            response = self._put(db, doc_id, doc)
+            body = json.loads(response.content)
+            if response.status_code == 201:
+                results.append({"ok": True, "id": doc_id, "rev": body["rev"]})
+            else:
+                results.append({"id": doc_id, "error": body["error"], "reason": body.get("reason")})
+        return httpx.Response(201, json=results)
+
+    def _all_docs_by_keys(self, db, params, keys):
+        rows = []
+        for key in keys:
+            if key in db:
+                row = {"id": key, "key": key, "value": {"rev": db[key]["_rev"]}}
+                if params.get("include_docs") == "true":
+                    row["doc"] = db[key]
+                rows.append(row)
+            else:
+                rows.append({"key": key, "error": "not_found"})
+        return httpx.Response(200, json={"total_rows": len(db), "rows": rows})
+
+    def _all_docs(self, db, params):
+        include_docs = params.get("include_docs") == "true"
+        startkey = json.loads(params["startkey"]) if "startkey" in params else None
+        endkey = json.loads(params["endkey"]) if "endkey" in params else None
+        limit = int(params["limit"]) if "limit" in params else None
+        rows = []
+        for doc_id in sorted(db):
+            if startkey is not None and doc_id < startkey:
+                continue
+            if endkey is not None and doc_id > endkey:
+                break
+            row = {"id": doc_id, "key": doc_id, "value": {"rev": db[doc_id]["_rev"]}}
+            if include_docs:
+                row["doc"] = db[doc_id]
+            rows.append(row)
+            if limit is not None and len(rows) == limit:
+                break
+        return httpx.Response(200, json={"total_rows": len(db), "offset": 0, "rows": rows})
+
+    def _log_change(self, db, doc_id, rev, deleted=False):
+        self.seq += 1
+        db_name = next(name for name, value in self.dbs.items() if value is db)
+        self.changes.setdefault(db_name, []).append((self.seq, doc_id, rev, deleted))
+
+    async def _changes_longpoll(self, db_name, params):
+        since = int(params.get("since", 0))
+        entries = [entry for entry in self.changes.get(db_name, []) if entry[0] > since]
+        if not entries:
+            # Имитируем ожидание новых изменений
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"results": [], "last_seq": since})
+        latest = {}
+        for seq, doc_id, rev, deleted in entries:
+            latest[doc_id] = (seq, rev, deleted)
+        results = []
+        for doc_id, (seq, rev, deleted) in sorted(latest.items(), key=lambda item: item[1][0]):
+            change = {"seq": seq, "id": doc_id, "changes": [{"rev": rev}]}
+            if deleted:
+                change["deleted"] = True
+            elif params.get("include_docs") == "true":
+                change["doc"] = self.dbs[db_name][doc_id]
+            results.append(change)
+        return httpx.Response(200, json={"results": results, "last_seq": entries[-1][0]})
+
+    def put_doc(self, db_name, doc):
+        """Положить документ в базу напрямую, минуя HTTP"""
+        db = self.dbs.setdefault(db_name, {})
+        stored = dict(doc, _rev=self._next_rev(db.get(doc["_id"], {}).get("_rev")))
+        db[doc["_id"]] = stored
+        self._log_change(db, doc["_id"], stored["_rev"])
+        return stored
+
+
+@pytest.fixture
+def fake_pouchdb():
+    """Фикстура с пустой базой PouchDB в памяти"""
+    return FakePouchDB()
+
+
+@pytest.fixture
+def pouchdb_client(fake_pouchdb):
+    """Фикстура асинхронного клиента, подключенного к базе в памяти"""
+    from pouchdb_client import PouchDBClient
+    return PouchDBClient("http://pouchdb.test", transport=httpx.MockTransport(fake_pouchdb))
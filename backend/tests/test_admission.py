@@ -0,0 +1,268 @@
+import pytest
+import sys
+import os
+import asyncio
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import (
+    AdmissionController, AdmissionMiddleware, Overloaded, PRIORITY_BULK, PRIORITY_READ, PRIORITY_WRITE,
+    admission_scope, current_request, default_priority
+)
+
+class TestAdmissionController:
+    """Тесты для ограничения одновременных обращений к базе"""
+
+    def test_waits_for_free_slot(self):
+        """Тест ожидания освобождения слота"""
+        admission = AdmissionController(max_concurrency=1)
+        waits = []
+        admission.observer = lambda priority, waited: waits.append(priority)
+
+        async def scenario():
+            await admission.acquire(PRIORITY_READ)
+            waiter = asyncio.create_task(admission.acquire(PRIORITY_READ))
+            await asyncio.sleep(0)
+            assert not waiter.done()
+            assert admission.queue_depth()["read"] == 1
+            admission.release()
+            await waiter
+            admission.release()
+
+        asyncio.run(scenario())
+
+        assert admission.active == 0
+        assert waits == ["read", "read"]
+
+    def test_priority_order(self):
+        """Тест обслуживания чтений раньше записей и пакетных операций"""
+        admission = AdmissionController(max_concurrency=1)
+        order = []
+
+        async def request(priority):
+            await admission.acquire(priority)
+            order.append(priority)
+            admission.release()
+
+        async def scenario():
+            await admission.acquire(PRIORITY_WRITE)
+            tasks = [asyncio.create_task(request(priority))
+                     for priority in (PRIORITY_BULK, PRIORITY_WRITE, PRIORITY_READ)]
+            await asyncio.sleep(0)
+            admission.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(scenario())
+
+        assert order == [PRIORITY_READ, PRIORITY_WRITE, PRIORITY_BULK]
+
+    def test_queue_full(self):
+        """Тест немедленного отказа при заполненной очереди"""
+        admission = AdmissionController(max_concurrency=1, max_queue=1, retry_after=3)
+
+        async def scenario():
+            await admission.acquire(PRIORITY_READ)
+            waiter = asyncio.create_task(admission.acquire(PRIORITY_READ))
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded) as exc_info:
+                await admission.acquire(PRIORITY_WRITE)
+            admission.release()
+            await waiter
+            admission.release()
+            return exc_info.value
+
+        error = asyncio.run(scenario())
+
+        assert error.retry_after == 3
+        assert admission.rejected == {"read": 0, "write": 1, "bulk": 0}
+
+    def test_bulk_is_shed(self):
+        """Тест вытеснения пакетной операции из заполненной очереди чтением"""
+        admission = AdmissionController(max_concurrency=1, max_queue=1)
+
+        async def scenario():
+            await admission.acquire(PRIORITY_WRITE)
+            bulk = asyncio.create_task(admission.acquire(PRIORITY_BULK))
+            await asyncio.sleep(0)
+            read = asyncio.create_task(admission.acquire(PRIORITY_READ))
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded):
+                await bulk
+            admission.release()
+            await read
+            admission.release()
+
+        asyncio.run(scenario())
+
+        assert admission.rejected["bulk"] == 1
+        assert admission.active == 0
+
+    def test_queue_timeout(self):
+        """Тест отказа после слишком долгого ожидания"""
+        admission = AdmissionController(max_concurrency=1, queue_timeout=0.01)
+
+        async def scenario():
+            await admission.acquire(PRIORITY_READ)
+            with pytest.raises(Overloaded):
+                await admission.acquire(PRIORITY_READ)
+            admission.release()
+
+        asyncio.run(scenario())
+
+        assert admission.active == 0
+        assert admission.queue_depth()["read"] == 0
+
+    def test_admitted_calls_are_not_shed(self):
+        """Тест ожидания без отказа для обращений допущенного запроса"""
+        admission = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=0.001)
+        order = []
+
+        async def admitted_call():
+            await admission.acquire(PRIORITY_BULK, sheddable=False)
+            order.append("admitted")
+            admission.release()
+
+        async def scenario():
+            await admission.acquire(PRIORITY_READ)
+            task = asyncio.create_task(admitted_call())
+            await asyncio.sleep(0.01)
+            with pytest.raises(Overloaded):
+                await admission.acquire(PRIORITY_READ)
+            admission.release()
+            await task
+
+        asyncio.run(scenario())
+
+        assert order == ["admitted"]
+        assert admission.rejected == {"read": 1, "write": 0, "bulk": 0}
+        assert admission.active == 0
+
+    def test_admitted_calls_go_first(self):
+        """Тест обслуживания допущенных запросов раньше новых"""
+        admission = AdmissionController(max_concurrency=1)
+        order = []
+
+        async def call(name, priority, sheddable):
+            await admission.acquire(priority, sheddable=sheddable)
+            order.append(name)
+            admission.release()
+
+        async def scenario():
+            await admission.acquire(PRIORITY_READ)
+            tasks = [asyncio.create_task(call("new", PRIORITY_READ, True)),
+                     asyncio.create_task(call("admitted", PRIORITY_BULK, False))]
+            await asyncio.sleep(0)
+            admission.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(scenario())
+
+        assert order == ["admitted", "new"]
+
+    def test_admit(self):
+        """Тест допуска запроса без занятия слота"""
+        admission = AdmissionController(max_concurrency=0, max_queue=0)
+
+        async def scenario():
+            with admission_scope(PRIORITY_BULK):
+                with pytest.raises(Overloaded):
+                    await admission.admit()
+                assert not current_request().admitted
+            with admission_scope(PRIORITY_BULK, admitted=True):
+                await admission.admit()
+
+        asyncio.run(scenario())
+
+        assert admission.rejected["bulk"] == 1
+
+    def test_cancelled_waiter_releases_slot(self):
+        """Тест возврата слота, переданного отмененному обращению"""
+        admission = AdmissionController(max_concurrency=1)
+
+        async def scenario():
+            await admission.acquire(PRIORITY_READ)
+            waiter = asyncio.create_task(admission.acquire(PRIORITY_READ))
+            await asyncio.sleep(0)
+            admission.release()
+            waiter.cancel()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                pass
+            else:
+                # Отмена пришла после передачи слота, и обращение его получило
+                admission.release()
+
+        asyncio.run(scenario())
+
+        assert admission.active == 0
+
+class TestAdmissionMiddleware:
+    """Тесты для приоритета обращений HTTP-запроса"""
+
+    def test_priority_by_method(self):
+        """Тест приоритета чтения для GET и записи для остальных методов"""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(current_request().priority)
+
+        middleware = AdmissionMiddleware(app)
+        for method in ("GET", "POST"):
+            asyncio.run(middleware({"type": "http", "method": method, "path": "/"}, None, None))
+
+        assert seen == [PRIORITY_READ, PRIORITY_WRITE]
+        assert current_request() is None
+        assert default_priority({"method": "HEAD"}) == PRIORITY_READ
+
+    def test_admitted_after_response_start(self):
+        """Тест допуска запроса, начавшего отдавать ответ"""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(current_request().admitted)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            seen.append(current_request().admitted)
+
+        async def send(message):
+            pass
+
+        middleware = AdmissionMiddleware(app)
+        asyncio.run(middleware({"type": "http", "method": "GET", "path": "/"}, None, send))
+
+        assert seen == [False, True]
+
+    def test_second_call_of_request_waits(self, pouchdb_client, fake_pouchdb):
+        """Тест ожидания вместо отказа для второго обращения запроса"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        admission = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=0.001)
+        pouchdb_client.admission = admission
+
+        async def hold_slot():
+            await admission.acquire(PRIORITY_READ)
+            await asyncio.sleep(0.02)
+            admission.release()
+
+        async def scenario():
+            with admission_scope(PRIORITY_WRITE):
+                doc = await pouchdb_client.get_doc("test_db", "doc1")
+                holder = asyncio.create_task(hold_slot())
+                await asyncio.sleep(0)
+                doc["value"] = 2
+                await pouchdb_client.save_doc("test_db", doc)
+                await holder
+
+        asyncio.run(scenario())
+
+        assert fake_pouchdb.dbs["test_db"]["doc1"]["value"] == 2
+        assert admission.rejected["write"] == 0
+
+    def test_client_outside_request_not_limited(self, pouchdb_client, fake_pouchdb):
+        """Тест обращений к базе вне HTTP-запроса без ограничения"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        pouchdb_client.admission = AdmissionController(max_concurrency=0, max_queue=0)
+
+        doc = asyncio.run(pouchdb_client.get_doc("test_db", "doc1"))
+
+        assert doc["value"] == 1
@@ -10,11 +10,8 @@ from fastapi import Depends
 # Добавляем родительскую директорию в sys.path для импорта модулей
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Мокаем create_db_if_not_exists перед импортом main
-with patch('requests.put') as mock_put:
-    mock_put.return_value.status_code = 201
-    # Импортируем приложение FastAPI из main.py
-    from main import app, get_user, authenticate_user, create_access_token, get_current_user, oauth2_scheme
+# Импортируем приложение FastAPI из main.py
+from main import app, get_user, authenticate_user, create_access_token, get_current_user, oauth2_scheme
 
 # Импортируем TestClient после импорта app
 from fastapi.testclient import TestClient
@@ -56,7 +53,7 @@ def mock_dependencies(monkeypatch):
     monkeypatch.setattr(jwt, "decode", mock_jwt_decode)
     
     # Мокаем get_all_docs - возвращаем структуру, соответствующую CouchDB
-    def mock_get_all_docs(*args, **kwargs):
+    async def mock_get_all_docs(*args, **kwargs):
         return {
             "total_rows": 2,
             "offset": 0,
@@ -79,7 +76,7 @@ def mock_dependencies(monkeypatch):
     monkeypatch.setattr("main.get_all_docs", mock_get_all_docs)
     
     # Мокаем get_doc
-    def mock_get_doc(db_name, doc_id):
+    async def mock_get_doc(db_name, doc_id):
         if doc_id == "zone:zone1":
             return {"_id": "zone:zone1", "name": "zone1", "type": "zone", "environments": [{"name": "prod", "servers": []}]}
         elif doc_id == "user:testuser":
@@ -89,13 +86,13 @@ def mock_dependencies(monkeypatch):
     monkeypatch.setattr("main.get_doc", mock_get_doc)
     
     # Мокаем save_doc
-    def mock_save_doc(db_name, doc):
+    async def mock_save_doc(db_name, doc):
         return True
     
     monkeypatch.setattr("main.save_doc", mock_save_doc)
     
     # Мокаем delete_doc
-    def mock_delete_doc(db_name, doc_id):
+    async def mock_delete_doc(db_name, doc_id):
         return True
     
     monkeypatch.setattr("main.delete_doc", mock_delete_doc)
@@ -0,0 +1,104 @@
+import pytest
+import sys
+import os
+from datetime import timedelta
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from main import app
+from auth_cache import ExpiringCache, UserCache
+from api_keys import generate_api_key, parse_api_key, verify_api_key
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+class TestApiKeyFunctions:
+    """Тесты для генерации и проверки ключей API"""
+
+    def test_generate_and_verify(self):
+        """Тест проверки секрета ключа"""
+        key, doc = generate_api_key("admin", "ci", "hmac-key")
+        key_id, secret = parse_api_key(key)
+
+        assert doc["_id"] == f"apikey:{key_id}"
+        assert secret not in str(doc)
+        assert verify_api_key(doc, secret, "hmac-key")
+        assert not verify_api_key(doc, secret + "x", "hmac-key")
+        assert not verify_api_key(doc, secret, "other-key")
+        assert not verify_api_key(dict(doc, revoked=True), secret, "hmac-key")
+
+    @pytest.mark.parametrize("key", ["", "abc.def", "sk_", "sk_abc", "sk_.secret"])
+    def test_parse_invalid(self, key):
+        """Тест ключей неверного формата"""
+        assert parse_api_key(key) is None
+
+@pytest.fixture
+def keys_db(monkeypatch, pouchdb_client, fake_pouchdb):
+    """Фикстура API с базой пользователей в памяти и активными кэшами"""
+    monkeypatch.setattr(main, "db", pouchdb_client)
+    monkeypatch.setattr(main, "user_cache", UserCache(max_entries=10, ttl=60))
+    monkeypatch.setattr(main, "api_key_cache", UserCache(max_entries=10, ttl=60, prefix="apikey:"))
+    monkeypatch.setattr(main, "token_cache", ExpiringCache(max_entries=10))
+    fake_pouchdb.dbs["users"] = {}
+    fake_pouchdb.put_doc("users", {
+        "_id": "user:admin", "username": "admin", "disabled": False, "hashed_password": "hash",
+    })
+    return fake_pouchdb
+
+def bearer():
+    token = main.create_access_token({"sub": "admin"}, timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+class TestApiKeysApi:
+    """Тесты API ключей"""
+
+    def test_key_lifecycle(self, keys_db, mocker):
+        """Тест создания, использования и отзыва ключа"""
+        verify_password = mocker.spy(main, "verify_password")
+        created = client.post("/api-keys", json={"name": "ci"}, headers=bearer()).json()
+        api_key = {"Authorization": f"ApiKey {created['key']}"}
+
+        me = client.get("/users/me", headers=api_key)
+        listed = client.get("/api-keys", headers=api_key).json()
+        revoked = client.delete(f"/api-keys/{created['id']}", headers=bearer())
+        after_revoke = client.get("/users/me", headers=api_key)
+
+        assert me.status_code == 200
+        assert me.json()["username"] == "admin"
+        assert listed == [{"id": created["id"], "name": "ci", "created_at": created["created_at"], "revoked": False}]
+        assert revoked.status_code == 200
+        assert after_revoke.status_code == 401
+        assert verify_password.call_count == 0
+
+    def test_key_cached(self, keys_db):
+        """Тест проверки ключа без чтения базы при активном кэше"""
+        created = client.post("/api-keys", json={"name": "bot"}, headers=bearer()).json()
+        main.api_key_cache.active = True
+        main.user_cache.active = True
+        client.get("/users/me", headers={"Authorization": f"ApiKey {created['key']}"})
+        keys_db.requests.clear()
+
+        response = client.get("/users/me", headers={"Authorization": f"ApiKey {created['key']}"})
+
+        assert response.status_code == 200
+        assert keys_db.requests == []
+
+    @pytest.mark.parametrize("header", [None, "ApiKey sk_missing.secret", "ApiKey garbage", "Basic abc"])
+    def test_invalid_credentials(self, keys_db, header):
+        """Тест отказа при отсутствии или неверном ключе"""
+        headers = {"Authorization": header} if header else {}
+
+        response = client.get("/users/me", headers=headers)
+
+        assert response.status_code == 401
+
+    def test_revoke_foreign_key(self, keys_db):
+        """Тест отзыва чужого ключа"""
+        _, doc = generate_api_key("other", "bot", main.API_KEY_SECRET)
+        keys_db.put_doc("users", doc)
+
+        response = client.delete(f"/api-keys/{doc['_id'][len('apikey:'):]}", headers=bearer())
+
+        assert response.status_code == 404
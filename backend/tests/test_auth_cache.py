@@ -0,0 +1,133 @@
+import pytest
+import sys
+import os
+import asyncio
+from datetime import timedelta
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from auth_cache import ExpiringCache, UserCache
+from changes_feed import ChangesFollower
+from jose import jwt
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def user_doc(username, disabled=False):
+    return {"_id": f"user:{username}", "username": username, "disabled": disabled, "hashed_password": "hash"}
+
+class TestExpiringCache:
+    """Тесты для кэша с ограниченным временем жизни записей"""
+
+    def test_expiry_and_lru(self):
+        """Тест истечения записей и вытеснения давно не читавшихся"""
+        clock = FakeClock()
+        cache = ExpiringCache(max_entries=2, clock=clock)
+        cache.put("a", 1, expires_at=1010)
+        cache.put("b", 2, expires_at=1100)
+        cache.get("a")
+        cache.put("c", 3, expires_at=1100)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        clock.now = 1010
+        assert cache.get("a") is None
+        assert cache.get("c") == 3
+        assert cache.stats()["entries"] == 1
+
+    def test_stale_read_not_stored(self):
+        """Тест защиты от записи значения, прочитанного до инвалидации"""
+        cache = ExpiringCache(max_entries=10)
+        version = cache.version
+
+        cache.invalidate("a")
+        cache.put("a", "old", expires_at=float("inf"), version=version)
+
+        assert cache.get("a") is None
+
+class TestUserCache:
+    """Тесты для кэша пользователей"""
+
+    def test_inactive_cache(self):
+        """Тест неактивного кэша без ленты изменений"""
+        cache = UserCache(max_entries=10, ttl=60)
+
+        cache.remember("admin", "user", cache.version)
+
+        assert cache.get("admin") is None
+
+    def test_ttl_and_changes(self):
+        """Тест сброса записи по ленте изменений и по истечении TTL"""
+        cache = UserCache(max_entries=10, ttl=60)
+        cache.clock = clock = FakeClock()
+        asyncio.run(cache.activate())
+
+        cache.remember("admin", "admin-user", cache.version)
+        cache.remember("guest", "guest-user", cache.version)
+        cache.apply_change({"id": "user:admin", "changes": [{"rev": "2-b"}]})
+
+        assert cache.get("admin") is None
+        assert cache.get("guest") == "guest-user"
+        clock.now += 60
+        assert cache.get("guest") is None
+
+@pytest.fixture
+def auth_db(monkeypatch, pouchdb_client, fake_pouchdb):
+    """Фикстура main.py с базой пользователей в памяти и новыми кэшами"""
+    monkeypatch.setattr(main, "db", pouchdb_client)
+    monkeypatch.setattr(main, "user_cache", UserCache(max_entries=10, ttl=60))
+    monkeypatch.setattr(main, "token_cache", ExpiringCache(max_entries=10))
+    fake_pouchdb.dbs["users"] = {}
+    return fake_pouchdb
+
+class TestAuthCaching:
+    """Тесты кэширования пользователей и токенов в main.py"""
+
+    def test_user_read_once_and_disabled_by_feed(self, auth_db, pouchdb_client):
+        """Тест чтения пользователя из кэша и отключения пользователя через ленту"""
+        auth_db.put_doc("users", user_doc("admin"))
+
+        async def scenario():
+            follower = ChangesFollower(
+                pouchdb_client, "users",
+                on_change=main.user_cache.apply_change,
+                on_reset=main.user_cache.activate,
+                on_error=main.user_cache.deactivate,
+            )
+            follower.start()
+            await asyncio.sleep(0.05)
+            await main.get_user("admin")
+            auth_db.requests.clear()
+            cached = await main.get_user("admin")
+            reads = len(auth_db.requests)
+
+            auth_db.put_doc("users", user_doc("admin", disabled=True))
+            await asyncio.sleep(0.05)
+            updated = await main.get_user("admin")
+            await follower.stop()
+            return cached, reads, updated
+
+        cached, reads, updated = asyncio.run(scenario())
+
+        assert cached.username == "admin"
+        assert reads == 0
+        assert updated.disabled is True
+
+    def test_token_claims_cached(self, auth_db, mocker):
+        """Тест повторного использования разобранного токена без проверки подписи"""
+        auth_db.put_doc("users", user_doc("admin"))
+        token = main.create_access_token({"sub": "admin"}, timedelta(minutes=5))
+        decode = mocker.spy(jwt, "decode")
+
+        first = asyncio.run(main.get_current_user(token, None))
+        second = asyncio.run(main.get_current_user(token, None))
+
+        assert first.username == second.username == "admin"
+        assert decode.call_count == 1
+        assert main.token_cache.stats()["hits"] == 1
@@ -0,0 +1,116 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bootstrap import StartupTimer, retry_with_backoff
+from fastapi.testclient import TestClient
+
+class TestRetryWithBackoff:
+    """Тесты для повторов с экспоненциальной паузой"""
+
+    def test_retries_until_success(self, monkeypatch):
+        """Тест повторов до успешной попытки"""
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 4:
+                raise ConnectionError("PouchDB недоступен")
+            return "ok"
+
+        result = asyncio.run(retry_with_backoff(flaky, attempts=5, initial_delay=1, max_delay=3))
+
+        assert result == "ok"
+        assert delays == [1, 2, 3]
+
+    def test_gives_up(self, monkeypatch):
+        """Тест исключения после последней попытки"""
+        async def fake_sleep(delay):
+            pass
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+        async def failing():
+            raise ConnectionError("PouchDB недоступен")
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(retry_with_backoff(failing, attempts=3))
+
+    def test_unlimited_attempts(self, monkeypatch):
+        """Тест повторов без ограничения числа попыток"""
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 30:
+                raise ConnectionError("PouchDB недоступен")
+            return "ok"
+
+        result = asyncio.run(retry_with_backoff(flaky, attempts=0, initial_delay=1, max_delay=10))
+
+        assert result == "ok"
+        assert len(delays) == 29 and max(delays) == 10
+
+def test_startup_timer():
+    """Тест замеров времени запуска"""
+    timer = StartupTimer(time.perf_counter() - 1)
+    with timer.step("db"):
+        pass
+    timer.ready()
+
+    report = timer.report()
+    assert report["ready"]
+    assert report["ready_after"] >= 1
+    assert set(report["steps"]) == {"db"}
+    assert timer.summary().startswith("Запуск:")
+
+class TestLifespan:
+    """Тесты запуска бэкенда"""
+
+    def test_bootstrap_in_background(self, monkeypatch, pouchdb_client, fake_pouchdb):
+        """Тест подготовки базы данных в фоне после запуска"""
+        monkeypatch.setattr(main, "db", pouchdb_client)
+        monkeypatch.setattr(main, "ZONE_CACHE_ENABLED", False)
+        monkeypatch.setattr(main, "USER_CACHE_ENABLED", False)
+        monkeypatch.setattr(main, "startup_timer", StartupTimer())
+        monkeypatch.setattr(main, "get_password_hash", lambda password: "hash")
+
+        with TestClient(main.app) as client:
+            for _ in range(100):
+                health = client.get("/health").json()
+                if health["ready"]:
+                    break
+                time.sleep(0.01)
+
+        assert health["ready"]
+        assert {"import_and_setup", "create_databases", "create_admin_user"} <= set(health["steps"])
+        assert set(fake_pouchdb.dbs) >= {"server_resources", "users"}
+        assert fake_pouchdb.dbs["users"]["user:admin"]["hashed_password"] == "hash"
+
+    def test_health_not_ready(self, monkeypatch):
+        """Тест ответа 503 до завершения подготовки"""
+        monkeypatch.setattr(main, "startup_timer", StartupTimer())
+        monkeypatch.setattr(main, "bootstrap_task", None)
+
+        response = TestClient(main.app).get("/health")
+
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
@@ -0,0 +1,131 @@
+import pytest
+import sys
+import os
+import json
+import asyncio
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression import CompressionMiddleware, GzipEncoder, choose_encoding
+
+ZONES = [{"name": f"zone{i}", "environments": [{"name": "prod", "servers": []}]} for i in range(100)]
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+@app.get("/large")
+async def large():
+    return ZONES
+
+@app.get("/small")
+async def small():
+    return {"name": "alpha"}
+
+@app.get("/stream")
+async def stream():
+    async def lines():
+        for zone in ZONES[:3]:
+            yield json.dumps(zone) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/gzip-file")
+async def gzip_file():
+    return Response(b"x" * 1000, media_type="application/gzip")
+
+@app.get("/etag")
+async def etag():
+    return JSONResponse(ZONES, headers={"ETag": '"1-a"'})
+
+@app.get("/not-modified")
+async def not_modified():
+    return Response(status_code=304, headers={"ETag": '"1-a"'})
+
+client = TestClient(app)
+
+class TestCompressionMiddleware:
+    """Тесты для сжатия ответов"""
+
+    def test_large_response_compressed(self):
+        """Тест сжатия большого ответа"""
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert int(response.headers["Content-Length"]) < len(json.dumps(ZONES))
+        assert response.json() == ZONES
+
+    def test_weak_etag_when_compressed(self):
+        """Тест слабого ETag у сжатого ответа"""
+        compressed = client.get("/etag", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/etag", headers={"Accept-Encoding": "identity"})
+
+        assert compressed.headers["Content-Encoding"] == "gzip"
+        assert compressed.headers["ETag"] == 'W/"1-a"'
+        assert identity.headers["ETag"] == '"1-a"'
+
+    def test_small_and_unsupported(self):
+        """Тест ответов, которые не сжимаются"""
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+        refused = client.get("/large", headers={"Accept-Encoding": "gzip;q=0"})
+        binary = client.get("/gzip-file", headers={"Accept-Encoding": "gzip"})
+        not_modified = client.get("/not-modified", headers={"Accept-Encoding": "gzip"})
+
+        assert "Content-Encoding" not in small.headers
+        assert "Content-Encoding" not in identity.headers
+        assert "Content-Encoding" not in refused.headers
+        assert "Content-Encoding" not in binary.headers
+        assert not_modified.status_code == 304
+        assert "Content-Encoding" not in not_modified.headers
+
+    def test_streaming_response(self):
+        """Тест сжатия потокового ответа по частям"""
+        messages = []
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+            "query_string": b"", "headers": [(b"accept-encoding", b"gzip")], "scheme": "http",
+            "server": ("testserver", 80), "client": ("testclient", 50000), "http_version": "1.1",
+        }
+        asyncio.run(app(scope, receive, send))
+
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        decompressor = zlib.decompressobj(31)
+        # Каждая строка NDJSON декодируется сразу: данные не задерживаются в буфере
+        lines = [decompressor.decompress(message["body"]) for message in messages[1:]]
+        assert [json.loads(line) for line in lines if line] == ZONES[:3]
+        assert not messages[-1].get("more_body", False)
+
+    def test_choose_encoding(self):
+        """Тест выбора кодировки по весам Accept-Encoding"""
+        encoders = {"zstd": None, "br": None, "gzip": GzipEncoder}
+
+        assert choose_encoding("gzip, br", encoders) == "br"
+        assert choose_encoding("gzip;q=1.0, br;q=0.5", encoders) == "gzip"
+        assert choose_encoding("*", encoders) == "zstd"
+        assert choose_encoding("zstd;q=0, *;q=0.1", encoders) == "br"
+        assert choose_encoding("deflate", encoders) is None
+        assert choose_encoding("", encoders) is None
+
+    @pytest.mark.parametrize("module, encoding", [("zstandard", "zstd"), ("brotli", "br")])
+    def test_optional_encodings(self, module, encoding):
+        """Тест сжатия zstd и brotli, если библиотеки установлены"""
+        pytest.importorskip(module)
+
+        response = client.get("/large", headers={"Accept-Encoding": encoding})
+
+        assert response.headers["Content-Encoding"] == encoding
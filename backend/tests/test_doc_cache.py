@@ -0,0 +1,155 @@
+import pytest
+import sys
+import os
+import asyncio
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from doc_cache import DocumentCache, rev_generation
+from changes_feed import ChangesFollower
+
+def zone_doc(name, rev="1-a", **fields):
+    return dict({"_id": f"zone:{name}", "_rev": rev, "name": name, "type": "zone", "environments": []}, **fields)
+
+class TestDocumentCache:
+    """Тесты для кэша документов"""
+
+    def test_inactive_cache_returns_nothing(self):
+        """Тест неактивного кэша"""
+        cache = DocumentCache(max_bytes=10000, prefixes=("zone:",))
+
+        cache.put(zone_doc("alpha"))
+
+        assert cache.get("zone:alpha") is None
+        assert not cache.authoritative
+
+    def test_hits_and_misses(self):
+        """Тест счетчиков попаданий и промахов"""
+        cache = DocumentCache(max_bytes=10000, prefixes=("zone:",))
+        cache.load([zone_doc("alpha")])
+
+        assert cache.get("zone:alpha")["name"] == "alpha"
+        assert cache.get("zone:beta") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_ignores_other_prefixes(self):
+        """Тест игнорирования документов с другими префиксами"""
+        cache = DocumentCache(max_bytes=10000, prefixes=("zone:",))
+        cache.load([zone_doc("alpha"), {"_id": "user:admin", "_rev": "1-a"}])
+
+        cache.put({"_id": "audit:1", "_rev": "1-a"})
+
+        assert cache.stats()["entries"] == 1
+
+    def test_older_revision_is_ignored(self):
+        """Тест защиты от устаревшей ревизии"""
+        cache = DocumentCache(max_bytes=10000)
+        cache.load([zone_doc("alpha", rev="3-c", environments=[{"name": "prod", "servers": []}])])
+
+        cache.put(zone_doc("alpha", rev="2-b"))
+
+        assert cache.get("zone:alpha")["_rev"] == "3-c"
+        assert rev_generation("12-abc") == 12
+
+    def test_apply_change(self):
+        """Тест применения записей ленты изменений"""
+        cache = DocumentCache(max_bytes=10000)
+        cache.load([zone_doc("alpha")])
+
+        cache.apply_change({"id": "zone:beta", "doc": zone_doc("beta")})
+        cache.apply_change({"id": "zone:alpha", "deleted": True})
+
+        assert [doc["name"] for doc in cache.scan("zone:")] == ["beta"]
+
+    def test_scan_range(self):
+        """Тест выборки по префиксу с началом диапазона и ограничением"""
+        cache = DocumentCache(max_bytes=100000)
+        cache.load([zone_doc(name) for name in ("delta", "alpha", "charlie", "bravo")])
+        cache.put({"_id": "env:alpha:prod", "_rev": "1-a", "type": "environment"})
+        cache.invalidate("zone:charlie")
+
+        assert [doc["name"] for doc in cache.scan("zone:")] == ["alpha", "bravo", "delta"]
+        assert [doc["name"] for doc in cache.scan("zone:", start="zone:b", limit=1)] == ["bravo"]
+        assert [doc["_id"] for doc in cache.scan("env:alpha:")] == ["env:alpha:prod"]
+
+    def test_memory_budget(self):
+        """Тест вытеснения документов при превышении бюджета памяти"""
+        doc_size = len('{"_id":"zone:a","_rev":"1-a","name":"a","type":"zone","environments":[]}')
+        cache = DocumentCache(max_bytes=doc_size * 2)
+        cache.load([zone_doc("a"), zone_doc("b")])
+        assert cache.authoritative
+
+        cache.get("zone:a")
+        cache.put(zone_doc("c"))
+
+        # Вытеснен давно не читавшийся документ b
+        assert cache.get("zone:b") is None
+        assert cache.get("zone:a") is not None
+        assert cache.size <= cache.max_bytes
+        assert cache.stats()["evictions"] == 1
+        assert not cache.authoritative
+
+    def test_deactivate(self):
+        """Тест выключения кэша"""
+        cache = DocumentCache(max_bytes=10000)
+        cache.load([zone_doc("alpha")])
+
+        cache.deactivate()
+
+        assert cache.get("zone:alpha") is None
+        assert cache.stats()["entries"] == 0
+
+class TestChangesFollower:
+    """Тесты для ленты изменений"""
+
+    def test_follow_changes(self, pouchdb_client, fake_pouchdb):
+        """Тест поддержания кэша в актуальном состоянии по ленте изменений"""
+        fake_pouchdb.put_doc("server_resources", zone_doc("alpha"))
+        cache = DocumentCache(max_bytes=10000, prefixes=("zone:",))
+
+        async def load():
+            result = await pouchdb_client.get_docs_by_prefix("server_resources", "zone:")
+            cache.load(row["doc"] for row in result["rows"])
+
+        async def scenario():
+            follower = ChangesFollower(
+                pouchdb_client, "server_resources",
+                on_change=cache.apply_change, on_reset=load, on_error=cache.deactivate,
+            )
+            follower.start()
+            await asyncio.sleep(0.05)
+            assert cache.get("zone:alpha")["name"] == "alpha"
+
+            # Изменения другого процесса доходят до кэша через ленту
+            fake_pouchdb.put_doc("server_resources", zone_doc("beta"))
+            await pouchdb_client.delete_doc("server_resources", "zone:alpha")
+            await asyncio.sleep(0.05)
+            names = [doc["name"] for doc in cache.scan("zone:")]
+            await follower.stop()
+            return names
+
+        assert asyncio.run(scenario()) == ["beta"]
+
+    def test_error_deactivates_cache(self, pouchdb_client, fake_pouchdb):
+        """Тест выключения кэша при ошибке ленты изменений"""
+        cache = DocumentCache(max_bytes=10000)
+        cache.load([zone_doc("alpha")])
+
+        async def scenario():
+            # Базы нет, поэтому чтение ленты завершается ошибкой
+            follower = ChangesFollower(
+                pouchdb_client, "missing_db",
+                on_change=cache.apply_change, on_error=cache.deactivate, retry_delay=0.01,
+            )
+            follower.start()
+            await asyncio.sleep(0.05)
+            await follower.stop()
+
+        asyncio.run(scenario())
+
+        assert not cache.active
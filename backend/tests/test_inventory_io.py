@@ -0,0 +1,130 @@
+import pytest
+import sys
+import os
+import json
+import gzip
+import asyncio
+
+from fastapi import HTTPException
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory_io import iter_zones, iter_json_zones, iter_ndjson, dump_zones, gzip_stream, FORMAT_JSON, FORMAT_NDJSON
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def parse(data: bytes, data_format: str, size: int = 7):
+    async def collect():
+        return [zone async for zone in iter_zones(chunked(data, size), data_format)]
+    return asyncio.run(collect())
+
+async def from_list(items):
+    for item in items:
+        yield item
+
+def dump(zones, data_format, compress=False):
+    async def collect():
+        body = dump_zones(from_list(zones), data_format)
+        if compress:
+            body = gzip_stream(body)
+        return b"".join([chunk async for chunk in body])
+    return asyncio.run(collect())
+
+ZONES = [
+    {"name": "альфа", "environments": [{"name": "dev", "servers": []}]},
+    {"name": "beta", "environments": []},
+]
+
+class TestInventoryIo:
+    """Тесты для потокового разбора данных импорта"""
+
+    @pytest.mark.parametrize("size", [1, 7, 1000])
+    def test_json_object(self, size):
+        """Тест разбора {"zones": [...]} при любой нарезке на чанки"""
+        data = json.dumps({"zones": ZONES}, ensure_ascii=False, indent=2).encode("utf-8")
+
+        assert parse(data, FORMAT_JSON, size) == ZONES
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5])
+    def test_json_strings_with_brackets(self, size):
+        """Тест скобок, кавычек и экранирования внутри строк на границах чанков"""
+        zones = [{"name": "a", "description": 'x] }{ \\"[y\\', "environments": [{"name": "p\u00e9", "servers": []}]}]
+        data = json.dumps({"zones": zones}).encode("utf-8")
+
+        assert parse(data, FORMAT_JSON, size) == zones
+
+    def test_json_array(self):
+        """Тест разбора массива зон"""
+        data = json.dumps(ZONES).encode("utf-8")
+
+        assert parse(data, FORMAT_JSON) == ZONES
+        assert parse(b"[]", FORMAT_JSON) == []
+
+    def test_ndjson(self):
+        """Тест разбора NDJSON"""
+        data = "\n".join(json.dumps(zone, ensure_ascii=False) for zone in ZONES).encode("utf-8")
+
+        assert parse(data + b"\n\n", FORMAT_NDJSON) == ZONES
+        assert parse(data, FORMAT_NDJSON) == ZONES
+
+    @pytest.mark.parametrize("data, data_format", [
+        (b'{"items": []}', FORMAT_JSON),
+        (b'[{"name": "a"}, {"name": ', FORMAT_JSON),
+        (b'[{"name": "a"} {"name": "b"}', FORMAT_JSON),
+        (b'[{"name": "a"} {"name": "b"}]', FORMAT_JSON),
+        (b'[{"name": "a"},]', FORMAT_JSON),
+        (b'{"name": "a"}\nnot json\n', FORMAT_NDJSON),
+        (b'{}', "xml"),
+    ])
+    def test_invalid_data(self, data, data_format):
+        """Тест ошибок разбора"""
+        with pytest.raises(HTTPException) as exc_info:
+            parse(data, data_format)
+
+        assert exc_info.value.status_code == 400
+
+    def test_zone_size_limit(self):
+        """Тест ограничения размера одной зоны"""
+        data = b'[{"name": "' + b"a" * 100 + b'"'
+
+        async def collect():
+            return [zone async for zone in iter_json_zones(chunked(data, 10), max_zone_size=50)]
+
+        with pytest.raises(HTTPException):
+            asyncio.run(collect())
+
+    def test_ndjson_line_size_limit(self):
+        """Тест ограничения длины строки NDJSON"""
+        data = b'{"name": "beta"}\n{"name": "' + b"a" * 100 + b'"}\n'
+
+        async def collect():
+            return [zone async for zone in iter_ndjson(chunked(data, 10), max_zone_size=50)]
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(collect())
+
+        assert "строка 2" in exc_info.value.detail
+
+class TestInventoryExport:
+    """Тесты для потоковой выгрузки зон"""
+
+    @pytest.mark.parametrize("data_format", [FORMAT_JSON, FORMAT_NDJSON])
+    def test_round_trip(self, data_format):
+        """Тест выгрузки, которую можно снова загрузить импортом"""
+        data = dump(ZONES, data_format)
+
+        assert parse(data, data_format) == ZONES
+
+    def test_json_format(self):
+        """Тест формата JSON, совместимого с BatchClient"""
+        assert json.loads(dump(ZONES, FORMAT_JSON)) == {"zones": ZONES}
+        assert json.loads(dump([], FORMAT_JSON)) == {"zones": []}
+
+    def test_gzip(self):
+        """Тест сжатия выгрузки"""
+        data = dump(ZONES * 100, FORMAT_NDJSON, compress=True)
+
+        assert gzip.decompress(data) == dump(ZONES * 100, FORMAT_NDJSON)
@@ -3,131 +3,127 @@ from unittest.mock import patch, MagicMock
 import sys
 import os
 import json
+import asyncio
+import threading
 from datetime import timedelta
 
+import httpx
+
 # Добавляем родительскую директорию в sys.path для импорта модулей
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Мокаем create_db_if_not_exists перед импортом main
-with patch('requests.put') as mock_put:
-    mock_put.return_value.status_code = 201
-    # Импортируем функции и классы из main.py
-    from main import (
-        create_db_if_not_exists, get_doc, save_doc, delete_doc, 
-        get_all_docs, verify_password, get_password_hash, 
-        get_user, authenticate_user, create_access_token
-    )
+from pouchdb_client import PouchDBClient
+
+# Импортируем функции и классы из main.py
+import main
+from main import (
+    create_db_if_not_exists, get_doc, save_doc, delete_doc,
+    get_all_docs, verify_password, get_password_hash,
+    get_user, authenticate_user, create_access_token
+)
+
+@pytest.fixture
+def main_db(monkeypatch, pouchdb_client):
+    """Фикстура, подключающая main.py к базе PouchDB в памяти"""
+    monkeypatch.setattr(main, "db", pouchdb_client)
+    return pouchdb_client
 
 class TestDatabaseFunctions:
     """Тесты для функций работы с базой данных"""
     
-    def test_create_db_if_not_exists_success(self, mocker):
+    def test_create_db_if_not_exists_success(self, main_db):
         """Тест успешного создания базы данных"""
-        # Создаем мок для requests.put
-        mock_response = MagicMock()
-        mock_response.status_code = 201
-        
-        mocker.patch('requests.put', return_value=mock_response)
-        
         # Вызываем тестируемую функцию
-        result = create_db_if_not_exists("test_db")
+        result = asyncio.run(create_db_if_not_exists("test_db"))
         
         # Проверяем результат
         assert result is True
     
-    def test_create_db_if_not_exists_already_exists(self, mocker):
+    def test_create_db_if_not_exists_already_exists(self, main_db, fake_pouchdb):
         """Тест создания базы данных, которая уже существует"""
-        # Создаем мок для requests.put
-        mock_response = MagicMock()
-        mock_response.status_code = 412
-        
-        mocker.patch('requests.put', return_value=mock_response)
+        fake_pouchdb.dbs["test_db"] = {}
         
         # Вызываем тестируемую функцию
-        result = create_db_if_not_exists("test_db")
+        result = asyncio.run(create_db_if_not_exists("test_db"))
         
         # Проверяем результат
         assert result is True
     
-    def test_create_db_if_not_exists_failure(self, mocker):
+    def test_create_db_if_not_exists_failure(self, monkeypatch):
         """Тест неудачного создания базы данных"""
-        # Создаем мок для requests.put
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        
-        mocker.patch('requests.put', return_value=mock_response)
+        transport = httpx.MockTransport(lambda request: httpx.Response(500))
+        monkeypatch.setattr(main, "db", PouchDBClient("http://pouchdb.test", transport=transport))
         
         # Вызываем тестируемую функцию
-        result = create_db_if_not_exists("test_db")
+        result = asyncio.run(create_db_if_not_exists("test_db"))
         
         # Проверяем результат
         assert result is False
     
-    def test_get_doc_success(self, mocker):
+    def test_get_doc_success(self, main_db, fake_pouchdb):
         """Тест успешного получения документа"""
-        # Создаем мок для requests.get
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"_id": "test_id", "name": "test_doc"}
-        
-        mocker.patch('requests.get', return_value=mock_response)
+        fake_pouchdb.put_doc("test_db", {"_id": "test_id", "name": "test_doc"})
         
         # Вызываем тестируемую функцию
-        doc = get_doc("test_db", "test_id")
+        doc = asyncio.run(get_doc("test_db", "test_id"))
         
         # Проверяем результат
         assert doc["_id"] == "test_id"
         assert doc["name"] == "test_doc"
     
-    def test_get_doc_not_found(self, mocker):
+    def test_get_doc_not_found(self, main_db, fake_pouchdb):
         """Тест получения несуществующего документа"""
-        # Создаем мок для requests.get
-        mock_response = MagicMock()
-        mock_response.status_code = 404
-        
-        mocker.patch('requests.get', return_value=mock_response)
+        fake_pouchdb.dbs["test_db"] = {}
         
         # Вызываем тестируемую функцию
-        doc = get_doc("test_db", "nonexistent_id")
+        doc = asyncio.run(get_doc("test_db", "nonexistent_id"))
         
         # Проверяем результат
         assert doc is None
     
-    def test_save_doc_update_existing(self, mocker):
+    def test_save_doc_update_existing(self, main_db, fake_pouchdb):
         """Тест обновления существующего документа"""
-        # Создаем моки
-        get_doc_mock = MagicMock(return_value={"_id": "test_id", "_rev": "1-abc", "name": "old_name"})
-        put_mock = MagicMock()
-        put_mock.return_value.status_code = 201
-        
-        mocker.patch('main.get_doc', get_doc_mock)
-        mocker.patch('requests.put', put_mock)
+        stored = fake_pouchdb.put_doc("test_db", {"_id": "test_id", "name": "old_name"})
         
         # Вызываем тестируемую функцию
         doc = {"_id": "test_id", "name": "new_name"}
-        save_doc("test_db", doc)
+        asyncio.run(save_doc("test_db", doc))
         
         # Проверяем, что документ был обновлен с правильным _rev
-        assert doc["_rev"] == "1-abc"
-        put_mock.assert_called_once()
+        assert doc["_rev"] == stored["_rev"]
+        assert fake_pouchdb.dbs["test_db"]["test_id"]["name"] == "new_name"
     
-    def test_save_doc_create_new(self, mocker):
+    def test_save_doc_create_new(self, main_db, fake_pouchdb):
         """Тест создания нового документа"""
-        # Создаем моки
-        get_doc_mock = MagicMock(return_value=None)
-        put_mock = MagicMock()
-        put_mock.return_value.status_code = 201
-        
-        mocker.patch('main.get_doc', get_doc_mock)
-        mocker.patch('requests.put', put_mock)
+        fake_pouchdb.dbs["test_db"] = {}
         
         # Вызываем тестируемую функцию
         doc = {"_id": "new_id", "name": "new_doc"}
-        save_doc("test_db", doc)
+        asyncio.run(save_doc("test_db", doc))
         
         # Проверяем, что документ был создан
         assert "_rev" not in doc
-        put_mock.assert_called_once()
+        assert fake_pouchdb.dbs["test_db"]["new_id"]["name"] == "new_doc"
+    
+    def test_delete_doc(self, main_db, fake_pouchdb):
+        """Тест удаления документа"""
+        fake_pouchdb.put_doc("test_db", {"_id": "test_id"})
+        
+        # Вызываем тестируемую функцию
+        assert asyncio.run(delete_doc("test_db", "test_id")) is True
+        assert asyncio.run(delete_doc("test_db", "test_id")) is False
+    
+    def test_get_all_docs(self, main_db, fake_pouchdb):
+        """Тест получения всех документов"""
+        fake_pouchdb.put_doc("test_db", {"_id": "a"})
+        fake_pouchdb.put_doc("test_db", {"_id": "b"})
+        
+        # Вызываем тестируемую функцию
+        result = asyncio.run(get_all_docs("test_db"))
+        
+        # Проверяем результат
+        assert [row["id"] for row in result["rows"]] == ["a", "b"]
+        assert result["rows"][0]["doc"]["_id"] == "a"
 
 class TestAuthFunctions:
     """Тесты для функций аутентификации"""
@@ -170,7 +166,7 @@ class TestAuthFunctions:
         }
         
         # Вызываем тестируемую функцию
-        user = get_user("admin")
+        user = asyncio.run(get_user("admin"))
         
         # Проверяем результат
         assert user.username == "admin"
@@ -184,7 +180,7 @@ class TestAuthFunctions:
         get_doc_mock.return_value = None
         
         # Вызываем тестируемую функцию
-        user = get_user("nonexistent")
+        user = asyncio.run(get_user("nonexistent"))
         
         # Проверяем результат
         assert user is None
@@ -199,12 +195,29 @@ class TestAuthFunctions:
         verify_password_mock.return_value = True
         
         # Вызываем тестируемую функцию
-        user = authenticate_user("admin", "password")
+        user = asyncio.run(authenticate_user("admin", "password"))
         
         # Проверяем результат
         assert user is not None
         assert user.username == "admin"
     
+    def test_authenticate_user_verifies_in_pool(self, mocker):
+        """Тест проверки пароля в пуле потоков, а не в цикле событий"""
+        get_user_mock = mocker.patch('main.get_user')
+        get_user_mock.return_value = MagicMock(username="admin", hashed_password="hashed_password")
+        threads = []
+
+        def verify(password, hashed_password):
+            threads.append(threading.current_thread().name)
+            return True
+
+        mocker.patch('main.verify_password', side_effect=verify)
+
+        result = asyncio.run(authenticate_user("admin", "password"))
+
+        assert result.username == "admin"
+        assert threads[0].startswith("password-hash")
+
     def test_authenticate_user_wrong_password(self, mocker):
         """Тест аутентификации с неправильным паролем"""
         # Создаем моки
@@ -215,7 +228,7 @@ class TestAuthFunctions:
         verify_password_mock.return_value = False
         
         # Вызываем тестируемую функцию
-        user = authenticate_user("admin", "wrong_password")
+        user = asyncio.run(authenticate_user("admin", "wrong_password"))
         
         # Проверяем результат
         assert user is False
@@ -227,7 +240,7 @@ class TestAuthFunctions:
         get_user_mock.return_value = None
         
         # Вызываем тестируемую функцию
-        user = authenticate_user("nonexistent", "password")
+        user = asyncio.run(authenticate_user("nonexistent", "password"))
         
         # Проверяем результат
         assert user is False
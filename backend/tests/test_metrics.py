@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsMiddleware, Registry
+
+class TestRegistry:
+    """Тесты для метрик и их выдачи в формате Prometheus"""
+
+    def test_counter_and_gauge(self):
+        """Тест счетчика с метками и показателя"""
+        registry = Registry()
+        counter = registry.counter("events_total", "События", ("kind",))
+        gauge = registry.gauge("in_progress", "Выполняется")
+
+        counter.inc(("a",))
+        counter.inc(("a",), 2)
+        counter.inc(("b",))
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render()
+
+        assert "# TYPE events_total counter" in text
+        assert 'events_total{kind="a"} 3' in text
+        assert 'events_total{kind="b"} 1' in text
+        assert "in_progress 1" in text
+
+    def test_histogram_buckets(self):
+        """Тест накопленных значений корзин гистограммы"""
+        registry = Registry()
+        histogram = registry.histogram("duration_seconds", "Длительность", ("op",), buckets=(0.1, 1.0))
+
+        histogram.observe(0.05, ("get",))
+        histogram.observe(0.1, ("get",))
+        histogram.observe(0.5, ("get",))
+        histogram.observe(3, ("get",))
+
+        lines = registry.render().splitlines()
+
+        assert 'duration_seconds_bucket{op="get",le="0.1"} 2' in lines
+        assert 'duration_seconds_bucket{op="get",le="1"} 3' in lines
+        assert 'duration_seconds_bucket{op="get",le="+Inf"} 4' in lines
+        assert 'duration_seconds_count{op="get"} 4' in lines
+        assert 'duration_seconds_sum{op="get"} 3.65' in lines
+        assert histogram.count(("get",)) == 4
+
+    def test_callback_and_label_escaping(self):
+        """Тест метрики, вычисляемой при выдаче, и экранирования меток"""
+        registry = Registry()
+        values = {("a\"b",): 1}
+        registry.callback("cache_entries", "Записи", "gauge", ("cache",), lambda: values)
+
+        values[("c",)] = 0.5
+
+        text = registry.render()
+        assert 'cache_entries{cache="a\\"b"} 1' in text
+        assert 'cache_entries{cache="c"} 0.5' in text
+
+class TestMetricsMiddleware:
+    """Тесты для учета HTTP-запросов"""
+
+    def setup_method(self):
+        registry = Registry()
+        self.duration = registry.histogram("http_request_duration_seconds", "", ("method", "route", "status"))
+        self.in_progress = registry.gauge("http_requests_in_progress", "")
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, duration=self.duration, in_progress=self.in_progress)
+
+        @app.get("/zones/{zone_name}")
+        async def get_zone(zone_name: str):
+            if zone_name == "missing":
+                raise HTTPException(status_code=404)
+            return {"name": zone_name}
+
+        self.client = TestClient(app)
+
+    def test_route_template_and_status(self):
+        """Тест учета запросов по шаблону маршрута и статусу"""
+        self.client.get("/zones/alpha")
+        self.client.get("/zones/beta")
+        self.client.get("/zones/missing")
+        self.client.get("/unknown")
+
+        assert self.duration.count(("GET", "/zones/{zone_name}", "200")) == 2
+        assert self.duration.count(("GET", "/zones/{zone_name}", "404")) == 1
+        assert self.duration.count(("GET", "unmatched", "404")) == 1
+        assert self.in_progress.value() == 0
@@ -0,0 +1,79 @@
+import pytest
+import sys
+import os
+import asyncio
+
+import httpx
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrate_layout
+from zone_store import NormalizedZoneStore, server_id
+
+@pytest.fixture
+def fake_requests(monkeypatch, fake_pouchdb):
+    """Направляет синхронные запросы скрипта в FakePouchDB"""
+    http = httpx.Client(transport=httpx.MockTransport(fake_pouchdb))
+    monkeypatch.setattr(migrate_layout, "POUCHDB_URL", "http://pouchdb.test")
+    monkeypatch.setattr(migrate_layout, "requests", http)
+    fake_pouchdb.dbs["server_resources"] = {}
+    yield fake_pouchdb
+    http.close()
+
+def embedded_zone(name):
+    return {
+        "_id": f"zone:{name}",
+        "type": "zone",
+        "name": name,
+        "description": "",
+        "environments": [
+            {
+                "name": "prod",
+                "description": "",
+                "servers": [
+                    {"fqdn": "web1.example.com", "ip_address": "10.0.0.1", "description": ""},
+                    {"fqdn": "web2.example.com", "ip_address": "10.0.0.2", "description": ""},
+                ],
+            },
+            {"name": "dev", "description": "", "servers": []},
+        ],
+    }
+
+class TestMigrateLayout:
+    """Тесты для переноса данных в нормализованную схему"""
+
+    def test_migrate(self, fake_requests, pouchdb_client):
+        """Тест переноса зоны и чтения ее через нормализованное хранилище"""
+        fake_requests.put_doc("server_resources", embedded_zone("alpha"))
+
+        summary = migrate_layout.migrate()
+
+        assert summary == {"zones": 1, "environments": 2, "servers": 2, "skipped": 0, "errors": 0}
+        db = fake_requests.dbs["server_resources"]
+        assert "environments" not in db["zone:alpha"]
+        assert server_id("alpha", "prod", "web1.example.com") in db
+
+        store = NormalizedZoneStore(pouchdb_client, cache_max_bytes=10000)
+        zone = asyncio.run(store.get_zone("alpha"))
+        assert [env["name"] for env in zone["environments"]] == ["dev", "prod"]
+        assert len(zone["environments"][1]["servers"]) == 2
+
+    def test_rerun_is_idempotent(self, fake_requests):
+        """Тест повторного запуска после переноса"""
+        fake_requests.put_doc("server_resources", embedded_zone("alpha"))
+        migrate_layout.migrate()
+
+        summary = migrate_layout.migrate()
+
+        assert summary["skipped"] == 1
+        assert summary["zones"] == 0
+
+    def test_dry_run(self, fake_requests):
+        """Тест режима без записи"""
+        fake_requests.put_doc("server_resources", embedded_zone("alpha"))
+
+        summary = migrate_layout.migrate(dry_run=True)
+
+        assert summary["servers"] == 2
+        assert "environments" in fake_requests.dbs["server_resources"]["zone:alpha"]
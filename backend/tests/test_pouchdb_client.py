@@ -0,0 +1,216 @@
+import pytest
+import sys
+import os
+import asyncio
+
+import httpx
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pouchdb_client import PouchDBClient, PouchDBError, ConflictError
+
+class TestPouchDBClient:
+    """Тесты для асинхронного клиента PouchDB"""
+
+    def test_pool_settings(self):
+        """Тест настройки пула соединений и таймаутов"""
+        client = PouchDBClient(
+            "http://pouchdb.test/",
+            max_connections=50,
+            max_keepalive_connections=10,
+            timeout=3,
+            connect_timeout=1,
+        )
+
+        assert client.base_url == "http://pouchdb.test"
+        assert client.limits.max_connections == 50
+        assert client.limits.max_keepalive_connections == 10
+        assert client.timeout.read == 3
+        assert client.timeout.connect == 1
+
+    def test_http_client_is_reused(self, pouchdb_client):
+        """Тест повторного использования одного HTTP-клиента"""
+        async def scenario():
+            first = pouchdb_client.client
+            await pouchdb_client.create_db_if_not_exists("test_db")
+            assert pouchdb_client.client is first
+            await pouchdb_client.aclose()
+            assert pouchdb_client.client is not first
+
+        asyncio.run(scenario())
+
+    def test_save_and_get_doc(self, pouchdb_client):
+        """Тест сохранения и чтения документа"""
+        async def scenario():
+            await pouchdb_client.create_db_if_not_exists("test_db")
+            result = await pouchdb_client.save_doc("test_db", {"_id": "doc1", "value": 1})
+            assert result["ok"] is True
+            await pouchdb_client.save_doc("test_db", {"_id": "doc1", "value": 2})
+            return await pouchdb_client.get_doc("test_db", "doc1")
+
+        doc = asyncio.run(scenario())
+
+        assert doc["value"] == 2
+        assert doc["_rev"].startswith("2-")
+
+    def test_save_doc_without_id(self, pouchdb_client, fake_pouchdb):
+        """Тест сохранения документа без _id"""
+        result = asyncio.run(pouchdb_client.save_doc("test_db", {"value": 1}))
+
+        assert result["id"] in fake_pouchdb.dbs["test_db"]
+
+    def test_save_doc_error(self):
+        """Тест ошибки сохранения документа"""
+        def handler(request):
+            return httpx.Response(500, text="internal error")
+
+        client = PouchDBClient("http://pouchdb.test", transport=httpx.MockTransport(handler))
+
+        with pytest.raises(PouchDBError) as exc_info:
+            asyncio.run(client.save_doc("test_db", {"_id": "doc1"}))
+
+        assert exc_info.value.status_code == 500
+        assert "internal error" in str(exc_info.value)
+
+    def test_query_view_missing(self, pouchdb_client, fake_pouchdb):
+        """Тест запроса к несуществующему представлению"""
+        fake_pouchdb.dbs["test_db"] = {}
+
+        result = asyncio.run(pouchdb_client.query_view("test_db", "by_name"))
+
+        assert result == {"rows": []}
+
+    def test_concurrent_requests(self, pouchdb_client, fake_pouchdb):
+        """Тест параллельных запросов через один пул"""
+        for i in range(50):
+            fake_pouchdb.put_doc("test_db", {"_id": f"doc{i}"})
+
+        async def scenario():
+            return await asyncio.gather(
+                *(pouchdb_client.get_doc("test_db", f"doc{i}") for i in range(50))
+            )
+
+        docs = asyncio.run(scenario())
+
+        assert [doc["_id"] for doc in docs] == [f"doc{i}" for i in range(50)]
+
+class TestRevisionCache:
+    """Тесты для кэша ревизий и повтора записи при конфликте"""
+
+    def test_save_uses_rev_from_doc(self, pouchdb_client, fake_pouchdb):
+        """Тест записи с ревизией, уже загруженной обработчиком"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+
+        async def scenario():
+            doc = await pouchdb_client.get_doc("test_db", "doc1")
+            doc["value"] = 2
+            fake_pouchdb.requests.clear()
+            await pouchdb_client.save_doc("test_db", doc)
+
+        asyncio.run(scenario())
+
+        # Один PUT без дополнительного GET
+        assert [request.method for request in fake_pouchdb.requests] == ["PUT"]
+        assert fake_pouchdb.dbs["test_db"]["doc1"]["value"] == 2
+
+    def test_save_uses_cached_rev(self, pouchdb_client, fake_pouchdb):
+        """Тест записи с ревизией из кэша клиента"""
+        fake_pouchdb.dbs["test_db"] = {}
+
+        async def scenario():
+            await pouchdb_client.save_doc("test_db", {"_id": "doc1", "value": 1})
+            fake_pouchdb.requests.clear()
+            await pouchdb_client.save_doc("test_db", {"_id": "doc1", "value": 2})
+
+        asyncio.run(scenario())
+
+        assert [request.method for request in fake_pouchdb.requests] == ["PUT"]
+        assert fake_pouchdb.dbs["test_db"]["doc1"]["_rev"].startswith("2-")
+
+    def test_conflict_retry(self, pouchdb_client, fake_pouchdb):
+        """Тест повтора записи после конфликта ревизий"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+
+        async def scenario():
+            doc = await pouchdb_client.get_doc("test_db", "doc1")
+            # Документ изменен другим клиентом
+            fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 10})
+            fake_pouchdb.requests.clear()
+            doc["value"] = 2
+            await pouchdb_client.save_doc("test_db", doc)
+
+        asyncio.run(scenario())
+
+        assert [request.method for request in fake_pouchdb.requests] == ["PUT", "GET", "PUT"]
+        assert fake_pouchdb.dbs["test_db"]["doc1"]["value"] == 2
+        assert pouchdb_client.conflicts_retried == 1
+        assert pouchdb_client.conflicts_failed == 0
+
+    def test_conflict_retries_exhausted(self, pouchdb_client, fake_pouchdb):
+        """Тест ошибки после исчерпания повторов"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1"})
+
+        with pytest.raises(ConflictError):
+            asyncio.run(pouchdb_client.save_doc("test_db", {"_id": "doc1", "_rev": "1-stale"}, retries=0))
+        assert pouchdb_client.conflicts_failed == 1
+
+    def test_rev_cache_is_bounded(self):
+        """Тест ограничения размера кэша ревизий"""
+        client = PouchDBClient("http://pouchdb.test", rev_cache_size=2)
+
+        client.remember_rev("test_db", "a", "1-a")
+        client.remember_rev("test_db", "b", "1-b")
+        client.remember_rev("test_db", "c", "1-c")
+
+        assert client.get_cached_rev("test_db", "a") is None
+        assert client.get_cached_rev("test_db", "c") == "1-c"
+
+    def test_delete_with_cached_rev(self, pouchdb_client, fake_pouchdb):
+        """Тест удаления документа по ревизии из кэша"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1"})
+
+        async def scenario():
+            await pouchdb_client.get_doc("test_db", "doc1")
+            fake_pouchdb.requests.clear()
+            return await pouchdb_client.delete_doc("test_db", "doc1")
+
+        assert asyncio.run(scenario()) is True
+        assert [request.method for request in fake_pouchdb.requests] == ["DELETE"]
+        assert pouchdb_client.get_cached_rev("test_db", "doc1") is None
+
+class TestCallObserver:
+    """Тесты замеров операций клиента"""
+
+    def test_observer_receives_operations(self, pouchdb_client, fake_pouchdb):
+        """Тест передачи наблюдателю операции, исхода и длительности"""
+        fake_pouchdb.dbs["test_db"] = {}
+        calls = []
+        pouchdb_client.observer = lambda operation, outcome, duration: calls.append((operation, outcome, duration))
+
+        async def scenario():
+            await pouchdb_client.save_doc("test_db", {"_id": "doc1"})
+            await pouchdb_client.get_doc("test_db", "doc1")
+            await pouchdb_client.get_docs_by_prefix("test_db", "doc")
+
+        asyncio.run(scenario())
+
+        assert [(operation, outcome) for operation, outcome, _ in calls] == [
+            ("save_doc", "ok"), ("get_doc", "ok"), ("get_all_docs", "ok"),
+        ]
+        assert all(duration >= 0 for _, _, duration in calls)
+
+    def test_observer_records_errors(self):
+        """Тест учета операции, завершившейся исключением"""
+        def handler(request):
+            return httpx.Response(500, text="error")
+
+        calls = []
+        client = PouchDBClient(
+            "http://pouchdb.test", transport=httpx.MockTransport(handler),
+            observer=lambda operation, outcome, duration: calls.append((operation, outcome)),
+        )
+
+        with pytest.raises(PouchDBError):
+            asyncio.run(client.save_doc("test_db", {"_id": "doc1"}))
+        assert calls == [("save_doc", "error")]
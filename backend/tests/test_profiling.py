@@ -0,0 +1,108 @@
+import pytest
+import sys
+import os
+import json
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import (
+    ProfilingMiddleware, RequestProfile, current_profile, enter_operation, leave_operation, profile_scope
+)
+
+def profiled_app(pouchdb_client, footer=False):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, footer=footer)
+
+    @app.get("/docs/{doc_id}")
+    async def read_doc(doc_id: str):
+        doc = await pouchdb_client.get_doc("test_db", doc_id)
+        doc["value"] += 1
+        await pouchdb_client.save_doc("test_db", doc)
+        return doc
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            doc = await pouchdb_client.get_doc("test_db", "doc1")
+            yield json.dumps(doc) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+class TestRequestProfile:
+    """Тесты для профиля обращений к базе"""
+
+    def test_server_timing(self):
+        """Тест заголовка Server-Timing по операциям"""
+        profile = RequestProfile()
+
+        token = enter_operation("get_doc")
+        profile.record("GET", "/db/a", 200, 0.002, 0, 100)
+        profile.record("GET", "/db/b", 404, 0.001, 0, 40)
+        leave_operation(token)
+        profile.record("PUT", "/db", 201, 0.003, 10, 20)
+
+        header = profile.server_timing()
+
+        assert header.startswith('db;dur=6.0;desc="3 calls"')
+        assert 'get_doc;dur=3.0;desc="2 calls, 140 B"' in header
+        assert 'request;dur=3.0;desc="1 calls, 30 B"' in header
+        assert "app;dur=" in header
+        assert profile.report()["operations"]["get_doc"]["calls"] == 2
+
+    def test_no_profile_outside_request(self):
+        """Тест отсутствия профиля вне запроса"""
+        assert current_profile() is None
+
+class TestProfilingMiddleware:
+    """Тесты для учета обращений к PouchDB в запросах"""
+
+    def test_server_timing_header(self, pouchdb_client, fake_pouchdb):
+        """Тест заголовка со всеми обращениями обработчика к базе"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        client = profiled_app(pouchdb_client)
+
+        response = client.get("/docs/doc1")
+
+        assert response.status_code == 200
+        header = response.headers["Server-Timing"]
+        assert 'db;dur=' in header and 'desc="2 calls"' in header
+        assert "get_doc;dur=" in header
+        assert "save_doc;dur=" in header
+        assert response.headers["Timing-Allow-Origin"] == "*"
+
+    def test_nested_operation(self, pouchdb_client, fake_pouchdb):
+        """Тест учета перечитывания внутри save_doc как get_doc"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        profile = RequestProfile()
+
+        async def scenario():
+            with profile_scope(profile):
+                await pouchdb_client.save_doc("test_db", {"_id": "doc1", "_rev": "1-stale", "value": 2})
+
+        asyncio.run(scenario())
+
+        assert [call["operation"] for call in profile.calls] == ["save_doc", "get_doc", "save_doc"]
+        assert [call["method"] for call in profile.calls] == ["PUT", "GET", "PUT"]
+        assert profile.calls[0]["bytes_sent"] > 0
+
+    def test_debug_footer(self, pouchdb_client, fake_pouchdb):
+        """Тест отладочного отчета в конце тела ответа"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        client = profiled_app(pouchdb_client, footer=True)
+
+        plain = client.get("/docs/doc1")
+        response = client.get("/stream", headers={"X-Debug-Profile": "1"})
+
+        assert plain.json()["value"] == 2
+        body, footer = [line for line in response.text.splitlines() if line]
+        assert json.loads(body)["_id"] == "doc1"
+        report = json.loads(footer)
+        assert report["db_calls"] == 1
+        assert report["calls"][0]["operation"] == "get_doc"
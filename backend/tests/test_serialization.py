@@ -0,0 +1,41 @@
+import pytest
+import sys
+import os
+import json
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+from serialization import FastJSONResponse, dumps, model_projector
+
+class Item(BaseModel):
+    name: str
+    note: Optional[str] = None
+
+class Group(BaseModel):
+    name: str
+    kind: str = "group"
+    items: List[Item] = []
+
+class TestSerialization:
+    """Тесты для быстрой сериализации ответов"""
+
+    def test_projection_matches_model(self):
+        """Тест совпадения проекции с выдачей через модель"""
+        project = model_projector(Group)
+        doc = {"name": "g", "layout": "x", "items": [{"name": "a", "extra": 1}, {"name": "b", "note": "n"}]}
+
+        assert project(doc) == Group(**doc).model_dump()
+        assert project({"name": "empty"}) == {"name": "empty", "kind": "group", "items": []}
+
+    def test_dumps_without_orjson(self, monkeypatch):
+        """Тест сериализации стандартным модулем json, если orjson не установлен"""
+        data = {"name": "зона", "items": [1, 2]}
+        monkeypatch.setattr(serialization, "orjson", None)
+
+        assert json.loads(dumps(data).decode("utf-8")) == data
+        assert FastJSONResponse(data).body == dumps(data)
@@ -0,0 +1,45 @@
+import pytest
+import sys
+import os
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serve
+
+class TestServe:
+    """Тесты для запуска бэкенда в продакшн-режиме"""
+
+    def test_worker_count(self, monkeypatch):
+        """Тест выбора числа процессов"""
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        monkeypatch.setattr(serve, "cpu_count", lambda: 8)
+
+        assert serve.worker_count() == 8
+        assert serve.worker_count(3) == 3
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        assert serve.worker_count() == 2
+
+    def test_uvicorn_options(self, monkeypatch):
+        """Тест выбора uvloop и httptools, если они установлены"""
+        monkeypatch.setattr(serve, "available", lambda module: module == "uvloop")
+
+        options = serve.uvicorn_options("0.0.0.0", 8000, 4, 30)
+
+        assert options["workers"] == 4
+        assert options["loop"] == "uvloop"
+        assert options["http"] == "h11"
+        assert options["timeout_graceful_shutdown"] == 30
+
+    @pytest.mark.parametrize("gunicorn_installed, expected", [(True, "gunicorn"), (False, "uvicorn")])
+    def test_auto_server(self, monkeypatch, gunicorn_installed, expected):
+        """Тест выбора менеджера процессов"""
+        monkeypatch.setattr(serve, "available", lambda module: gunicorn_installed and module == "gunicorn")
+        started = {}
+        monkeypatch.setattr(serve, "run_gunicorn", lambda options: started.update(gunicorn=options))
+        monkeypatch.setattr(serve, "run_uvicorn", lambda options: started.update(uvicorn=options))
+
+        serve.serve("auto", "127.0.0.1", 8000, 2, 30)
+
+        assert list(started) == [expected]
+        assert started[expected]["workers"] == 2
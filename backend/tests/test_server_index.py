@@ -0,0 +1,70 @@
+import pytest
+import sys
+import os
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server_index import ServerIndex, server_locations
+
+def server(fqdn, ip="10.0.0.1"):
+    return {"fqdn": fqdn, "ip": ip, "status": "available", "server_type": "web"}
+
+def zone_doc(name, servers, rev="1-a"):
+    return {"_id": f"zone:{name}", "_rev": rev, "type": "zone", "name": name,
+            "environments": [{"name": "prod", "servers": servers}]}
+
+class TestServerIndex:
+    """Тесты для индекса серверов"""
+
+    def test_server_locations(self):
+        """Тест извлечения серверов из документов обеих схем"""
+        server_doc = dict(server("b.example.com"), _id="server:beta:qa:b.example.com", _rev="1-a",
+                          type="server", zone="beta", environment="qa")
+
+        assert server_locations(zone_doc("alpha", [server("a.example.com")])) == [
+            {"zone": "alpha", "environment": "prod", "server": server("a.example.com")},
+        ]
+        assert server_locations(server_doc) == [
+            {"zone": "beta", "environment": "qa", "server": server("b.example.com")},
+        ]
+        assert server_locations({"_id": "env:beta:qa", "type": "environment"}) == []
+
+    def test_lookup(self):
+        """Тест поиска по FQDN и IP"""
+        index = ServerIndex()
+        index.load([
+            zone_doc("alpha", [server("a.example.com"), server("b.example.com", "10.0.0.2")]),
+            zone_doc("beta", [server("c.example.com")]),
+        ])
+
+        assert index.by_fqdn("b.example.com")[0]["zone"] == "alpha"
+        assert sorted(location["zone"] for location in index.by_ip("10.0.0.1")) == ["alpha", "beta"]
+        assert index.by_fqdn("missing.example.com") == []
+        assert index.stats()["servers"] == 3
+
+    def test_apply_change(self):
+        """Тест обновления индекса по ленте изменений"""
+        index = ServerIndex()
+        index.load([zone_doc("alpha", [server("a.example.com")])])
+
+        index.apply_change({"id": "zone:alpha", "doc": zone_doc("alpha", [server("b.example.com")], rev="2-b")})
+        # Устаревшая ревизия не откатывает индекс
+        index.put(zone_doc("alpha", [server("a.example.com")], rev="1-a"))
+
+        assert index.by_fqdn("a.example.com") == []
+        assert index.by_fqdn("b.example.com")[0]["zone"] == "alpha"
+
+        index.apply_change({"id": "zone:alpha", "deleted": True})
+
+        assert index.by_fqdn("b.example.com") == []
+        assert index.by_ip("10.0.0.1") == []
+
+    def test_inactive_index_ignores_writes(self):
+        """Тест неактивного индекса"""
+        index = ServerIndex()
+
+        index.put(zone_doc("alpha", [server("a.example.com")]))
+
+        assert index.by_fqdn("a.example.com") == []
+        assert not index.active
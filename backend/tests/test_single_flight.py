@@ -0,0 +1,155 @@
+import pytest
+import sys
+import os
+import asyncio
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight
+
+class TestSingleFlight:
+    """Тесты для объединения одинаковых одновременных операций"""
+
+    def test_concurrent_calls_are_shared(self):
+        """Тест одного выполнения операции для одновременных вызовов"""
+        flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 1}
+
+        async def scenario():
+            return await asyncio.gather(*[flight.do("key", load) for _ in range(5)])
+
+        results = asyncio.run(scenario())
+
+        assert len(calls) == 1
+        assert all(result == {"value": 1} for result in results)
+        assert flight.shared == 4
+        assert len(flight) == 0
+
+    def test_exception_is_shared(self):
+        """Тест получения ошибки операции всеми ожидающими"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("ошибка")
+
+        async def scenario():
+            return await asyncio.gather(flight.do("key", fail), flight.do("key", fail),
+                                        return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_leader_cancellation(self):
+        """Тест отмены первого вызова без отмены остальных ожидающих"""
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def scenario():
+            leader = asyncio.create_task(flight.do("key", load))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do("key", load))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(scenario()) == "done"
+
+    def test_forget(self):
+        """Тест запуска новой операции после forget"""
+        flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def scenario():
+            first = asyncio.create_task(flight.do("key", load))
+            await asyncio.sleep(0)
+            flight.forget(lambda key: key == "key")
+            second = await flight.do("key", load)
+            return await first, second
+
+        assert asyncio.run(scenario()) == (2, 2)
+        assert len(calls) == 2
+
+class TestCoalescedReads:
+    """Тесты для объединения чтений клиента PouchDB"""
+
+    def test_same_document_read_once(self, pouchdb_client, fake_pouchdb):
+        """Тест одного GET для одновременных чтений документа"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        fake_pouchdb.requests.clear()
+
+        async def scenario():
+            return await asyncio.gather(*[pouchdb_client.get_doc("test_db", "doc1") for _ in range(3)])
+
+        docs = asyncio.run(scenario())
+
+        assert [request.method for request in fake_pouchdb.requests] == ["GET"]
+        assert all(doc["value"] == 1 for doc in docs)
+        # Каждый вызывающий получает свою копию документа
+        docs[0]["value"] = 2
+        assert docs[1]["value"] == 1
+
+    def test_write_starts_new_read(self, pouchdb_client, fake_pouchdb):
+        """Тест отдельного чтения после записи"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+
+        async def scenario():
+            before = asyncio.create_task(pouchdb_client.get_doc("test_db", "doc1"))
+            await asyncio.sleep(0)
+            doc = dict(await before)
+            doc["value"] = 2
+            await pouchdb_client.save_doc("test_db", doc)
+            return await pouchdb_client.get_doc("test_db", "doc1")
+
+        assert asyncio.run(scenario())["value"] == 2
+
+    def test_disabled(self, pouchdb_client, fake_pouchdb):
+        """Тест отдельных запросов при выключенном объединении"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        fake_pouchdb.requests.clear()
+        pouchdb_client.coalesce_reads = False
+
+        async def scenario():
+            await asyncio.gather(*[pouchdb_client.get_doc("test_db", "doc1") for _ in range(3)])
+
+        asyncio.run(scenario())
+
+        assert [request.method for request in fake_pouchdb.requests] == ["GET", "GET", "GET"]
+
+class TestUserLookups:
+    """Тесты для объединения поиска пользователей"""
+
+    def test_concurrent_get_user(self, mocker):
+        """Тест одного чтения для одновременных поисков пользователя"""
+        import main
+
+        async def load(db_name, doc_id):
+            await asyncio.sleep(0.01)
+            return {"_id": doc_id, "username": "admin", "email": "admin@example.com",
+                    "hashed_password": "hashed_password"}
+
+        get_doc_mock = mocker.patch("main.get_doc", side_effect=load)
+        mocker.patch.object(main.user_cache, "get", return_value=None)
+
+        async def scenario():
+            return await asyncio.gather(*[main.get_user("admin") for _ in range(4)])
+
+        users = asyncio.run(scenario())
+
+        assert get_doc_mock.call_count == 1
+        assert all(user.username == "admin" for user in users)
@@ -0,0 +1,121 @@
+import pytest
+import sys
+import os
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unit_of_work import UnitOfWork, UnitOfWorkMiddleware, current_unit, unit_of_work
+
+class TestUnitOfWork:
+    """Тесты для карты документов запроса"""
+
+    def test_lookup_returns_copy(self):
+        """Тест независимости выданного документа от запомненного"""
+        unit = UnitOfWork()
+        unit.remember("db", "a", b'{"_id": "a", "_rev": "1-a", "items": [1]}', _rev="2-b")
+        unit.remember("db", "missing", None)
+
+        _, doc = unit.lookup("db", "a")
+        doc["items"].append(2)
+
+        assert unit.lookup("db", "a") == (True, {"_id": "a", "_rev": "2-b", "items": [1]})
+        assert unit.lookup("db", "missing") == (True, None)
+        assert unit.lookup("db", "b") == (False, None)
+        unit.forget("db", "a")
+        assert unit.lookup("db", "a") == (False, None)
+
+    def test_max_docs(self):
+        """Тест ограничения числа запомненных документов"""
+        unit = UnitOfWork(max_docs=1)
+        unit.remember("db", "a", b'{"_id": "a"}')
+        unit.remember("db", "b", b'{"_id": "b"}')
+        unit.remember("db", "a", b'{"_id": "a", "_rev": "2-a"}')
+
+        assert unit.lookup("db", "b") == (False, None)
+        assert unit.lookup("db", "a")[1]["_rev"] == "2-a"
+
+    def test_scope(self):
+        """Тест карты документов только внутри блока"""
+        with unit_of_work() as unit:
+            assert current_unit() is unit
+        assert current_unit() is None
+
+class TestClientWithUnitOfWork:
+    """Тесты чтения и записи документов клиентом внутри запроса"""
+
+    def test_repeated_reads(self, pouchdb_client, fake_pouchdb):
+        """Тест однократного чтения документа и отсутствующего документа"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+
+        async def scenario():
+            with unit_of_work():
+                first = await pouchdb_client.get_doc("test_db", "doc1")
+                first["value"] = 100
+                second = await pouchdb_client.get_doc("test_db", "doc1")
+                await pouchdb_client.get_doc("test_db", "missing")
+                missing = await pouchdb_client.get_doc("test_db", "missing")
+            return second, missing
+
+        second, missing = asyncio.run(scenario())
+
+        assert second["value"] == 1
+        assert missing is None
+        assert [request.method for request in fake_pouchdb.requests] == ["GET", "GET"]
+
+    def test_write_updates_map(self, pouchdb_client, fake_pouchdb):
+        """Тест чтения записанного документа без обращения к базе"""
+        fake_pouchdb.dbs["test_db"] = {}
+
+        async def scenario():
+            with unit_of_work():
+                await pouchdb_client.save_doc("test_db", {"_id": "doc1", "value": 1})
+                saved = await pouchdb_client.get_doc("test_db", "doc1")
+                await pouchdb_client.bulk_docs("test_db", [{"_id": "doc2"}, dict(saved, _deleted=True)])
+                docs = await pouchdb_client.get_docs("test_db", ["doc1", "doc2"])
+            return saved, docs
+
+        saved, docs = asyncio.run(scenario())
+
+        assert saved["value"] == 1 and saved["_rev"].startswith("1-")
+        assert list(docs) == ["doc2"]
+        assert [request.method for request in fake_pouchdb.requests] == ["PUT", "POST"]
+
+    def test_conflict_forgets_document(self, pouchdb_client, fake_pouchdb):
+        """Тест повторного чтения документа после конфликта ревизий"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+
+        async def scenario():
+            with unit_of_work():
+                doc = await pouchdb_client.get_doc("test_db", "doc1")
+                fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 10})
+                doc["value"] = 2
+                await pouchdb_client.save_doc("test_db", doc)
+                return await pouchdb_client.get_doc("test_db", "doc1")
+
+        doc = asyncio.run(scenario())
+
+        assert doc["value"] == 2
+        assert [request.method for request in fake_pouchdb.requests] == ["GET", "PUT", "GET", "PUT"]
+
+    def test_middleware(self, pouchdb_client, fake_pouchdb):
+        """Тест отдельной карты документов для каждого запроса"""
+        fake_pouchdb.put_doc("test_db", {"_id": "doc1", "value": 1})
+        app = FastAPI()
+        app.add_middleware(UnitOfWorkMiddleware)
+
+        @app.get("/doc")
+        async def read_doc():
+            await pouchdb_client.get_doc("test_db", "doc1")
+            return await pouchdb_client.get_doc("test_db", "doc1")
+
+        client = TestClient(app)
+        client.get("/doc")
+        response = client.get("/doc")
+
+        assert response.json()["value"] == 1
+        assert [request.method for request in fake_pouchdb.requests] == ["GET", "GET"]
@@ -0,0 +1,590 @@
+import pytest
+import sys
+import os
+import asyncio
+
+from fastapi import HTTPException
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zone_store import (
+    create_zone_store, EmbeddedZoneStore, NormalizedZoneStore,
+    LAYOUT_EMBEDDED, LAYOUT_NORMALIZED, encode_cursor, decode_cursor
+)
+
+def server(fqdn, ip="10.0.0.1"):
+    return {"fqdn": fqdn, "ip": ip, "status": "available", "server_type": "web"}
+
+@pytest.fixture(params=[LAYOUT_EMBEDDED, LAYOUT_NORMALIZED])
+def store(request, pouchdb_client, fake_pouchdb):
+    """Фикстура хранилища зон для каждой схемы размещения данных"""
+    fake_pouchdb.dbs["server_resources"] = {}
+    return create_zone_store(request.param, pouchdb_client, cache_max_bytes=1024 * 1024)
+
+class TestZoneStore:
+    """Тесты, общие для всех схем размещения данных"""
+
+    def test_zone_lifecycle(self, store):
+        """Тест полного цикла работы с зоной, окружениями и серверами"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.dev.example.com")]},
+            ]})
+            await store.create_environment("alpha", {"name": "prod", "servers": []})
+            await store.add_server("alpha", "prod", server("b.prod.example.com"))
+            await store.add_server("alpha", "prod", server("c.prod.example.com"))
+            await store.update_server("alpha", "prod", "c.prod.example.com", server("c.prod.example.com", "10.0.0.3"))
+            await store.delete_server("alpha", "prod", "b.prod.example.com")
+            return await store.get_zone("alpha")
+
+        zone = asyncio.run(scenario())
+
+        assert zone == {"name": "alpha", "type": "zone", "environments": [
+            {"name": "dev", "servers": [server("a.dev.example.com")]},
+            {"name": "prod", "servers": [server("c.prod.example.com", "10.0.0.3")]},
+        ]}
+
+    def test_list_zones(self, store):
+        """Тест получения списка зон"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": []})
+            await store.create_zone({"name": "beta", "type": "zone", "environments": [{"name": "qa", "servers": []}]})
+            return await store.list_zones()
+
+        zones = asyncio.run(scenario())
+
+        assert zones == [
+            {"name": "alpha", "type": "zone", "environments": []},
+            {"name": "beta", "type": "zone", "environments": [{"name": "qa", "servers": []}]},
+        ]
+
+    def test_update_and_delete_environment(self, store):
+        """Тест обновления и удаления окружения"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com")]},
+                {"name": "qa", "servers": []},
+            ]})
+            await store.update_environment("alpha", "dev", {"name": "dev", "servers": [server("b.example.com")]})
+            await store.delete_environment("alpha", "qa")
+            return await store.get_zone("alpha")
+
+        zone = asyncio.run(scenario())
+
+        assert zone["environments"] == [{"name": "dev", "servers": [server("b.example.com")]}]
+
+    def test_update_and_delete_zone(self, store):
+        """Тест обновления и удаления зоны"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com")]},
+            ]})
+            await store.update_zone("alpha", {"name": "alpha", "type": "zone", "environments": [
+                {"name": "prod", "servers": []},
+            ]})
+            updated = await store.get_zone("alpha")
+            deleted = await store.delete_zone("alpha")
+            return updated, deleted, await store.get_zone("alpha"), await store.delete_zone("alpha")
+
+        updated, deleted, missing, deleted_again = asyncio.run(scenario())
+
+        assert updated["environments"] == [{"name": "prod", "servers": []}]
+        assert deleted is True
+        assert missing is None
+        assert deleted_again is False
+
+    def test_fqdn_unique_across_zones(self, store):
+        """Тест уникальности FQDN во всех зонах"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com")]},
+            ]})
+            await store.create_zone({"name": "beta", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("b.example.com")]},
+            ]})
+            operations = [
+                store.add_server("beta", "dev", server("a.example.com")),
+                store.update_server("beta", "dev", "b.example.com", server("a.example.com")),
+                store.create_environment("beta", {"name": "qa", "servers": [server("a.example.com")]}),
+                store.update_zone("beta", {"name": "beta", "type": "zone", "environments": [
+                    {"name": "dev", "servers": [server("a.example.com")]},
+                ]}),
+                store.create_zone({"name": "gamma", "type": "zone", "environments": [
+                    {"name": "dev", "servers": [server("c.example.com"), server("c.example.com")]},
+                ]}),
+            ]
+            status_codes = []
+            for operation in operations:
+                try:
+                    await operation
+                except HTTPException as e:
+                    status_codes.append(e.status_code)
+            # Перезапись сервера в пределах своей области разрешена
+            await store.update_server("beta", "dev", "b.example.com", server("b.example.com", "10.0.0.2"))
+            await store.update_environment("alpha", "dev", {"name": "dev", "servers": [server("a.example.com")]})
+            return status_codes
+
+        assert asyncio.run(scenario()) == [400] * 5
+
+    @pytest.mark.parametrize("indexed", [True, False])
+    def test_find_servers(self, store, indexed):
+        """Тест поиска серверов по индексу и обходом зон"""
+        async def scenario():
+            if indexed:
+                await store.load_cache()
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com"), server("b.example.com", "10.0.0.2")]},
+            ]})
+            await store.update_server("alpha", "dev", "a.example.com", server("c.example.com"))
+            return (
+                await store.find_servers(fqdn="a.example.com"),
+                await store.find_servers(fqdn="c.example.com"),
+                await store.find_servers(ip="10.0.0.2"),
+            )
+
+        old, renamed, by_ip = asyncio.run(scenario())
+
+        assert old == []
+        assert renamed == [{"zone": "alpha", "environment": "dev", "server": server("c.example.com")}]
+        assert [location["server"]["fqdn"] for location in by_ip] == ["b.example.com"]
+        assert store.servers.active == indexed
+
+    def test_bulk_servers(self, store, fake_pouchdb):
+        """Тест пакетной записи серверов одним запросом к базе"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com"), server("b.example.com")]},
+            ]})
+            await store.create_zone({"name": "beta", "type": "zone", "environments": []})
+            await store.create_environment("beta", {"name": "qa", "servers": [server("x.example.com")]})
+            fake_pouchdb.requests.clear()
+            results = await store.bulk_servers("alpha", "dev", [
+                {"op": "create", "server": server("c.example.com")},
+                {"op": "create", "server": server("a.example.com")},
+                {"op": "create", "server": server("x.example.com")},
+                {"op": "update", "fqdn": "a.example.com", "server": server("a.example.com", "10.0.0.9")},
+                {"op": "update", "fqdn": "b.example.com", "server": server("d.example.com")},
+                {"op": "delete", "fqdn": "missing.example.com"},
+                {"op": "delete", "fqdn": "c.example.com"},
+                {"op": "create", "server": server("c.example.com", "10.0.0.3")},
+                {"op": "move"},
+            ])
+            return results, await store.get_zone("alpha")
+
+        results, zone = asyncio.run(scenario())
+
+        assert [result["status_code"] for result in results] == [200, 400, 400, 200, 200, 404, 200, 200, 400]
+        assert "beta" in results[2]["detail"]
+        assert sorted(zone["environments"][0]["servers"], key=lambda s: s["fqdn"]) == [
+            server("a.example.com", "10.0.0.9"), server("c.example.com", "10.0.0.3"), server("d.example.com"),
+        ]
+        writes = [request for request in fake_pouchdb.requests if request.method != "GET" and "_all_docs" not in request.url.path]
+        assert len(writes) == 1
+
+    def test_bulk_servers_missing_environment(self, store):
+        """Тест пакетной записи в отсутствующее окружение"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": []})
+            await store.bulk_servers("alpha", "missing", [{"op": "create", "server": server("a.example.com")}])
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(scenario())
+
+        assert exc_info.value.status_code == 404
+
+    def test_import_merge(self, store):
+        """Тест импорта с объединением существующих зон"""
+        async def zones():
+            yield {"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com", "10.0.0.9"), server("c.example.com")]},
+                {"name": "qa", "servers": []},
+            ]}
+            yield {"name": "gamma", "type": "zone", "environments": []}
+            yield {"name": "gamma", "type": "zone", "environments": []}
+            yield {"name": "delta", "type": "zone", "environments": [{"name": "dev", "servers": [server("b.example.com")]}]}
+
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com"), server("b.example.com")]},
+            ]})
+            batches = []
+            summary = await store.import_zones(zones(), "merge", batch_size=1, on_batch=lambda s: batches.append(s["zones"]))
+            return summary, batches, await store.list_zones()
+
+        summary, batches, zones_after = asyncio.run(scenario())
+
+        assert summary["zones"] == 2
+        assert summary["failed"] == 2
+        assert [error["zone"] for error in summary["errors"]] == ["gamma", "delta"]
+        assert batches == [1, 2, 2]
+        alpha = next(zone for zone in zones_after if zone["name"] == "alpha")
+        dev = next(env for env in alpha["environments"] if env["name"] == "dev")
+        assert sorted(s["fqdn"] for s in dev["servers"]) == ["a.example.com", "b.example.com", "c.example.com"]
+        assert next(s for s in dev["servers"] if s["fqdn"] == "a.example.com")["ip"] == "10.0.0.9"
+        assert sorted(env["name"] for env in alpha["environments"]) == ["dev", "qa"]
+
+    def test_import_replace(self, store):
+        """Тест импорта с заменой всего инвентаря"""
+        async def zones():
+            yield {"name": "beta", "type": "zone", "environments": [{"name": "prod", "servers": [server("a.example.com")]}]}
+            yield {"name": "gamma", "type": "zone", "environments": []}
+
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com")]},
+            ]})
+            await store.create_zone({"name": "beta", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("b.example.com")]},
+            ]})
+            summary = await store.import_zones(zones(), "replace")
+            return summary, await store.list_zones()
+
+        summary, zones_after = asyncio.run(scenario())
+
+        assert summary["zones"] == 2
+        assert summary["deleted"] == 1
+        assert zones_after == [
+            {"name": "beta", "type": "zone", "environments": [{"name": "prod", "servers": [server("a.example.com")]}]},
+            {"name": "gamma", "type": "zone", "environments": []},
+        ]
+
+    @pytest.mark.parametrize("cached", [False, True])
+    def test_list_zones_page(self, store, cached):
+        """Тест постраничного чтения зон"""
+        async def scenario():
+            # Зона a-b проверяет порядок, в котором "env:a-b:" идет раньше "env:a:"
+            for name in ["a", "a-b", "b", "c"]:
+                await store.create_zone({"name": name, "type": "zone", "environments": [
+                    {"name": "dev", "servers": [server(f"{name}.example.com")]},
+                ]})
+            if cached:
+                await store.load_cache()
+            first, next_start = await store.list_zones_page(None, 2)
+            second, last_start = await store.list_zones_page(next_start, 2)
+            streamed = [zone async for zone in store.iter_zones(batch_size=3)]
+            return first, next_start, second, last_start, streamed
+
+        first, next_start, second, last_start, streamed = asyncio.run(scenario())
+
+        assert [zone["name"] for zone in first] == ["a", "a-b"]
+        assert first[1]["environments"][0]["servers"] == [server("a-b.example.com")]
+        assert next_start == "b"
+        assert [zone["name"] for zone in second] == ["b", "c"]
+        assert last_start is None
+        assert [zone["name"] for zone in streamed] == ["a", "a-b", "b", "c"]
+
+    def test_etag_and_if_match(self, store):
+        """Тест ETag зоны и условной записи с If-Match"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": []},
+            ]})
+            zone, etag = await store.get_zone_versioned("alpha")
+            _, list_etag = await store.list_zones_versioned()
+            await store.add_server("alpha", "dev", server("a.example.com"), if_match=etag)
+            _, new_etag = await store.get_zone_versioned("alpha")
+            _, new_list_etag = await store.list_zones_versioned()
+            with pytest.raises(HTTPException) as exc_info:
+                await store.add_server("alpha", "dev", server("b.example.com"), if_match=etag)
+            await store.delete_server("alpha", "dev", "a.example.com", if_match=f"W/{new_etag}, \"other\"")
+            return zone, etag, list_etag, new_etag, new_list_etag, exc_info.value, await store.get_zone("alpha")
+
+        zone, etag, list_etag, new_etag, new_list_etag, error, final = asyncio.run(scenario())
+
+        assert zone["name"] == "alpha"
+        assert etag.startswith('"') and etag.endswith('"')
+        assert new_etag != etag
+        assert new_list_etag != list_etag
+        assert error.status_code == 412
+        assert final["environments"] == [{"name": "dev", "servers": []}]
+        assert asyncio.run(store.get_zone_versioned("missing")) == (None, None)
+
+    @pytest.mark.parametrize("operation, status_code", [
+        (lambda s: s.create_zone({"name": "alpha", "type": "zone", "environments": []}), 400),
+        (lambda s: s.create_environment("alpha", {"name": "dev", "servers": []}), 400),
+        (lambda s: s.create_environment("missing", {"name": "dev", "servers": []}), 404),
+        (lambda s: s.add_server("alpha", "dev", server("a.example.com")), 400),
+        (lambda s: s.add_server("alpha", "missing", server("b.example.com")), 404),
+        (lambda s: s.update_server("alpha", "dev", "missing.example.com", server("missing.example.com")), 404),
+        (lambda s: s.delete_server("alpha", "dev", "missing.example.com"), 404),
+        (lambda s: s.delete_environment("alpha", "missing"), 404),
+        (lambda s: s.update_zone("missing", {"name": "missing", "type": "zone", "environments": []}), 404),
+        (lambda s: s.delete_zone("alpha", if_match='"1-stale"'), 412),
+        (lambda s: s.create_environment("alpha", {"name": "qa", "servers": []}, if_match='"1-stale"'), 412),
+    ])
+    def test_errors(self, store, operation, status_code):
+        """Тест ошибок, одинаковых для всех схем размещения данных"""
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com")]},
+            ]})
+            await operation(store)
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(scenario())
+
+        assert exc_info.value.status_code == status_code
+
+@pytest.fixture
+def normalized_store(pouchdb_client, fake_pouchdb):
+    """Фикстура хранилища с нормализованной схемой размещения данных"""
+    fake_pouchdb.dbs["server_resources"] = {}
+    return NormalizedZoneStore(pouchdb_client, cache_max_bytes=1024 * 1024)
+
+class TestNormalizedZoneStore:
+    """Тесты для нормализованной схемы размещения данных"""
+
+    def test_documents_layout(self, normalized_store, fake_pouchdb):
+        """Тест размещения зоны, окружений и серверов в отдельных документах"""
+        store = normalized_store
+
+        asyncio.run(store.create_zone({"name": "alpha", "type": "zone", "environments": [
+            {"name": "dev", "servers": [server("a.example.com")]},
+        ]}))
+
+        docs = fake_pouchdb.dbs["server_resources"]
+        assert sorted(docs) == ["env:alpha:dev", "server:alpha:dev:a.example.com", "zone:alpha"]
+        assert "environments" not in docs["zone:alpha"]
+        assert docs["server:alpha:dev:a.example.com"]["ip"] == "10.0.0.1"
+
+    def test_add_server_writes_single_document(self, normalized_store, fake_pouchdb):
+        """Тест записи только документа сервера при добавлении сервера"""
+        store = normalized_store
+        asyncio.run(store.create_zone({"name": "alpha", "type": "zone", "environments": [{"name": "dev", "servers": []}]}))
+        zone_rev = fake_pouchdb.dbs["server_resources"]["zone:alpha"]["_rev"]
+        fake_pouchdb.requests.clear()
+
+        asyncio.run(store.add_server("alpha", "dev", server("a.example.com")))
+
+        writes = [request for request in fake_pouchdb.requests if request.method != "GET"]
+        assert len(writes) == 1
+        assert writes[0].url.path.endswith("server:alpha:dev:a.example.com")
+        assert fake_pouchdb.dbs["server_resources"]["zone:alpha"]["_rev"] == zone_rev
+
+    def test_delete_environment_single_write(self, normalized_store, fake_pouchdb):
+        """Тест удаления окружения и его серверов одной пакетной записью"""
+        store = normalized_store
+        asyncio.run(store.create_zone({"name": "alpha", "type": "zone", "environments": [
+            {"name": "dev", "servers": [server("a.example.com"), server("b.example.com")]},
+        ]}))
+        fake_pouchdb.requests.clear()
+
+        asyncio.run(store.delete_environment("alpha", "dev"))
+
+        writes = [request for request in fake_pouchdb.requests if request.method != "GET"]
+        assert [request.url.path for request in writes] == ["/server_resources/_bulk_docs"]
+        assert sorted(fake_pouchdb.dbs["server_resources"]) == ["zone:alpha"]
+
+    def test_rename_server(self, normalized_store, fake_pouchdb):
+        """Тест изменения FQDN сервера"""
+        store = normalized_store
+
+        async def scenario():
+            await store.create_zone({"name": "alpha", "type": "zone", "environments": [
+                {"name": "dev", "servers": [server("a.example.com"), server("b.example.com")]},
+            ]})
+            await store.update_server("alpha", "dev", "a.example.com", server("c.example.com"))
+            with pytest.raises(HTTPException) as exc_info:
+                await store.update_server("alpha", "dev", "c.example.com", server("b.example.com"))
+            assert exc_info.value.status_code == 400
+            return await store.get_zone("alpha")
+
+        zone = asyncio.run(scenario())
+
+        assert [s["fqdn"] for s in zone["environments"][0]["servers"]] == ["b.example.com", "c.example.com"]
+
+    def test_rejects_colon_in_names(self, normalized_store, fake_pouchdb):
+        """Тест запрета символа ':' в именах"""
+        store = normalized_store
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(store.create_zone({"name": "a:b", "type": "zone", "environments": []}))
+
+        assert exc_info.value.status_code == 400
+
+    def test_reads_from_cache(self, normalized_store, fake_pouchdb):
+        """Тест сборки дерева зоны из кэша"""
+        store = normalized_store
+        asyncio.run(store.create_zone({"name": "alpha", "type": "zone", "environments": [
+            {"name": "dev", "servers": [server("a.example.com")]},
+        ]}))
+        asyncio.run(store.load_cache())
+        fake_pouchdb.requests.clear()
+
+        zone = asyncio.run(store.get_zone("alpha"))
+
+        assert zone["environments"][0]["servers"] == [server("a.example.com")]
+        assert fake_pouchdb.requests == []
+
+@pytest.fixture
+def embedded_store(pouchdb_client, fake_pouchdb):
+    """Фикстура хранилища со схемой embedded и двумя окружениями в зоне alpha"""
+    fake_pouchdb.dbs["server_resources"] = {}
+    fake_pouchdb.put_doc("server_resources", {"_id": "zone:alpha", "name": "alpha", "type": "zone", "environments": [
+        {"name": "dev", "servers": []},
+        {"name": "prod", "servers": []},
+    ]})
+    return EmbeddedZoneStore(pouchdb_client, cache_max_bytes=1024 * 1024)
+
+class TestEmbeddedZoneStore:
+    """Тесты повторного применения изменений зоны при конфликте ревизий"""
+
+    def test_concurrent_writes_are_merged(self, embedded_store, fake_pouchdb):
+        """Тест одновременного добавления серверов в разные окружения одной зоны"""
+        store = embedded_store
+        store.write_batch_max_size = 1
+
+        async def scenario():
+            await asyncio.gather(
+                store.add_server("alpha", "dev", server("a.example.com")),
+                store.add_server("alpha", "prod", server("b.example.com")),
+                store.add_server("alpha", "prod", server("c.example.com")),
+            )
+
+        asyncio.run(scenario())
+
+        zone = fake_pouchdb.dbs["server_resources"]["zone:alpha"]
+        assert zone["environments"][0]["servers"] == [server("a.example.com")]
+        assert sorted(s["fqdn"] for s in zone["environments"][1]["servers"]) == ["b.example.com", "c.example.com"]
+        assert zone["_rev"].startswith("4-")
+
+    def test_group_commit(self, embedded_store, fake_pouchdb):
+        """Тест записи одновременных изменений зоны одним запросом"""
+        store = embedded_store
+        asyncio.run(store.load_cache())
+        fake_pouchdb.requests.clear()
+
+        async def scenario():
+            return await asyncio.gather(
+                *[store.add_server("alpha", "prod", server(f"web{i}.example.com")) for i in range(20)],
+                store.add_server("alpha", "dev", server("web0.example.com")),
+                store.add_server("alpha", "missing", server("db.example.com")),
+                store.bulk_servers("alpha", "dev", [{"op": "create", "server": server("db.example.com")}]),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(scenario())
+
+        zone = fake_pouchdb.dbs["server_resources"]["zone:alpha"]
+        assert results[:20] == [None] * 20
+        # FQDN, добавленный в той же группе, уже занят
+        assert results[20].status_code == 400
+        assert results[21].status_code == 404
+        assert results[22] == [{"op": "create", "fqdn": "db.example.com", "status_code": 200, "detail": None}]
+        assert len(zone["environments"][1]["servers"]) == 20
+        assert zone["environments"][0]["servers"] == [server("db.example.com")]
+        assert [request.method for request in fake_pouchdb.requests] == ["PUT"]
+
+    def test_writer_context(self, embedded_store, fake_pouchdb, pouchdb_client):
+        """Тест записи группы вне контекста запроса, запустившего ее"""
+        from admission import AdmissionController, PRIORITY_BULK, admission_scope
+        from profiling import RequestProfile, profile_scope
+
+        store = embedded_store
+        asyncio.run(store.load_cache())
+        priorities = []
+        pouchdb_client.admission = AdmissionController(observer=lambda priority, waited: priorities.append(priority))
+        profile = RequestProfile()
+
+        async def scenario():
+            with profile_scope(profile), admission_scope(PRIORITY_BULK):
+                await store.add_server("alpha", "prod", server("web1.example.com"))
+
+        asyncio.run(scenario())
+
+        # Запрос допущен с пакетным приоритетом, а запись группы идет с приоритетом записи
+        assert priorities == ["bulk", "write"]
+        assert profile.calls == []
+        assert fake_pouchdb.dbs["server_resources"]["zone:alpha"]["environments"][1]["servers"] == [server("web1.example.com")]
+
+    def test_if_match_is_not_batched(self, embedded_store, fake_pouchdb):
+        """Тест отдельной записи изменения с If-Match"""
+        store = embedded_store
+        _, etag = asyncio.run(store.get_zone_versioned("alpha"))
+
+        async def scenario():
+            return await asyncio.gather(
+                store.add_server("alpha", "dev", server("a.example.com"), if_match=etag),
+                store.add_server("alpha", "prod", server("b.example.com"), if_match=etag),
+                return_exceptions=True,
+            )
+
+        first, second = asyncio.run(scenario())
+
+        assert first is None
+        assert second.status_code == 412
+
+    def test_stale_cache_is_replayed(self, embedded_store, fake_pouchdb):
+        """Тест записи поверх устаревшего документа из кэша"""
+        store = embedded_store
+        asyncio.run(store.load_cache())
+        # Зону изменил другой процесс, лента изменений еще не доставила запись
+        zone = dict(fake_pouchdb.dbs["server_resources"]["zone:alpha"], description="changed")
+        fake_pouchdb.put_doc("server_resources", zone)
+        fake_pouchdb.requests.clear()
+
+        asyncio.run(store.delete_environment("alpha", "dev"))
+
+        stored = fake_pouchdb.dbs["server_resources"]["zone:alpha"]
+        assert stored["description"] == "changed"
+        assert [env["name"] for env in stored["environments"]] == ["prod"]
+        assert [request.method for request in fake_pouchdb.requests] == ["PUT", "GET", "PUT"]
+
+    def test_replay_does_not_reuse_request_data(self, embedded_store, fake_pouchdb):
+        """Тест повтора группы, где сервер добавляется в созданное в ней же окружение"""
+        store = embedded_store
+        asyncio.run(store.load_cache())
+        zone = dict(fake_pouchdb.dbs["server_resources"]["zone:alpha"], description="changed")
+        fake_pouchdb.put_doc("server_resources", zone)
+        environment = {"name": "qa", "servers": []}
+
+        async def scenario():
+            return await asyncio.gather(
+                store.create_environment("alpha", environment),
+                store.add_server("alpha", "qa", server("qa1.example.com")),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(scenario())
+
+        stored = fake_pouchdb.dbs["server_resources"]["zone:alpha"]
+        assert results == [None, None]
+        assert stored["environments"][2] == {"name": "qa", "servers": [server("qa1.example.com")]}
+        assert environment == {"name": "qa", "servers": []}
+
+    def test_replay_rechecks_conditions(self, embedded_store, fake_pouchdb):
+        """Тест ошибки, если после повторного чтения изменение уже неприменимо"""
+        store = embedded_store
+        asyncio.run(store.load_cache())
+        zone = fake_pouchdb.dbs["server_resources"]["zone:alpha"]
+        fake_pouchdb.put_doc("server_resources", dict(zone, environments=[{"name": "prod", "servers": []}]))
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(store.add_server("alpha", "dev", server("a.example.com")))
+
+        assert exc_info.value.status_code == 404
+
+    def test_retries_exhausted(self, embedded_store, fake_pouchdb):
+        """Тест ошибки 409 после исчерпания повторов"""
+        store = embedded_store
+        store.write_retries = 0
+        asyncio.run(store.load_cache())
+        fake_pouchdb.put_doc("server_resources", fake_pouchdb.dbs["server_resources"]["zone:alpha"])
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(store.add_server("alpha", "dev", server("a.example.com")))
+
+        assert exc_info.value.status_code == 409
+
+def test_cursor():
+    """Тест кодирования курсора постраничного чтения"""
+    assert decode_cursor(encode_cursor("зона-1")) == "зона-1"
+    with pytest.raises(HTTPException):
+        decode_cursor("@@@")
+
+def test_unknown_layout(pouchdb_client):
+    """Тест неизвестной схемы размещения данных"""
+    with pytest.raises(ValueError):
+        create_zone_store("unknown", pouchdb_client, cache_max_bytes=1024)
+    assert isinstance(create_zone_store(LAYOUT_EMBEDDED, pouchdb_client, 1024), EmbeddedZoneStore)
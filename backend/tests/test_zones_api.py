@@ -0,0 +1,457 @@
+import pytest
+import sys
+import os
+import asyncio
+import json
+import gzip
+
+# Добавляем родительскую директорию в sys.path для импорта модулей
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from main import app, get_current_active_user, User
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+@pytest.fixture
+def api_db(monkeypatch, pouchdb_client, fake_pouchdb):
+    """Фикстура API с базой PouchDB в памяти и отключенной проверкой токена"""
+    monkeypatch.setattr(main, "db", pouchdb_client)
+    monkeypatch.setattr(main.zone_store, "client", pouchdb_client)
+    app.dependency_overrides[get_current_active_user] = lambda: User(username="testuser")
+    fake_pouchdb.dbs["server_resources"] = {}
+    fake_pouchdb.dbs["users"] = {}
+    yield fake_pouchdb
+    app.dependency_overrides.clear()
+    main.zone_store.deactivate()
+
+def zone_doc(name, environments=None):
+    return {"_id": f"zone:{name}", "name": name, "type": "zone", "environments": environments or []}
+
+class TestZonesApi:
+    """Тесты API зон поверх базы PouchDB в памяти"""
+
+    def test_get_all_zones_reads_zone_range(self, api_db):
+        """Тест чтения списка зон по диапазону идентификаторов"""
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+        api_db.put_doc("server_resources", zone_doc("beta"))
+        api_db.put_doc("server_resources", {"_id": "audit:1", "type": "audit"})
+        api_db.put_doc("server_resources", {"_id": "zzz:1", "type": "other"})
+
+        response = client.get("/zones/")
+
+        assert response.status_code == 200
+        assert [zone["name"] for zone in response.json()] == ["alpha", "beta"]
+        all_docs_request = api_db.requests[-1]
+        assert all_docs_request.url.params["startkey"] == '"zone:"'
+        assert all_docs_request.url.params["endkey"] == '"zone:\\ufff0"'
+
+    def test_create_zone(self, api_db):
+        """Тест создания зоны одним запросом к базе"""
+        response = client.post("/zones/", json={"name": "alpha", "environments": []})
+
+        assert response.status_code == 200
+        assert response.json()["id"] == "zone:alpha"
+        assert [request.method for request in api_db.requests] == ["PUT"]
+        assert api_db.dbs["server_resources"]["zone:alpha"]["name"] == "alpha"
+
+    def test_create_zone_duplicate(self, api_db):
+        """Тест создания зоны с уже существующим именем"""
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+
+        response = client.post("/zones/", json={"name": "alpha", "environments": []})
+
+        assert response.status_code == 400
+
+    def test_add_server(self, api_db):
+        """Тест добавления сервера без лишнего чтения перед записью"""
+        api_db.put_doc("server_resources", zone_doc("alpha", [{"name": "prod", "servers": []}]))
+        server = {"fqdn": "web1.example.com", "ip": "10.0.0.1", "status": "available", "server_type": "web"}
+        # Уникальность FQDN проверяется по индексу серверов без чтения всех зон
+        asyncio.run(main.zone_store.load_cache())
+        api_db.requests.clear()
+
+        response = client.post("/zones/alpha/environments/prod/servers/", json=server)
+
+        assert response.status_code == 200
+        # Первая попытка записи использует документ зоны из кэша
+        assert [request.method for request in api_db.requests] == ["PUT"]
+        stored = api_db.dbs["server_resources"]["zone:alpha"]
+        assert stored["environments"][0]["servers"] == [server]
+
+class TestZonesPaginationApi:
+    """Тесты постраничной и потоковой выдачи списка зон"""
+
+    def test_pages(self, api_db):
+        """Тест обхода зон по курсору"""
+        for name in ["alpha", "beta", "gamma"]:
+            api_db.put_doc("server_resources", zone_doc(name))
+
+        first = client.get("/zones/", params={"limit": 2})
+        second = client.get("/zones/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+
+        assert [zone["name"] for zone in first.json()] == ["alpha", "beta"]
+        assert [zone["name"] for zone in second.json()] == ["gamma"]
+        assert "X-Next-Cursor" not in second.headers
+        assert api_db.requests[-1].url.params["limit"] == "3"
+
+    def test_invalid_limit_and_cursor(self, api_db):
+        """Тест некорректных параметров страницы"""
+        assert client.get("/zones/", params={"limit": 0}).status_code == 422
+        assert client.get("/zones/", params={"cursor": "@@@"}).status_code == 400
+
+    def test_ndjson_stream(self, api_db, monkeypatch):
+        """Тест потоковой выдачи зон по одной на строку"""
+        monkeypatch.setattr(main, "ZONES_STREAM_BATCH_SIZE", 2)
+        for name in ["alpha", "beta", "gamma"]:
+            api_db.put_doc("server_resources", zone_doc(name))
+
+        response = client.get("/zones/", headers={"Accept": "application/x-ndjson"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["alpha", "beta", "gamma"]
+        # Зоны читались из PouchDB пакетами
+        assert len([r for r in api_db.requests if r.url.path.endswith("_all_docs")]) == 2
+
+class TestBulkServersApi:
+    """Тесты пакетной записи серверов"""
+
+    def test_bulk_servers(self, api_db):
+        """Тест добавления нескольких серверов одной записью зоны"""
+        api_db.put_doc("server_resources", zone_doc("alpha", [{"name": "prod", "servers": []}]))
+        operations = [
+            {"op": "create", "server": {"fqdn": f"web{i}.example.com", "ip": f"10.0.0.{i}", "status": "available", "server_type": "web"}}
+            for i in range(3)
+        ]
+        operations.append({"op": "delete", "fqdn": "missing.example.com"})
+
+        response = client.post("/zones/alpha/environments/prod/servers/_bulk", json=operations)
+
+        assert response.status_code == 200
+        assert [result["status_code"] for result in response.json()] == [200, 200, 200, 404]
+        assert len(api_db.dbs["server_resources"]["zone:alpha"]["environments"][0]["servers"]) == 3
+        assert [request.method for request in api_db.requests if "_all_docs" not in request.url.path] == ["GET", "PUT"]
+
+    def test_bulk_servers_limit(self, api_db, monkeypatch):
+        """Тест ограничения размера пакета"""
+        monkeypatch.setattr(main, "BULK_MAX_OPERATIONS", 1)
+
+        response = client.post("/zones/alpha/environments/prod/servers/_bulk", json=[
+            {"op": "delete", "fqdn": "a.example.com"}, {"op": "delete", "fqdn": "b.example.com"},
+        ])
+
+        assert response.status_code == 400
+
+class TestImportApi:
+    """Тесты импорта инвентаря"""
+
+    def test_import_ndjson(self, api_db, monkeypatch):
+        """Тест потокового импорта NDJSON пакетами"""
+        monkeypatch.setattr(main, "IMPORT_BATCH_SIZE", 2)
+        lines = [
+            json.dumps({"name": f"zone{i}", "environments": [{"name": "prod", "servers": [
+                {"fqdn": f"web{i}.example.com", "ip": "10.0.0.1", "status": "available", "server_type": "web"},
+            ]}]})
+            for i in range(5)
+        ]
+        lines.append(json.dumps({"name": "broken", "environments": "oops"}))
+
+        response = client.post(
+            "/import", content="\n".join(lines), headers={"Content-Type": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        summary = response.json()
+        assert (summary["zones"], summary["servers"], summary["failed"]) == (5, 5, 1)
+        assert summary["errors"][0]["zone"] == "broken"
+        assert len([r for r in api_db.requests if r.url.path.endswith("_bulk_docs")]) == 3
+        progress = client.get("/import/progress").json()
+        assert progress["done"] is True
+        assert progress["zones"] == 5
+
+    def test_import_json_replace(self, api_db):
+        """Тест импорта JSON в режиме replace"""
+        api_db.put_doc("server_resources", zone_doc("old"))
+
+        response = client.post(
+            "/import", params={"mode": "replace"}, content=json.dumps({"zones": [{"name": "new", "environments": []}]})
+        )
+
+        assert response.status_code == 200
+        assert response.json()["deleted"] == 1
+        assert sorted(api_db.dbs["server_resources"]) == ["zone:new"]
+
+    def test_import_invalid(self, api_db):
+        """Тест ошибок импорта"""
+        assert client.post("/import", params={"mode": "append"}, content="[]").status_code == 400
+        assert client.post("/import", content="not json").status_code == 400
+        assert client.get("/import/progress").json()["done"] is True
+
+class TestExportApi:
+    """Тесты экспорта инвентаря"""
+
+    def setup_zones(self, api_db):
+        for name in ["alpha", "beta", "gamma"]:
+            api_db.put_doc("server_resources", zone_doc(name, [{"name": "prod", "servers": []}]))
+
+    def test_export_json(self, api_db, monkeypatch):
+        """Тест экспорта в JSON постраничным чтением зон"""
+        monkeypatch.setattr(main, "ZONES_STREAM_BATCH_SIZE", 2)
+        self.setup_zones(api_db)
+
+        response = client.get("/export")
+
+        assert response.status_code == 200
+        assert [zone["name"] for zone in response.json()["zones"]] == ["alpha", "beta", "gamma"]
+        assert "inventory.json" in response.headers["content-disposition"]
+        assert len([r for r in api_db.requests if r.url.path.endswith("_all_docs")]) == 2
+
+    def test_export_ndjson_gzip(self, api_db):
+        """Тест экспорта в NDJSON со сжатием gzip"""
+        self.setup_zones(api_db)
+
+        response = client.get("/export", params={"format": "ndjson", "compress": "true"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["alpha", "beta", "gamma"]
+
+    def test_export_unknown_format(self, api_db):
+        """Тест неизвестного формата экспорта"""
+        assert client.get("/export", params={"format": "xml"}).status_code == 400
+
+class TestZoneCacheApi:
+    """Тесты чтения зон из кэша"""
+
+    def test_reads_served_from_cache(self, api_db):
+        """Тест чтения зон из памяти без обращения к PouchDB"""
+        main.zone_cache.load([dict(zone_doc("alpha"), _rev="1-a")])
+
+        list_response = client.get("/zones/")
+        zone_response = client.get("/zones/alpha")
+        missing_response = client.get("/zones/beta")
+
+        assert [zone["name"] for zone in list_response.json()] == ["alpha"]
+        assert zone_response.json()["name"] == "alpha"
+        assert missing_response.status_code == 404
+        assert api_db.requests == []
+
+    def test_writes_update_cache(self, api_db):
+        """Тест обновления кэша после записи"""
+        main.zone_cache.load([])
+
+        client.post("/zones/", json={"name": "alpha", "environments": []})
+        client.post("/zones/alpha/environments/", json={"name": "prod", "servers": []})
+        response = client.get("/zones/alpha")
+
+        assert response.json()["environments"] == [{"name": "prod", "servers": []}]
+        assert main.zone_cache.stats()["hits"] >= 1
+
+    def test_cache_stats(self, api_db):
+        """Тест получения статистики кэша"""
+        response = client.get("/cache/stats")
+
+        assert response.status_code == 200
+        assert "hit_ratio" in response.json()["zones"]
+
+    def test_metrics(self, api_db, pouchdb_client, monkeypatch):
+        """Тест выдачи метрик запросов, операций PouchDB и кэшей"""
+        monkeypatch.setattr(pouchdb_client, "observer", main.observe_pouchdb_call)
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+
+        client.get("/zones/alpha")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/zones/{zone_name}",status="200"}' in text
+        assert 'pouchdb_request_duration_seconds_count{operation="get_doc",outcome="ok"}' in text
+        assert 'cache_hit_ratio{cache="zones"}' in text
+        assert "pouchdb_conflict_retries_total" in text
+
+    def test_overloaded(self, api_db, pouchdb_client, monkeypatch):
+        """Тест быстрого ответа 503 при переполненной очереди обращений к базе"""
+        monkeypatch.setattr(pouchdb_client, "admission", main.admission)
+        monkeypatch.setattr(main.admission, "max_concurrency", 0)
+        monkeypatch.setattr(main.admission, "max_queue", 0)
+        monkeypatch.setattr(main.admission, "rejected", {"read": 0, "write": 0, "bulk": 0})
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+
+        response = client.get("/zones/alpha")
+        bulk = client.post("/zones/alpha/environments/prod/servers/_bulk", json=[])
+        export = client.get("/export")
+        imported = client.post("/import", json={"zones": [{"name": "beta", "environments": []}]})
+        progress = client.get("/import/progress").json()
+        metrics = client.get("/metrics").text
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(main.admission.retry_after)
+        assert bulk.status_code == 503
+        # Экспорт отклоняется до начала потока, а не обрывается с кодом 200
+        assert export.status_code == 503
+        assert imported.status_code == 503
+        assert progress["done"] and "перегружен" in progress["error"]
+        assert 'pouchdb_admission_rejected_total{priority="read"} 1' in metrics
+        assert 'pouchdb_admission_rejected_total{priority="bulk"} 3' in metrics
+        assert 'pouchdb_admission_queue_depth{priority="read"} 0' in metrics
+
+class TestFastZoneResponsesApi:
+    """Тесты быстрой выдачи зон"""
+
+    @pytest.mark.parametrize("path", ["/zones/", "/zones/?limit=1", "/zones/alpha"])
+    def test_same_output_as_response_model(self, api_db, monkeypatch, path):
+        """Тест совпадения ответов быстрого режима и валидации через response_model"""
+        servers = [{"fqdn": "web1.example.com", "ip": "10.0.0.1", "status": "available", "server_type": "web"}]
+        api_db.put_doc("server_resources", dict(zone_doc("alpha", [{"name": "prod", "servers": servers}]), layout="embedded"))
+        api_db.put_doc("server_resources", zone_doc("beta"))
+
+        monkeypatch.setattr(main, "FAST_ZONE_RESPONSES", True)
+        fast = client.get(path)
+        monkeypatch.setattr(main, "FAST_ZONE_RESPONSES", False)
+        slow = client.get(path)
+
+        assert fast.status_code == slow.status_code == 200
+        assert fast.json() == slow.json()
+        assert fast.headers.get("ETag") == slow.headers.get("ETag")
+        assert fast.headers.get("X-Next-Cursor") == slow.headers.get("X-Next-Cursor")
+
+class TestConditionalRequestsApi:
+    """Тесты ETag, If-None-Match и If-Match"""
+
+    def test_get_zone_not_modified(self, api_db):
+        """Тест ответа 304 на запрос зоны с актуальным ETag"""
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+
+        first = client.get("/zones/alpha")
+        second = client.get("/zones/alpha", headers={"If-None-Match": first.headers["ETag"]})
+        stale = client.get("/zones/alpha", headers={"If-None-Match": '"0-old"'})
+
+        assert first.headers["ETag"] == f'"{api_db.dbs["server_resources"]["zone:alpha"]["_rev"]}"'
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert stale.status_code == 200
+
+    def test_list_zones_not_modified(self, api_db):
+        """Тест ETag списка зон, меняющегося при записи"""
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+        etag = client.get("/zones/").headers["ETag"]
+
+        not_modified = client.get("/zones/", headers={"If-None-Match": etag})
+        client.post("/zones/", json={"name": "beta", "environments": []})
+        modified = client.get("/zones/", headers={"If-None-Match": etag})
+
+        assert not_modified.status_code == 304
+        assert modified.status_code == 200
+        assert modified.headers["ETag"] != etag
+
+    def test_compressed_zone_weak_etag(self, api_db):
+        """Тест слабого ETag сжатой зоны и условных запросов с ним"""
+        servers = [
+            {"fqdn": f"web{i}.example.com", "ip": f"10.0.0.{i}", "status": "available", "server_type": "web"}
+            for i in range(50)
+        ]
+        api_db.put_doc("server_resources", zone_doc("alpha", [{"name": "prod", "servers": servers}]))
+
+        compressed = client.get("/zones/alpha", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/zones/alpha", headers={"Accept-Encoding": "identity"})
+        not_modified = client.get(
+            "/zones/alpha", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]}
+        )
+        updated = client.post(
+            "/zones/alpha/environments/", json={"name": "qa", "servers": []},
+            headers={"If-Match": compressed.headers["ETag"]}
+        )
+
+        assert compressed.headers["Content-Encoding"] == "gzip"
+        assert compressed.headers["ETag"] == "W/" + identity.headers["ETag"]
+        assert "Content-Encoding" not in identity.headers
+        assert not_modified.status_code == 304
+        assert updated.status_code == 200
+
+    def test_if_match_write_without_read(self, api_db):
+        """Тест записи с If-Match без чтения зоны перед записью"""
+        main.zone_cache.load([])
+        client.post("/zones/", json={"name": "alpha", "environments": []})
+        etag = client.get("/zones/alpha").headers["ETag"]
+        api_db.requests.clear()
+
+        response = client.post(
+            "/zones/alpha/environments/", json={"name": "prod", "servers": []}, headers={"If-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert [request.method for request in api_db.requests] == ["PUT"]
+        assert response.headers["ETag"] != etag
+        assert response.headers["ETag"] == client.get("/zones/alpha").headers["ETag"]
+
+    def test_if_match_stale(self, api_db):
+        """Тест отказа 412 при устаревшем If-Match"""
+        api_db.put_doc("server_resources", zone_doc("alpha"))
+        etag = client.get("/zones/alpha").headers["ETag"]
+        client.put("/zones/alpha", json={"name": "alpha", "environments": [{"name": "qa", "servers": []}]})
+
+        response = client.delete("/zones/alpha", headers={"If-Match": etag})
+
+        assert response.status_code == 412
+        assert "zone:alpha" in api_db.dbs["server_resources"]
+
+class TestServerLookupApi:
+    """Тесты поиска серверов по FQDN и IP"""
+
+    def server(self, fqdn, ip):
+        return {"fqdn": fqdn, "ip": ip, "status": "available", "server_type": "web"}
+
+    def setup_zones(self, api_db):
+        api_db.put_doc("server_resources", zone_doc("alpha", [
+            {"name": "prod", "servers": [self.server("web1.example.com", "10.0.0.1")]},
+        ]))
+        api_db.put_doc("server_resources", zone_doc("beta", [
+            {"name": "qa", "servers": [self.server("web2.example.com", "10.0.0.1")]},
+        ]))
+
+    @pytest.mark.parametrize("indexed", [True, False])
+    def test_find_by_fqdn(self, api_db, indexed):
+        """Тест поиска сервера по FQDN по индексу и обходом зон"""
+        self.setup_zones(api_db)
+        if indexed:
+            asyncio.run(main.zone_store.load_cache())
+        api_db.requests.clear()
+
+        response = client.get("/servers/by-fqdn/web2.example.com")
+
+        assert response.status_code == 200
+        assert response.json() == {"zone": "beta", "environment": "qa", "server": self.server("web2.example.com", "10.0.0.1")}
+        assert (api_db.requests == []) == indexed
+
+    def test_find_by_ip(self, api_db):
+        """Тест поиска серверов по IP-адресу"""
+        self.setup_zones(api_db)
+        asyncio.run(main.zone_store.load_cache())
+
+        response = client.get("/servers/by-ip/10.0.0.1")
+
+        assert response.status_code == 200
+        assert sorted(location["zone"] for location in response.json()) == ["alpha", "beta"]
+
+    def test_not_found(self, api_db):
+        """Тест поиска отсутствующего сервера"""
+        self.setup_zones(api_db)
+
+        assert client.get("/servers/by-fqdn/missing.example.com").status_code == 404
+        assert client.get("/servers/by-ip/10.9.9.9").status_code == 404
+
+    def test_fqdn_unique_across_zones(self, api_db):
+        """Тест запрета одинакового FQDN в разных зонах"""
+        self.setup_zones(api_db)
+        asyncio.run(main.zone_store.load_cache())
+
+        response = client.post("/zones/beta/environments/qa/servers/", json=self.server("web1.example.com", "10.0.0.5"))
+
+        assert response.status_code == 400
+        assert "alpha" in response.json()["detail"]
@@ -0,0 +1,103 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Сколько документов запоминается за один запрос
+DEFAULT_MAX_DOCS = 1000
+
+_current_unit: ContextVar[Optional["UnitOfWork"]] = ContextVar("unit_of_work", default=None)
+
+DocKey = Tuple[str, str]
+# Запомненный документ: JSON в том виде, в каком он пришел из PouchDB или
+# был отправлен в нее, и поля, которые нужно заменить (например, новый _rev)
+DocEntry = Tuple[bytes, Dict[str, Any]]
+
+
+def current_unit() -> Optional["UnitOfWork"]:
+    return _current_unit.get()
+
+
+@contextmanager
+def unit_of_work(max_docs: int = DEFAULT_MAX_DOCS):
+    """Запоминать документы, прочитанные и записанные внутри блока"""
+    unit = UnitOfWork(max_docs)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+    finally:
+        _current_unit.reset(token)
+
+
+class UnitOfWork:
+    """
+    Документы PouchDB, прочитанные и записанные в рамках одного запроса.
+
+    Карта документов (identity map) позволяет клиенту PouchDB не читать
+    один и тот же документ повторно: проверка If-Match, поиск документа
+    и его запись видят одну и ту же ревизию. Отсутствующий документ тоже
+    запоминается (как None). Запись или конфликт обновляют карту, поэтому
+    она не отстает от изменений, сделанных самим запросом.
+
+    Документ хранится в виде JSON, уже полученного из PouchDB или
+    отправленного в нее, поэтому запоминание ничего не копирует, а
+    документ разбирается заново только при повторном чтении. Записи не
+    откладываются до конца запроса: каждая операция записывает свои
+    документы сразу.
+    """
+
+    def __init__(self, max_docs: int = DEFAULT_MAX_DOCS):
+        self.max_docs = max_docs
+        self._docs: Dict[DocKey, Optional[DocEntry]] = {}
+        self.hits = 0
+
+    def lookup(self, db_name: str, doc_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Запомненный документ.
+
+        Returns:
+            tuple: (известен ли документ, новая копия документа или None)
+        """
+        key = (db_name, doc_id)
+        if key not in self._docs:
+            return False, None
+        self.hits += 1
+        entry = self._docs[key]
+        if entry is None:
+            return True, None
+        raw, fields = entry
+        doc = json.loads(raw)
+        doc.update(fields)
+        return True, doc
+
+    def remember(self, db_name: str, doc_id: str, raw: Optional[bytes], **fields):
+        """
+        Запомнить документ.
+
+        Args:
+            raw: JSON документа или None, если документа нет
+            fields: Поля, заменяющие поля из raw
+        """
+        key = (db_name, doc_id)
+        if key in self._docs or len(self._docs) < self.max_docs:
+            self._docs[key] = (raw, fields) if raw is not None else None
+
+    def forget(self, db_name: str, doc_id: str):
+        self._docs.pop((db_name, doc_id), None)
+
+
+class UnitOfWorkMiddleware:
+    """Отдельная карта документов для каждого HTTP-запроса"""
+
+    def __init__(self, app: ASGIApp, max_docs: int = DEFAULT_MAX_DOCS):
+        self.app = app
+        self.max_docs = max_docs
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with unit_of_work(self.max_docs):
+            await self.app(scope, receive, send)
@@ -0,0 +1,1292 @@
+import asyncio
+import base64
+import binascii
+import contextvars
+import copy
+import hashlib
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from admission import PRIORITY_WRITE, admission_scope
+from doc_cache import DocumentCache
+from pouchdb_client import PouchDBClient, ConflictError
+from server_index import ServerIndex, server_locations
+
+# База данных с зонами, окружениями и серверами
+DB_NAME = "server_resources"
+
+# Сколько раз изменение зоны применяется заново к свежему документу
+# после конфликта ревизий
+DEFAULT_WRITE_RETRIES = int(os.getenv("ZONE_WRITE_RETRIES", "5"))
+
+# Групповая запись: изменения одной зоны, поступившие в течение окна
+# (сек), применяются к одному документу и записываются одним запросом
+DEFAULT_WRITE_BATCH_WINDOW = float(os.getenv("ZONE_WRITE_BATCH_WINDOW", "0.002"))
+DEFAULT_WRITE_BATCH_MAX_SIZE = int(os.getenv("ZONE_WRITE_BATCH_MAX_SIZE", "500"))
+
+# Варианты размещения данных в PouchDB
+LAYOUT_EMBEDDED = "embedded"
+LAYOUT_NORMALIZED = "normalized"
+
+def zone_id(zone_name: str) -> str:
+    return f"zone:{zone_name}"
+
+def environment_id(zone_name: str, env_name: str) -> str:
+    return f"env:{zone_name}:{env_name}"
+
+def server_id(zone_name: str, env_name: str, fqdn: str) -> str:
+    return f"server:{zone_name}:{env_name}:{fqdn}"
+
+def public_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Документ без служебных полей PouchDB"""
+    return {k: v for k, v in doc.items() if not k.startswith('_')}
+
+def deleted_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Запись _bulk_docs, удаляющая документ"""
+    return {"_id": doc["_id"], "_rev": doc["_rev"], "_deleted": True}
+
+def encode_cursor(zone_name: str) -> str:
+    """Непрозрачный курсор постраничного чтения: имя первой зоны следующей страницы"""
+    return base64.urlsafe_b64encode(zone_name.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+def docs_etag(docs: List[Dict[str, Any]]) -> str:
+    """
+    Сильный ETag набора документов.
+
+    Для одного документа это его ревизия, для нескольких - хэш
+    идентификаторов и ревизий, поэтому ETag меняется при любой записи.
+    """
+    if len(docs) == 1:
+        return f'"{docs[0]["_rev"]}"'
+    digest = hashlib.sha1()
+    for doc in docs:
+        digest.update(f'{doc["_id"]} {doc["_rev"]}\n'.encode("utf-8"))
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(header: str, etag: Optional[str]) -> bool:
+    """Совпадает ли ETag со значением заголовка If-Match или If-None-Match"""
+    if etag is None:
+        return False
+    for value in header.split(","):
+        value = value.strip()
+        if value.startswith("W/"):
+            value = value[2:]
+        if value == "*" or value == etag:
+            return True
+    return False
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(status_code=412, detail="Зона была изменена (не совпадает If-Match)")
+
+def write_conflict(zone_name: str) -> HTTPException:
+    return HTTPException(status_code=409, detail=f"Не удалось записать зону {zone_name}: она слишком часто изменяется")
+
+def zone_not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Зона не найдена")
+
+def environment_not_found(zone_name: str, env_name: str) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Окружение {env_name} не найдено в зоне {zone_name}")
+
+def server_not_found(env_name: str, fqdn: str) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Сервер с FQDN {fqdn} не найден в окружении {env_name}")
+
+def server_fqdn_taken(fqdn: str, location: Dict[str, Any]) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Сервер с FQDN {fqdn} уже существует в окружении {location['environment']} зоны {location['zone']}",
+    )
+
+# Операции пакетной записи серверов
+BULK_OPERATIONS = ("create", "update", "delete")
+
+# Режимы импорта: merge дополняет существующие зоны, replace заменяет весь инвентарь
+IMPORT_MERGE = "merge"
+IMPORT_REPLACE = "replace"
+IMPORT_MODES = (IMPORT_MERGE, IMPORT_REPLACE)
+
+# Сколько ошибок импорта возвращается подробно
+MAX_IMPORT_ERRORS = 100
+
+# Изменение документа зоны в схеме embedded (см. EmbeddedZoneStore._update_zone)
+Mutation = Callable[[Dict[str, Any]], Awaitable[Optional[bool]]]
+
+# Область записи: (зона, окружение, FQDN), None означает любое значение
+Scope = Tuple[str, Optional[str], Optional[str]]
+
+def in_scope(location: Dict[str, Any], scope: Optional[Scope]) -> bool:
+    """Относится ли сервер к области, которую перезаписывает операция"""
+    if scope is None:
+        return False
+    zone_name, env_name, fqdn = scope
+    return (location["zone"] == zone_name
+            and (env_name is None or location["environment"] == env_name)
+            and (fqdn is None or location["server"].get("fqdn") == fqdn))
+
+
+class ZoneStore:
+    """
+    Базовый класс хранилища зон.
+
+    Хранилище скрывает от маршрутов API способ размещения зон, окружений и
+    серверов в PouchDB. Чтение идет через кэш документов, пока он активен;
+    записи всегда читают актуальный документ из базы и обновляют кэш.
+    Индекс серверов по FQDN и IP обновляется вместе с кэшем и служит для
+    поиска серверов и проверки уникальности FQDN во всех зонах.
+    Методы принимают и возвращают словари в формате моделей Zone,
+    Environment и Server и выбрасывают HTTPException при ошибках.
+    """
+
+    layout: str = ""
+    cache_prefixes: Tuple[str, ...] = ("zone:",)
+
+    def __init__(
+        self, client: PouchDBClient, cache_max_bytes: int, db_name: str = DB_NAME,
+        write_retries: int = DEFAULT_WRITE_RETRIES,
+    ):
+        self.client = client
+        self.db_name = db_name
+        self.write_retries = write_retries
+        self.cache = DocumentCache(max_bytes=cache_max_bytes, prefixes=self.cache_prefixes)
+        self.servers = ServerIndex()
+
+    # Низкоуровневые операции с документами
+
+    async def _get(self, doc_id: str, cached: bool = True) -> Optional[Dict[str, Any]]:
+        if cached:
+            doc = self.cache.get(doc_id)
+            if doc is not None or self.cache.authoritative:
+                return doc
+        return await self.client.get_doc(self.db_name, doc_id)
+
+    async def _get_range(self, prefix: str, cached: bool = True) -> List[Dict[str, Any]]:
+        if cached and self.cache.authoritative:
+            return self.cache.scan(prefix)
+        result = await self.client.get_docs_by_prefix(self.db_name, prefix, include_docs=True)
+        return [row["doc"] for row in result.get("rows", []) if row.get("doc")]
+
+    def _remember(self, doc: Dict[str, Any]):
+        self.cache.put(doc)
+        self.servers.put(doc)
+
+    def _forget(self, doc_id: str):
+        self.cache.invalidate(doc_id)
+        self.servers.invalidate(doc_id)
+
+    async def _save(self, doc: Dict[str, Any], retries: Optional[int] = None) -> Dict[str, Any]:
+        result = await self.client.save_doc(self.db_name, doc, retries=retries)
+        self._remember(dict(doc, _rev=result["rev"]))
+        return result
+
+    async def _create(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.client.create_doc(self.db_name, doc)
+        self._remember(dict(doc, _rev=result["rev"]))
+        return result
+
+    async def _delete(self, doc_id: str) -> bool:
+        deleted = await self.client.delete_doc(self.db_name, doc_id)
+        if deleted:
+            self._forget(doc_id)
+        return deleted
+
+    async def _bulk(self, docs: List[Dict[str, Any]], raise_on_error: bool = True) -> List[Dict[str, Any]]:
+        """
+        Пакетная запись документов.
+
+        _bulk_docs не атомарна: документы без ошибок остаются записанными,
+        а при ошибках по отдельным документам выбрасывается HTTPException 409
+        (или, если raise_on_error=False, ошибки остаются в результатах).
+        """
+        results = await self.client.bulk_docs(self.db_name, docs)
+        failed = []
+        for doc, result in zip(docs, results):
+            if "error" in result:
+                failed.append(result["id"])
+            elif doc.get("_deleted"):
+                self._forget(result["id"])
+            else:
+                self._remember(dict(doc, _rev=result["rev"]))
+        if failed and raise_on_error:
+            raise HTTPException(status_code=409, detail=f"Конфликт при записи документов: {', '.join(failed)}")
+        return results
+
+    async def load_cache(self):
+        """Загрузить в кэш все документы хранилища и построить индекс серверов"""
+        docs = []
+        for prefix in self.cache_prefixes:
+            docs.extend(await self._get_range(prefix, cached=False))
+        self.cache.load(docs)
+        self.servers.load(docs)
+
+    def apply_change(self, change: Dict[str, Any]):
+        """Применить запись из ленты _changes к кэшу и индексу"""
+        self.cache.apply_change(change)
+        self.servers.apply_change(change)
+
+    def deactivate(self):
+        """Выключить кэш и индекс при потере ленты изменений"""
+        self.cache.deactivate()
+        self.servers.deactivate()
+
+    # Постраничное чтение зон
+
+    async def _zone_docs_page(self, start_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Не более limit документов zone:*, начиная с идентификатора start_id"""
+        if self.cache.authoritative:
+            return self.cache.scan("zone:", start=start_id, limit=limit)
+        result = await self.client.get_all_docs(
+            self.db_name, include_docs=True, startkey=start_id, endkey="zone:\ufff0", limit=limit
+        )
+        return [row["doc"] for row in result.get("rows", []) if row.get("doc")]
+
+    async def _assemble_page(self, zone_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Собрать зоны страницы из документов зон"""
+        raise NotImplementedError
+
+    async def list_zones_page(self, start: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Страница зон в порядке имен.
+
+        Args:
+            start: Имя первой зоны страницы или None для первой страницы
+            limit: Размер страницы
+
+        Returns:
+            tuple: (зоны страницы, имя первой зоны следующей страницы или None)
+        """
+        # Лишний документ показывает, есть ли следующая страница
+        docs = await self._zone_docs_page(zone_id(start) if start else "zone:", limit + 1)
+        next_start = docs[limit]["_id"][len("zone:"):] if len(docs) > limit else None
+        return await self._assemble_page(docs[:limit]), next_start
+
+    async def iter_zones(self, start: Optional[str] = None, batch_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Все зоны начиная с start, читаемые из базы пакетами по batch_size"""
+        while True:
+            zones, start = await self.list_zones_page(start, batch_size)
+            for zone in zones:
+                yield zone
+            if start is None:
+                return
+
+    # Импорт инвентаря
+
+    async def import_zones(
+        self,
+        zones: AsyncIterator[Any],
+        mode: str,
+        parse: Optional[Callable[[Any], Dict[str, Any]]] = None,
+        batch_size: int = 100,
+        on_batch: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Импорт зон из потока.
+
+        Зоны накапливаются пакетами по batch_size и записываются через
+        _bulk_docs, поэтому в памяти находится только текущий пакет. В режиме
+        replace после импорта удаляются зоны, которых не было в потоке.
+        Ошибочные зоны пропускаются и попадают в отчет; уже записанные
+        пакеты при ошибке разбора потока не откатываются.
+
+        Args:
+            zones: Поток зон
+            mode: Режим импорта (merge или replace)
+            parse: Проверка и преобразование одной зоны (ValueError при ошибке)
+            batch_size: Число зон в одном пакете записи
+            on_batch: Вызывается с текущим отчетом после каждого пакета
+
+        Returns:
+            Dict[str, Any]: Отчет об импорте
+        """
+        if mode not in IMPORT_MODES:
+            raise HTTPException(status_code=400, detail=f"Неизвестный режим импорта: {mode}")
+        summary = {"mode": mode, "zones": 0, "environments": 0, "servers": 0,
+                   "deleted": 0, "failed": 0, "errors": []}
+        seen: set = set()
+        fqdn_owners: Dict[str, str] = {}
+        existing_owners: Optional[Dict[str, List[str]]] = None
+        batch = []
+
+        async def flush():
+            nonlocal batch, existing_owners
+            if mode == IMPORT_MERGE:
+                # В режиме merge существующие серверы других зон сохраняются,
+                # поэтому их FQDN нельзя использовать в импортируемых зонах
+                if not self.servers.active and existing_owners is None:
+                    existing_owners = {}
+                    for location in await self._scan_servers():
+                        existing_owners.setdefault(location["server"]["fqdn"], []).append(location["zone"])
+                batch = await self._drop_taken_fqdns(batch, existing_owners, summary)
+            failures = await self._import_batch(batch, mode)
+            for zone in batch:
+                if zone["name"] in failures:
+                    self._import_error(summary, zone["name"], failures[zone["name"]])
+                    continue
+                summary["zones"] += 1
+                summary["environments"] += len(zone.get("environments", []))
+                summary["servers"] += len(zone_servers(zone))
+            batch = []
+            if on_batch is not None:
+                on_batch(summary)
+
+        async for raw in zones:
+            name = raw.get("name") if isinstance(raw, dict) else None
+            try:
+                zone = parse(raw) if parse is not None else raw
+                self._check_import_zone(zone, seen, fqdn_owners)
+            except HTTPException as e:
+                self._import_error(summary, name, e.detail)
+                continue
+            except ValueError as e:
+                # Имя зоны с ошибкой запоминается, чтобы replace ее не удалил
+                if isinstance(name, str):
+                    seen.add(name)
+                self._import_error(summary, name, str(e))
+                continue
+            batch.append(zone)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+        if mode == IMPORT_REPLACE:
+            summary["deleted"] = await self._delete_zones_except(seen)
+        return summary
+
+    def _check_import_zone(self, zone: Dict[str, Any], seen: set, fqdn_owners: Dict[str, str]):
+        name = zone["name"]
+        if name in seen:
+            raise HTTPException(status_code=400, detail=f"Зона {name} встречается в данных несколько раз")
+        seen.add(name)
+        self._check_zone_names(zone)
+        fqdns = set()
+        for server in zone_servers(zone):
+            fqdn = server["fqdn"]
+            if fqdn in fqdns:
+                raise HTTPException(status_code=400, detail=f"Сервер с FQDN {fqdn} указан несколько раз")
+            owner = fqdn_owners.get(fqdn)
+            if owner is not None and owner != name:
+                raise HTTPException(status_code=400, detail=f"Сервер с FQDN {fqdn} уже импортирован в зоне {owner}")
+            fqdns.add(fqdn)
+        for fqdn in fqdns:
+            fqdn_owners[fqdn] = name
+
+    def _check_zone_names(self, zone: Dict[str, Any]):
+        """Проверка имен зоны и окружений, зависящая от схемы размещения"""
+
+    async def _drop_taken_fqdns(
+        self, batch: List[Dict[str, Any]], existing_owners: Optional[Dict[str, List[str]]], summary: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Исключить из пакета зоны с FQDN, занятыми в других зонах"""
+        if existing_owners is None:
+            owners: Dict[str, List[str]] = {}
+            fqdns = {server["fqdn"] for zone in batch for server in zone_servers(zone)}
+            for location in await self._locate_fqdns(fqdns):
+                owners.setdefault(location["server"]["fqdn"], []).append(location["zone"])
+        else:
+            owners = existing_owners
+        accepted = []
+        for zone in batch:
+            conflict = next(
+                ((server["fqdn"], owner) for server in zone_servers(zone)
+                 for owner in owners.get(server["fqdn"], []) if owner != zone["name"]),
+                None,
+            )
+            if conflict is None:
+                accepted.append(zone)
+            else:
+                self._import_error(summary, zone["name"], f"Сервер с FQDN {conflict[0]} уже существует в зоне {conflict[1]}")
+        return accepted
+
+    @staticmethod
+    def _import_error(summary: Dict[str, Any], zone_name: Optional[str], detail: str):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+            summary["errors"].append({"zone": zone_name, "detail": detail})
+
+    async def _import_batch(self, batch: List[Dict[str, Any]], mode: str) -> Dict[str, str]:
+        """
+        Записать пакет зон.
+
+        Returns:
+            Dict[str, str]: Ошибки записи по имени зоны
+        """
+        raise NotImplementedError
+
+    async def _delete_zones_except(self, keep: set) -> int:
+        """Удалить документы всех зон, кроме keep; возвращает число удаленных зон"""
+        deleted_zones = 0
+        # Сначала удаляются дочерние документы, затем документы зон
+        for prefix in reversed(self.cache_prefixes):
+            result = await self.client.get_docs_by_prefix(self.db_name, prefix, include_docs=False)
+            docs = []
+            for row in result.get("rows", []):
+                name = row["id"][len(prefix):]
+                if prefix != "zone:":
+                    name = name.split(":", 1)[0]
+                if name not in keep:
+                    docs.append({"_id": row["id"], "_rev": row["value"]["rev"], "_deleted": True})
+            for i in range(0, len(docs), 500):
+                results = await self._bulk(docs[i:i + 500], raise_on_error=False)
+                if prefix == "zone:":
+                    deleted_zones += len([result for result in results if "error" not in result])
+        return deleted_zones
+
+    # Поиск серверов во всех зонах
+
+    async def _scan_servers(self) -> List[Dict[str, Any]]:
+        """Все серверы обходом зон, когда индекс недоступен"""
+        return [
+            {"zone": zone["name"], "environment": env["name"], "server": server}
+            for zone in await self.list_zones()
+            for env in zone.get("environments", [])
+            for server in env.get("servers", [])
+        ]
+
+    async def find_servers(self, fqdn: Optional[str] = None, ip: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Серверы с заданным FQDN или IP-адресом вместе с их зоной и окружением"""
+        if self.servers.active:
+            return self.servers.by_fqdn(fqdn) if fqdn is not None else self.servers.by_ip(ip)
+        return [
+            location for location in await self._scan_servers()
+            if (fqdn is not None and location["server"].get("fqdn") == fqdn)
+            or (ip is not None and location["server"].get("ip") == ip)
+        ]
+
+    async def _check_unique_fqdns(
+        self, servers: List[Dict[str, Any]], scope: Optional[Scope] = None, zone_doc: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Проверить, что FQDN серверов не заняты ни в одной зоне.
+
+        Серверы из области scope, которую перезаписывает текущая операция,
+        не считаются занятыми. Серверы зоны, изменяемой в памяти, берутся
+        из ее документа zone_doc, а не из индекса.
+        """
+        fqdns = set()
+        for server in servers:
+            if server["fqdn"] in fqdns:
+                raise HTTPException(status_code=400, detail=f"Сервер с FQDN {server['fqdn']} указан несколько раз")
+            fqdns.add(server["fqdn"])
+        for location in await self._locate_fqdns(fqdns, zone_doc):
+            if not in_scope(location, scope):
+                raise server_fqdn_taken(location["server"]["fqdn"], location)
+
+    async def _locate_fqdns(self, fqdns, zone_doc: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Места размещения серверов с любым из заданных FQDN.
+
+        Если передан документ зоны, изменяемый в памяти (и, возможно, еще
+        не записанный), серверы этой зоны берутся из него.
+        """
+        if not fqdns:
+            return []
+        if self.servers.active:
+            locations = [location for fqdn in fqdns for location in self.servers.by_fqdn(fqdn)]
+        else:
+            locations = [location for location in await self._scan_servers() if location["server"].get("fqdn") in fqdns]
+        if zone_doc is None:
+            return locations
+        zone_name = zone_doc["_id"][len("zone:"):]
+        return [location for location in locations if location["zone"] != zone_name] + [
+            location for location in server_locations(zone_doc) if location["server"].get("fqdn") in fqdns
+        ]
+
+    async def _plan_server_operations(
+        self, zone_name: str, env_name: str, servers: List[Dict[str, Any]], operations: List[Dict[str, Any]],
+        zone_doc: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Tuple[int, Optional[str], Optional[Dict[str, Any]]]]]:
+        """
+        Применить пакет операций к списку серверов окружения в памяти.
+
+        Операции выполняются по порядку; ошибочная операция пропускается и
+        не мешает остальным.
+
+        Returns:
+            tuple: (серверы окружения после операций, результаты операций,
+            изменения в виде (номер операции, прежний FQDN, новый сервер))
+        """
+        current = {server["fqdn"]: server for server in servers}
+        new_fqdns = {operation["server"]["fqdn"] for operation in operations if operation.get("server")}
+        taken = {
+            location["server"]["fqdn"]: location
+            for location in await self._locate_fqdns(new_fqdns, zone_doc)
+            if not in_scope(location, (zone_name, env_name, None))
+        }
+        results = []
+        changes = []
+        for index, operation in enumerate(operations):
+            op = operation.get("op")
+            server = operation.get("server")
+            fqdn = operation.get("fqdn") or (server or {}).get("fqdn")
+            result = {"op": op, "fqdn": fqdn, "status_code": 200, "detail": None}
+            results.append(result)
+            error = None
+            if op not in BULK_OPERATIONS:
+                error = HTTPException(status_code=400, detail=f"Неизвестная операция {op}")
+            elif op != "delete" and server is None:
+                error = HTTPException(status_code=400, detail=f"Для операции {op} нужны данные сервера")
+            elif op == "create":
+                if fqdn in current:
+                    error = HTTPException(status_code=400, detail=f"Сервер с FQDN {fqdn} уже существует в окружении {env_name}")
+            elif fqdn not in current:
+                error = server_not_found(env_name, fqdn)
+            elif op == "update" and server["fqdn"] != fqdn and server["fqdn"] in current:
+                error = HTTPException(status_code=400, detail=f"Сервер с FQDN {server['fqdn']} уже существует в окружении {env_name}")
+            if error is None and server is not None and server["fqdn"] in taken:
+                error = server_fqdn_taken(server["fqdn"], taken[server["fqdn"]])
+            if error is not None:
+                result.update(status_code=error.status_code, detail=error.detail)
+                continue
+
+            if op == "create":
+                current[fqdn] = server
+                changes.append((index, None, server))
+            elif op == "update":
+                # Переименованный сервер остается на прежнем месте в списке
+                current = {(server["fqdn"] if key == fqdn else key): (server if key == fqdn else value)
+                           for key, value in current.items()}
+                changes.append((index, fqdn, server))
+            else:
+                del current[fqdn]
+                changes.append((index, fqdn, None))
+        return list(current.values()), results, changes
+
+    # Операции хранилища, реализуемые наследниками.
+    # Записи с if_match выполняются, только если ETag зоны совпадает
+    # с переданным, иначе выбрасывается HTTPException 412.
+
+    async def list_zones(self) -> List[Dict[str, Any]]:
+        zones, _ = await self.list_zones_versioned()
+        return zones
+
+    async def get_zone(self, zone_name: str) -> Optional[Dict[str, Any]]:
+        zone, _ = await self.get_zone_versioned(zone_name)
+        return zone
+
+    async def list_zones_versioned(self) -> Tuple[List[Dict[str, Any]], str]:
+        """Все зоны и ETag, построенный по ревизиям их документов"""
+        raise NotImplementedError
+
+    async def get_zone_versioned(self, zone_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Зона и ее ETag или (None, None)"""
+        raise NotImplementedError
+
+    async def create_zone(self, zone: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def update_zone(self, zone_name: str, zone: Dict[str, Any], if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def delete_zone(self, zone_name: str, if_match: Optional[str] = None) -> bool:
+        raise NotImplementedError
+
+    async def create_environment(self, zone_name: str, environment: Dict[str, Any], if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def update_environment(self, zone_name: str, env_name: str, environment: Dict[str, Any], if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def delete_environment(self, zone_name: str, env_name: str, if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def add_server(self, zone_name: str, env_name: str, server: Dict[str, Any], if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def update_server(self, zone_name: str, env_name: str, server_fqdn: str, server: Dict[str, Any], if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def delete_server(self, zone_name: str, env_name: str, server_fqdn: str, if_match: Optional[str] = None):
+        raise NotImplementedError
+
+    async def bulk_servers(
+        self, zone_name: str, env_name: str, operations: List[Dict[str, Any]], if_match: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Пакет операций create/update/delete над серверами одного окружения.
+
+        Returns:
+            List[Dict[str, Any]]: Результат каждой операции (op, fqdn, status_code, detail)
+        """
+        raise NotImplementedError
+
+
+def zone_servers(zone: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Все серверы зоны в формате модели Zone"""
+    return [server for env in zone.get("environments", []) for server in env.get("servers", [])]
+
+def merge_zone(existing: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Объединить зону из импорта с существующей.
+
+    Поля зоны берутся из импорта, окружения объединяются по имени, серверы
+    внутри окружения - по FQDN (сервер из импорта заменяет существующий).
+    """
+    merged = dict(existing)
+    merged.update({k: v for k, v in incoming.items() if k != "environments"})
+    environments = {env["name"]: dict(env) for env in existing.get("environments", [])}
+    for env in incoming.get("environments", []):
+        current = environments.get(env["name"])
+        if current is None:
+            environments[env["name"]] = env
+            continue
+        servers = {server["fqdn"]: server for server in current.get("servers", [])}
+        servers.update({server["fqdn"]: server for server in env.get("servers", [])})
+        current.update({k: v for k, v in env.items() if k != "servers"})
+        current["servers"] = list(servers.values())
+    merged["environments"] = list(environments.values())
+    return merged
+
+def find_environment(zone_data: Dict[str, Any], zone_name: str, env_name: str) -> int:
+    """Индекс окружения в документе зоны"""
+    for i, env in enumerate(zone_data.get("environments", [])):
+        if env["name"] == env_name:
+            return i
+    raise environment_not_found(zone_name, env_name)
+
+def find_server(environment: Dict[str, Any], env_name: str, server_fqdn: str) -> int:
+    """Индекс сервера в окружении"""
+    for i, s in enumerate(environment.get("servers", [])):
+        if s["fqdn"] == server_fqdn:
+            return i
+    raise server_not_found(env_name, server_fqdn)
+
+
+class EmbeddedZoneStore(ZoneStore):
+    """
+    Хранилище, в котором зона целиком (с окружениями и серверами)
+    хранится в одном документе zone:<имя>.
+    """
+
+    layout = LAYOUT_EMBEDDED
+    cache_prefixes = ("zone:",)
+
+    def __init__(
+        self, *args,
+        write_batch_window: float = DEFAULT_WRITE_BATCH_WINDOW,
+        write_batch_max_size: int = DEFAULT_WRITE_BATCH_MAX_SIZE,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.write_batch_window = write_batch_window
+        self.write_batch_max_size = write_batch_max_size
+        # Очереди изменений зон и задачи, записывающие их группами
+        self._write_queues: Dict[str, List[Tuple[Mutation, asyncio.Future]]] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+
+    async def _get_zone_for_update(
+        self, zone_name: str, if_match: Optional[str] = None, cached: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Документ зоны для изменения.
+
+        Копия документа из кэша годится для первой попытки записи: если
+        ревизия в кэше устарела, PouchDB отклонит запись и изменение будет
+        применено заново к документу, прочитанному из базы.
+        """
+        if cached:
+            doc = self.cache.get(zone_id(zone_name))
+            if doc is not None and (if_match is None or etag_matches(if_match, docs_etag([doc]))):
+                return copy.deepcopy(doc)
+        zone_data = await self._get(zone_id(zone_name), cached=False)
+        if not zone_data:
+            raise zone_not_found()
+        if if_match is not None and not etag_matches(if_match, docs_etag([zone_data])):
+            raise precondition_failed()
+        return zone_data
+
+    async def _update_zone(self, zone_name: str, mutation: Mutation, if_match: Optional[str] = None):
+        """
+        Применить изменение к документу зоны и записать его.
+
+        mutation изменяет переданный документ на месте и возвращает False,
+        если документ не изменился и записывать его не нужно. Условия
+        (наличие окружения, уникальность FQDN и т. п.) изменение проверяет
+        до того, как менять документ: ошибка одного изменения не должна
+        затрагивать другие изменения, примененные к тому же документу.
+        Изменение должно зависеть только от документа и своих аргументов,
+        поскольку при конфликте ревизий оно применяется заново.
+
+        Изменения без If-Match ставятся в очередь зоны и записываются
+        группой (см. _write_batches); изменение с If-Match относится к
+        конкретной ревизии зоны и записывается отдельно.
+        """
+        if if_match is not None or self.write_batch_max_size <= 1:
+            error = (await self._commit(zone_name, [mutation], if_match))[0]
+            if error is not None:
+                raise error
+            return
+        # Запись группы выполняет задача зоны, поэтому перегрузка должна
+        # отклонить запрос до постановки изменения в очередь
+        await self.client.admit()
+        future = asyncio.get_running_loop().create_future()
+        self._write_queues.setdefault(zone_name, []).append((mutation, future))
+        if zone_name not in self._writers:
+            # Задача пишет изменения многих запросов, поэтому она не должна
+            # наследовать профиль, карту документов и приоритет первого из них
+            self._writers[zone_name] = asyncio.get_running_loop().create_task(
+                self._run_writer(zone_name), context=contextvars.Context()
+            )
+        await future
+
+    async def _run_writer(self, zone_name: str):
+        # Запросы допущены к базе до постановки изменений в очередь, поэтому
+        # записи группы идут с приоритетом записи и не отклоняются
+        with admission_scope(PRIORITY_WRITE, admitted=True):
+            await self._write_batches(zone_name)
+
+    async def _write_batches(self, zone_name: str):
+        """
+        Записывать очередь изменений зоны группами, пока она не опустеет.
+
+        Изменения, поступившие за время окна и за время записи предыдущей
+        группы, применяются к одному документу и сохраняются одним PUT;
+        каждый ожидающий запрос получает собственный результат.
+        """
+        batch: List[Tuple[Mutation, asyncio.Future]] = []
+        try:
+            if self.write_batch_window > 0:
+                await asyncio.sleep(self.write_batch_window)
+            while self._write_queues.get(zone_name):
+                queue = self._write_queues[zone_name]
+                batch = queue[:self.write_batch_max_size]
+                del queue[:self.write_batch_max_size]
+                try:
+                    errors = await self._commit(zone_name, [mutation for mutation, _ in batch])
+                except Exception as e:
+                    errors = [e] * len(batch)
+                for (_, future), error in zip(batch, errors):
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                batch = []
+        finally:
+            # При отмене задачи ожидающие запросы не должны зависнуть
+            for _, future in batch + self._write_queues.pop(zone_name, []):
+                if not future.done():
+                    future.set_exception(write_conflict(zone_name))
+            del self._writers[zone_name]
+
+    async def _commit(
+        self, zone_name: str, mutations: List[Mutation], if_match: Optional[str] = None
+    ) -> List[Optional[Exception]]:
+        """
+        Применить изменения к документу зоны по порядку и записать его.
+
+        При конфликте ревизий все изменения применяются заново к свежему
+        документу, не более write_retries раз. С If-Match конфликт означает,
+        что зона изменилась, и отклоняется с 412. Поэтому изменения
+        добавляют в документ копии данных запроса: следующее изменение
+        пакета может править добавленный объект на месте, а при повторе
+        он был бы добавлен уже измененным.
+
+        Returns:
+            List[Optional[Exception]]: Ошибка каждого изменения или None
+        """
+        for attempt in range(self.write_retries + 1):
+            try:
+                zone_data = await self._get_zone_for_update(zone_name, if_match, cached=attempt == 0)
+            except HTTPException as e:
+                return [e] * len(mutations)
+            errors: List[Optional[Exception]] = []
+            changed = False
+            for mutation in mutations:
+                try:
+                    changed = await mutation(zone_data) is not False or changed
+                    errors.append(None)
+                except HTTPException as e:
+                    errors.append(e)
+            if not changed:
+                return errors
+            try:
+                await self._save(zone_data, retries=0)
+                return errors
+            except ConflictError:
+                if if_match is not None:
+                    return [precondition_failed()] * len(mutations)
+        return [write_conflict(zone_name)] * len(mutations)
+
+    async def list_zones_versioned(self) -> Tuple[List[Dict[str, Any]], str]:
+        # Читаем только диапазон идентификаторов zone:*, а не всю базу
+        docs = [doc for doc in await self._get_range("zone:") if doc.get('type') == 'zone']
+        return [public_fields(doc) for doc in docs], docs_etag(docs)
+
+    async def _assemble_page(self, zone_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [public_fields(doc) for doc in zone_docs if doc.get('type') == 'zone']
+
+    async def get_zone_versioned(self, zone_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        zone_data = await self._get(zone_id(zone_name))
+        if not zone_data:
+            return None, None
+        return public_fields(zone_data), docs_etag([zone_data])
+
+    async def create_zone(self, zone: Dict[str, Any]) -> str:
+        doc_id = zone_id(zone["name"])
+        await self._check_unique_fqdns(zone_servers(zone), (zone["name"], None, None))
+        # Если зона с таким именем уже существует, PouchDB вернет 409
+        try:
+            await self._create(dict(zone, _id=doc_id))
+        except ConflictError:
+            raise HTTPException(status_code=400, detail="Зона с таким именем уже существует")
+        return doc_id
+
+    async def update_zone(self, zone_name: str, zone: Dict[str, Any], if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            await self._check_unique_fqdns(zone_servers(zone), (zone_name, None, None))
+            zone_data.update(copy.deepcopy(zone))
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def delete_zone(self, zone_name: str, if_match: Optional[str] = None) -> bool:
+        if if_match is None:
+            return await self._delete(zone_id(zone_name))
+        zone_data = await self._get_zone_for_update(zone_name, if_match, cached=False)
+        results = await self._bulk(
+            [deleted_doc(zone_data)], raise_on_error=False
+        )
+        if "error" in results[0]:
+            raise precondition_failed()
+        return True
+
+    async def create_environment(self, zone_name: str, environment: Dict[str, Any], if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            # Проверяем, существует ли окружение с таким именем
+            for env in zone_data.get("environments", []):
+                if env["name"] == environment["name"]:
+                    raise HTTPException(status_code=400, detail=f"Окружение с именем {environment['name']} уже существует в зоне {zone_name}")
+            await self._check_unique_fqdns(environment.get("servers", []), (zone_name, environment["name"], None), zone_data)
+            zone_data.setdefault("environments", []).append(copy.deepcopy(environment))
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def update_environment(self, zone_name: str, env_name: str, environment: Dict[str, Any], if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            env_index = find_environment(zone_data, zone_name, env_name)
+            await self._check_unique_fqdns(environment.get("servers", []), (zone_name, env_name, None), zone_data)
+            zone_data["environments"][env_index] = copy.deepcopy(environment)
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def delete_environment(self, zone_name: str, env_name: str, if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            env_index = find_environment(zone_data, zone_name, env_name)
+            zone_data["environments"].pop(env_index)
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def add_server(self, zone_name: str, env_name: str, server: Dict[str, Any], if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            env_index = find_environment(zone_data, zone_name, env_name)
+            environment = zone_data["environments"][env_index]
+            # Проверяем, существует ли сервер с таким FQDN
+            for existing_server in environment.get("servers", []):
+                if existing_server["fqdn"] == server["fqdn"]:
+                    raise HTTPException(status_code=400, detail=f"Сервер с FQDN {server['fqdn']} уже существует в окружении {env_name}")
+            # FQDN должен быть уникален во всех зонах, а не только в окружении
+            await self._check_unique_fqdns([server], zone_doc=zone_data)
+            environment.setdefault("servers", []).append(copy.deepcopy(server))
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def update_server(self, zone_name: str, env_name: str, server_fqdn: str, server: Dict[str, Any], if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            env_index = find_environment(zone_data, zone_name, env_name)
+            environment = zone_data["environments"][env_index]
+            server_index = find_server(environment, env_name, server_fqdn)
+            await self._check_unique_fqdns([server], (zone_name, env_name, server_fqdn), zone_data)
+            environment["servers"][server_index] = copy.deepcopy(server)
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def delete_server(self, zone_name: str, env_name: str, server_fqdn: str, if_match: Optional[str] = None):
+        async def mutation(zone_data):
+            env_index = find_environment(zone_data, zone_name, env_name)
+            environment = zone_data["environments"][env_index]
+            server_index = find_server(environment, env_name, server_fqdn)
+            environment["servers"].pop(server_index)
+
+        await self._update_zone(zone_name, mutation, if_match)
+
+    async def bulk_servers(
+        self, zone_name: str, env_name: str, operations: List[Dict[str, Any]], if_match: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        results = []
+
+        async def mutation(zone_data):
+            env_index = find_environment(zone_data, zone_name, env_name)
+            environment = zone_data["environments"][env_index]
+            servers, results[:], changes = await self._plan_server_operations(
+                zone_name, env_name, environment.get("servers", []), operations, zone_data
+            )
+            # Все операции пакета сохраняются одной записью документа зоны
+            if not changes:
+                return False
+            environment["servers"] = servers
+
+        await self._update_zone(zone_name, mutation, if_match)
+        return results
+
+    async def _import_batch(self, batch: List[Dict[str, Any]], mode: str) -> Dict[str, str]:
+        doc_ids = [zone_id(zone["name"]) for zone in batch]
+        current = await self.client.get_docs(self.db_name, doc_ids)
+        docs = []
+        for zone, doc_id in zip(batch, doc_ids):
+            existing = current.get(doc_id)
+            if existing is not None and mode == IMPORT_MERGE:
+                zone = merge_zone(public_fields(existing), zone)
+            doc = dict(zone, _id=doc_id)
+            if existing is not None:
+                doc["_rev"] = existing["_rev"]
+            docs.append(doc)
+        results = await self._bulk(docs, raise_on_error=False)
+        return {result["id"][len("zone:"):]: result.get("reason") or result["error"]
+                for result in results if "error" in result}
+
+
+def check_name(name: str, kind: str):
+    """В нормализованной схеме ':' разделяет части идентификатора документа"""
+    if ":" in name:
+        raise HTTPException(status_code=400, detail=f"Имя {kind} не должно содержать символ ':'")
+
+def environment_doc(zone_name: str, env_name: str) -> Dict[str, Any]:
+    return {
+        "_id": environment_id(zone_name, env_name),
+        "type": "environment",
+        "zone": zone_name,
+        "name": env_name,
+    }
+
+def server_doc(zone_name: str, env_name: str, server: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(
+        server,
+        _id=server_id(zone_name, env_name, server["fqdn"]),
+        type="server",
+        zone=zone_name,
+        environment=env_name,
+    )
+
+def server_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля модели Server из документа сервера"""
+    return {k: v for k, v in public_fields(doc).items() if k not in ("type", "zone", "environment")}
+
+def environment_docs(zone_name: str, environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Документ окружения и документы его серверов"""
+    docs = [environment_doc(zone_name, environment["name"])]
+    for server in environment.get("servers", []):
+        docs.append(server_doc(zone_name, environment["name"], server))
+    return docs
+
+def assemble_zones(zone_docs, env_docs, server_docs) -> List[Dict[str, Any]]:
+    """Собрать дерево зон из отдельных документов"""
+    zones = {}
+    for doc in zone_docs:
+        if doc.get("type") != "zone":
+            continue
+        zone = {k: v for k, v in public_fields(doc).items() if k != "layout"}
+        zone["environments"] = []
+        zones[doc["_id"][len("zone:"):]] = zone
+    environments = {}
+    for doc in env_docs:
+        zone = zones.get(doc.get("zone"))
+        if zone is None:
+            continue
+        environment = {"name": doc["name"], "servers": []}
+        zone["environments"].append(environment)
+        environments[(doc["zone"], doc["name"])] = environment
+    for doc in server_docs:
+        environment = environments.get((doc.get("zone"), doc.get("environment")))
+        if environment is not None:
+            environment["servers"].append(server_fields(doc))
+    return list(zones.values())
+
+
+class NormalizedZoneStore(ZoneStore):
+    """
+    Хранилище, в котором зона, каждое окружение и каждый сервер хранятся
+    отдельными документами с иерархическими идентификаторами:
+    zone:<зона>, env:<зона>:<окружение>, server:<зона>:<окружение>:<fqdn>.
+
+    Запись сервера затрагивает только его документ, поэтому стоимость
+    записи не растет с размером зоны, а параллельные записи в разные
+    серверы одной зоны не конфликтуют. Дерево зоны собирается из чтений
+    диапазонов идентификаторов. Окружения и серверы возвращаются
+    упорядоченными по имени.
+    """
+
+    layout = LAYOUT_NORMALIZED
+    cache_prefixes = ("zone:", "env:", "server:")
+
+    async def _require_environment(self, zone_name: str, env_name: str) -> Dict[str, Any]:
+        """Документ окружения; если нет зоны или окружения, выбрасывается 404"""
+        zone_doc, env_doc = await asyncio.gather(
+            self._get(zone_id(zone_name)), self._get(environment_id(zone_name, env_name))
+        )
+        if not zone_doc:
+            raise zone_not_found()
+        if not env_doc:
+            raise environment_not_found(zone_name, env_name)
+        return env_doc
+
+    async def _subtree(self, prefix: str) -> List[Dict[str, Any]]:
+        """Документы, которые нужно удалить вместе с окружением или зоной"""
+        return [deleted_doc(doc) for doc in await self._get_range(prefix, cached=False)]
+
+    @staticmethod
+    def _diff_docs(current: List[Dict[str, Any]], desired: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Документы, которые нужно записать, чтобы набор current стал набором desired"""
+        current_by_id = {doc["_id"]: doc for doc in current}
+        desired_ids = {doc["_id"] for doc in desired}
+        docs = []
+        for doc in desired:
+            existing = current_by_id.get(doc["_id"])
+            if existing is not None:
+                if public_fields(existing) == public_fields(doc):
+                    continue
+                doc["_rev"] = existing["_rev"]
+            docs.append(doc)
+        for doc in current:
+            if doc["_id"] not in desired_ids:
+                docs.append(deleted_doc(doc))
+        return docs
+
+    async def _replace_docs(self, current: List[Dict[str, Any]], desired: List[Dict[str, Any]]):
+        """Привести набор документов current к набору desired одной пакетной записью"""
+        await self._bulk(self._diff_docs(current, desired))
+
+    def _check_zone_names(self, zone: Dict[str, Any]):
+        check_name(zone["name"], "зоны")
+        for environment in zone.get("environments", []):
+            check_name(environment["name"], "окружения")
+
+    def _zone_docs(self, zone: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Документы зоны, ее окружений и серверов"""
+        zone_doc = {k: v for k, v in zone.items() if k != "environments"}
+        docs = [dict(zone_doc, _id=zone_id(zone["name"]), layout=self.layout)]
+        for environment in zone.get("environments", []):
+            docs.extend(environment_docs(zone["name"], environment))
+        return docs
+
+    async def _import_batch(self, batch: List[Dict[str, Any]], mode: str) -> Dict[str, str]:
+        names = [zone["name"] for zone in batch]
+        current_zones = await self.client.get_docs(self.db_name, [zone_id(name) for name in names])
+        ranges = await asyncio.gather(
+            *(self._get_range(f"env:{name}:", cached=False) for name in names),
+            *(self._get_range(f"server:{name}:", cached=False) for name in names),
+        )
+        docs = []
+        for i, zone in enumerate(batch):
+            zone_doc = current_zones.get(zone_id(zone["name"]))
+            env_docs, server_docs = ranges[i], ranges[len(names) + i]
+            if zone_doc is not None and mode == IMPORT_MERGE:
+                zone = merge_zone(assemble_zones([zone_doc], env_docs, server_docs)[0], zone)
+            current = ([zone_doc] if zone_doc is not None else []) + env_docs + server_docs
+            docs.extend(self._diff_docs(current, self._zone_docs(zone)))
+        failures = {}
+        for result in await self._bulk(docs, raise_on_error=False):
+            if "error" in result:
+                name = result["id"].split(":", 2)[1]
+                failures.setdefault(name, result.get("reason") or result["error"])
+        return failures
+
+    async def _check_if_match(self, zone_name: str, if_match: Optional[str]):
+        """
+        Проверка If-Match по ETag всех документов зоны.
+
+        Зона хранится в нескольких документах, поэтому проверка выполняется
+        перед записью и не атомарна с ней.
+        """
+        if if_match is None:
+            return
+        _, etag = await self.get_zone_versioned(zone_name)
+        if etag is None:
+            raise zone_not_found()
+        if not etag_matches(if_match, etag):
+            raise precondition_failed()
+
+    async def list_zones_versioned(self) -> Tuple[List[Dict[str, Any]], str]:
+        zone_docs, env_docs, server_docs = await asyncio.gather(
+            self._get_range("zone:"), self._get_range("env:"), self._get_range("server:")
+        )
+        etag = docs_etag(zone_docs + env_docs + server_docs)
+        return assemble_zones(zone_docs, env_docs, server_docs), etag
+
+    async def _assemble_page(self, zone_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Диапазоны читаются для каждой зоны отдельно: порядок строк
+        # "env:<зона>:" не совпадает с порядком имен зон
+        names = [doc["_id"][len("zone:"):] for doc in zone_docs]
+        ranges = await asyncio.gather(
+            *(self._get_range(f"env:{name}:") for name in names),
+            *(self._get_range(f"server:{name}:") for name in names),
+        )
+        env_docs = [doc for docs in ranges[:len(names)] for doc in docs]
+        server_docs = [doc for docs in ranges[len(names):] for doc in docs]
+        return assemble_zones(zone_docs, env_docs, server_docs)
+
+    async def get_zone_versioned(self, zone_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        zone_doc, env_docs, server_docs = await asyncio.gather(
+            self._get(zone_id(zone_name)),
+            self._get_range(f"env:{zone_name}:"),
+            self._get_range(f"server:{zone_name}:"),
+        )
+        if not zone_doc:
+            return None, None
+        zones = assemble_zones([zone_doc], env_docs, server_docs)
+        if not zones:
+            return None, None
+        return zones[0], docs_etag([zone_doc] + env_docs + server_docs)
+
+    async def create_zone(self, zone: Dict[str, Any]) -> str:
+        check_name(zone["name"], "зоны")
+        for environment in zone.get("environments", []):
+            check_name(environment["name"], "окружения")
+        await self._check_unique_fqdns(zone_servers(zone), (zone["name"], None, None))
+        doc_id = zone_id(zone["name"])
+        zone_doc = {k: v for k, v in zone.items() if k != "environments"}
+        try:
+            await self._create(dict(zone_doc, _id=doc_id, layout=self.layout))
+        except ConflictError:
+            raise HTTPException(status_code=400, detail="Зона с таким именем уже существует")
+        docs = []
+        for environment in zone.get("environments", []):
+            docs.extend(environment_docs(zone["name"], environment))
+        await self._bulk(docs)
+        return doc_id
+
+    async def update_zone(self, zone_name: str, zone: Dict[str, Any], if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        for environment in zone.get("environments", []):
+            check_name(environment["name"], "окружения")
+        zone_data = await self._get(zone_id(zone_name), cached=False)
+        if not zone_data:
+            raise zone_not_found()
+        await self._check_unique_fqdns(zone_servers(zone), (zone_name, None, None))
+        zone_data.update({k: v for k, v in zone.items() if k != "environments"})
+        desired = [zone_data]
+        for environment in zone.get("environments", []):
+            desired.extend(environment_docs(zone_name, environment))
+        current = await self._get_range(f"env:{zone_name}:", cached=False)
+        current += await self._get_range(f"server:{zone_name}:", cached=False)
+        await self._replace_docs(current, desired)
+
+    async def delete_zone(self, zone_name: str, if_match: Optional[str] = None) -> bool:
+        await self._check_if_match(zone_name, if_match)
+        zone_data = await self._get(zone_id(zone_name))
+        if not zone_data:
+            return False
+        docs = [deleted_doc(zone_data)]
+        docs += await self._subtree(f"env:{zone_name}:")
+        docs += await self._subtree(f"server:{zone_name}:")
+        # Зона, окружения и серверы удаляются одним запросом _bulk_docs
+        await self._bulk(docs)
+        return True
+
+    async def create_environment(self, zone_name: str, environment: Dict[str, Any], if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        check_name(environment["name"], "окружения")
+        if not await self._get(zone_id(zone_name)):
+            raise zone_not_found()
+        await self._check_unique_fqdns(environment.get("servers", []), (zone_name, environment["name"], None))
+        docs = environment_docs(zone_name, environment)
+        try:
+            await self._create(docs[0])
+        except ConflictError:
+            raise HTTPException(status_code=400, detail=f"Окружение с именем {environment['name']} уже существует в зоне {zone_name}")
+        await self._bulk(docs[1:])
+
+    async def update_environment(self, zone_name: str, env_name: str, environment: Dict[str, Any], if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        check_name(environment["name"], "окружения")
+        await self._require_environment(zone_name, env_name)
+        await self._check_unique_fqdns(environment.get("servers", []), (zone_name, env_name, None))
+        current = [await self._get(environment_id(zone_name, env_name), cached=False)]
+        current += await self._get_range(f"server:{zone_name}:{env_name}:", cached=False)
+        await self._replace_docs([doc for doc in current if doc], environment_docs(zone_name, environment))
+
+    async def delete_environment(self, zone_name: str, env_name: str, if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        env_doc = await self._require_environment(zone_name, env_name)
+        docs = await self._subtree(f"server:{zone_name}:{env_name}:")
+        # Окружение и его серверы удаляются одним запросом _bulk_docs
+        await self._bulk(docs + [deleted_doc(env_doc)])
+
+    async def add_server(self, zone_name: str, env_name: str, server: Dict[str, Any], if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        await self._require_environment(zone_name, env_name)
+        await self._check_unique_fqdns([server])
+        try:
+            await self._create(server_doc(zone_name, env_name, server))
+        except ConflictError:
+            raise HTTPException(status_code=400, detail=f"Сервер с FQDN {server['fqdn']} уже существует в окружении {env_name}")
+
+    async def update_server(self, zone_name: str, env_name: str, server_fqdn: str, server: Dict[str, Any], if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        existing = await self._get(server_id(zone_name, env_name, server_fqdn), cached=False)
+        if not existing:
+            await self._require_environment(zone_name, env_name)
+            raise server_not_found(env_name, server_fqdn)
+        if server["fqdn"] != server_fqdn and await self._get(server_id(zone_name, env_name, server["fqdn"]), cached=False):
+            raise HTTPException(status_code=400, detail=f"Сервер с FQDN {server['fqdn']} уже существует в окружении {env_name}")
+        await self._check_unique_fqdns([server], (zone_name, env_name, server_fqdn))
+        await self._replace_docs([existing], [server_doc(zone_name, env_name, server)])
+
+    async def delete_server(self, zone_name: str, env_name: str, server_fqdn: str, if_match: Optional[str] = None):
+        await self._check_if_match(zone_name, if_match)
+        if not await self._delete(server_id(zone_name, env_name, server_fqdn)):
+            await self._require_environment(zone_name, env_name)
+            raise server_not_found(env_name, server_fqdn)
+
+    async def bulk_servers(
+        self, zone_name: str, env_name: str, operations: List[Dict[str, Any]], if_match: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        await self._check_if_match(zone_name, if_match)
+        await self._require_environment(zone_name, env_name)
+        current_docs = await self._get_range(f"server:{zone_name}:{env_name}:", cached=False)
+        servers, results, changes = await self._plan_server_operations(
+            zone_name, env_name, [server_fields(doc) for doc in current_docs], operations
+        )
+        if not changes:
+            return results
+
+        # Записываются только документы, итоговое состояние которых изменилось
+        current_by_id = {doc["_id"]: doc for doc in current_docs}
+        desired = {server_id(zone_name, env_name, server["fqdn"]): server for server in servers}
+        docs = []
+        for doc_id, server in desired.items():
+            existing = current_by_id.get(doc_id)
+            if existing is not None and server_fields(existing) == server:
+                continue
+            doc = server_doc(zone_name, env_name, server)
+            if existing is not None:
+                doc["_rev"] = existing["_rev"]
+            docs.append(doc)
+        for doc_id, existing in current_by_id.items():
+            if doc_id not in desired:
+                docs.append({"_id": doc_id, "_rev": existing["_rev"], "_deleted": True})
+
+        failed = {result["id"] for result in await self._bulk(docs, raise_on_error=False) if "error" in result}
+        for index, old_fqdn, server in changes:
+            fqdns = {old_fqdn, server["fqdn"] if server else None} - {None}
+            if failed & {server_id(zone_name, env_name, fqdn) for fqdn in fqdns}:
+                results[index].update(status_code=409, detail="Конфликт при записи сервера")
+        return results
+
+
+STORE_LAYOUTS = {
+    LAYOUT_EMBEDDED: EmbeddedZoneStore,
+    LAYOUT_NORMALIZED: NormalizedZoneStore,
+}
+
+def create_zone_store(layout: str, client: PouchDBClient, cache_max_bytes: int) -> ZoneStore:
+    """Создать хранилище зон для заданной схемы размещения данных"""
+    if layout not in STORE_LAYOUTS:
+        raise ValueError(f"Неизвестная схема размещения данных: {layout}")
+    return STORE_LAYOUTS[layout](client, cache_max_bytes)
@@ -4,6 +4,7 @@
 import requests
 import json
 import os
+import tempfile
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -31,7 +32,7 @@ class BatchClient:
     Клиент для пакетной работы с данными сервера управления ресурсами.
     """
     
-    def __init__(self, base_url: str = None, username: str = None, password: str = None):
+    def __init__(self, base_url: str = None, username: str = None, password: str = None, api_key: str = None):
         """
         Инициализация клиента.
         
@@ -39,12 +40,18 @@ class BatchClient:
             base_url: URL сервера API (по умолчанию берется из переменной окружения API_URL)
             username: Имя пользователя (по умолчанию берется из переменной окружения API_USERNAME)
             password: Пароль (по умолчанию берется из переменной окружения API_PASSWORD)
+            api_key: Ключ API (по умолчанию берется из переменной окружения API_KEY);
+                если задан, вход по паролю не выполняется
         """
         self.base_url = base_url or os.getenv("API_URL", "http://localhost:8000")
         self.username = username or os.getenv("API_USERNAME", "admin")
         self.password = password or os.getenv("API_PASSWORD", "admin")
+        self.api_key = api_key or os.getenv("API_KEY")
         self.token = None
         self.headers = {}
+        if self.api_key:
+            self.token = self.api_key
+            self.headers = {"Authorization": f"ApiKey {self.api_key}"}
         
     def login(self) -> bool:
         """
@@ -436,6 +443,43 @@ class BatchClient:
             print(f"Ошибка при импорте из JSON: {str(e)}")
             return {"error": str(e)}
     
+    def import_file(self, input_file: str, mode: str = "merge") -> Dict[str, Any]:
+        """
+        Импорт файла инвентаря одним запросом POST /import.
+
+        Файл передается потоком и разбирается сервером по мере получения,
+        поэтому размер файла не ограничен памятью клиента. Файлы с
+        расширением .ndjson передаются как NDJSON, остальные - как JSON.
+
+        Args:
+            input_file: Путь к файлу с данными
+            mode: Режим импорта: merge (дополнить) или replace (заменить все зоны)
+
+        Returns:
+            Dict[str, Any]: Отчет сервера об импорте
+        """
+        if not self.token:
+            self.login()
+
+        try:
+            content_type = "application/x-ndjson" if input_file.endswith(".ndjson") else "application/json"
+            with open(input_file, 'rb') as f:
+                response = requests.post(
+                    f"{self.base_url}/import",
+                    params={"mode": mode},
+                    data=f,
+                    headers={**self.headers, "Content-Type": content_type}
+                )
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"Ошибка импорта: {response.status_code} - {response.text}")
+                return {"error": response.text}
+        except Exception as e:
+            print(f"Ошибка при импорте файла: {str(e)}")
+            return {"error": str(e)}
+
     def export_to_json(self, output_file: str) -> bool:
         """
         Экспорт всех данных в JSON-файл.
@@ -462,6 +506,60 @@ class BatchClient:
             print(f"Ошибка при экспорте в JSON: {str(e)}")
             return False
 
+    def export_to_file(self, output_file: str, data_format: str = "json", compress: bool = False,
+                       chunk_size: int = 64 * 1024) -> bool:
+        """
+        Экспорт всех данных через GET /export с записью в файл по частям.
+
+        В отличие от export_to_json данные не собираются в памяти клиента:
+        ответ сервера пишется на диск по мере получения. Данные пишутся во
+        временный файл рядом с output_file, который заменяет output_file
+        только после успешного получения всего ответа, поэтому прерванный
+        экспорт не портит предыдущую выгрузку.
+
+        Args:
+            output_file: Путь к файлу для сохранения данных
+            data_format: Формат данных: json или ndjson
+            compress: Получить данные, сжатые gzip
+            chunk_size: Размер части, записываемой за один раз (байт)
+
+        Returns:
+            bool: True если экспорт успешен, иначе False
+        """
+        if not self.token:
+            self.login()
+
+        temp_file = None
+        try:
+            with requests.get(
+                f"{self.base_url}/export",
+                params={"format": data_format, "compress": "true" if compress else "false"},
+                headers=self.headers,
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    print(f"Ошибка экспорта: {response.status_code} - {response.text}")
+                    return False
+                fd, temp_file = tempfile.mkstemp(
+                    prefix=f".{os.path.basename(output_file)}.",
+                    suffix=".part",
+                    dir=os.path.dirname(os.path.abspath(output_file))
+                )
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+            # mkstemp создает файл с правами 0600; выгрузке нужны обычные
+            # права нового файла с учетом umask
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_file, 0o666 & ~umask)
+            os.replace(temp_file, output_file)
+            return True
+        except Exception as e:
+            print(f"Ошибка при экспорте в файл: {str(e)}")
+            if temp_file is not None and os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
 
 if __name__ == "__main__":
     # Пример использования клиента
@@ -96,6 +96,19 @@ class TestBatchClient:
             assert client.token == "test_token"
             assert client.headers == {"Authorization": "Bearer test_token"}
 
+    def test_api_key(self):
+        """Тест авторизации по ключу API без входа по паролю"""
+        client = BatchClient(base_url="http://test-api.example.com", api_key="sk_abc.secret")
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = []
+
+        with patch("requests.post") as mock_post, patch("requests.get", return_value=mock_response) as mock_get:
+            client.get_all_zones()
+
+        mock_post.assert_not_called()
+        assert mock_get.call_args.kwargs["headers"] == {"Authorization": "ApiKey sk_abc.secret"}
+
     def test_login_failure(self, client):
         """Тест неудачной аутентификации"""
         mock_response = MagicMock()
@@ -558,6 +571,139 @@ class TestBatchClient:
             assert "error" in results
             assert "File not found" in results["error"]
 
+    def test_import_file(self, client):
+        """Тест импорта файла одним потоковым запросом"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"zones": 1, "servers": 1, "failed": 0}
+
+        with patch("builtins.open", mock_open(read_data=b'{"name": "zone1"}\n')), \
+             patch("requests.post", return_value=mock_response) as mock_post:
+            client.token = "test_token"
+            client.headers = {"Authorization": "Bearer test_token"}
+            results = client.import_file("inventory.ndjson", mode="replace")
+
+            assert results["zones"] == 1
+            args, kwargs = mock_post.call_args
+            assert args[0] == "http://test-api.example.com/import"
+            assert kwargs["params"] == {"mode": "replace"}
+            assert kwargs["headers"]["Content-Type"] == "application/x-ndjson"
+
+    def test_import_file_error(self, client):
+        """Тест ошибки сервера при импорте файла"""
+        mock_response = MagicMock()
+        mock_response.status_code = 400
+        mock_response.text = "bad data"
+
+        with patch("builtins.open", mock_open(read_data=b"[]")), \
+             patch("requests.post", return_value=mock_response):
+            client.token = "test_token"
+            client.headers = {"Authorization": "Bearer test_token"}
+            results = client.import_file("inventory.json")
+
+            assert results == {"error": "bad data"}
+
+    def test_import_file_login(self, client):
+        """Тест входа по паролю перед импортом файла"""
+        login_response = MagicMock()
+        login_response.status_code = 200
+        login_response.json.return_value = {"access_token": "test_token", "token_type": "bearer"}
+        import_response = MagicMock()
+        import_response.status_code = 200
+        import_response.json.return_value = {"zones": 0, "servers": 0, "failed": 0}
+
+        with patch("builtins.open", mock_open(read_data=b"[]")), \
+             patch("requests.post", side_effect=[login_response, import_response]) as mock_post:
+            client.import_file("inventory.json")
+
+            assert mock_post.call_args_list[0].args[0] == "http://test-api.example.com/token"
+            assert mock_post.call_args_list[1].kwargs["headers"]["Authorization"] == "Bearer test_token"
+
+    def test_export_to_file(self, client, tmp_path):
+        """Тест экспорта с записью ответа в файл по частям"""
+        output_file = tmp_path / "backup.ndjson.gz"
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"zones": [', b"]}"]
+        mock_response.__enter__.return_value = mock_response
+
+        with patch("requests.get", return_value=mock_response) as mock_get:
+            client.token = "test_token"
+            client.headers = {"Authorization": "Bearer test_token"}
+            assert client.export_to_file(str(output_file), data_format="ndjson", compress=True) is True
+
+            kwargs = mock_get.call_args[1]
+            assert kwargs["params"] == {"format": "ndjson", "compress": "true"}
+            assert kwargs["stream"] is True
+        assert output_file.read_bytes() == b'{"zones": []}'
+        assert os.listdir(tmp_path) == ["backup.ndjson.gz"]
+
+    def test_export_to_file_mode(self, client, tmp_path):
+        """Тест прав файла выгрузки с учетом umask"""
+        output_file = tmp_path / "backup.json"
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"zones": []}']
+        mock_response.__enter__.return_value = mock_response
+        umask = os.umask(0o022)
+
+        try:
+            with patch("requests.get", return_value=mock_response):
+                client.token = "test_token"
+                assert client.export_to_file(str(output_file)) is True
+        finally:
+            os.umask(umask)
+
+        assert output_file.stat().st_mode & 0o777 == 0o644
+
+    def test_export_to_file_login(self, client, tmp_path):
+        """Тест входа по паролю перед экспортом в файл"""
+        login_response = MagicMock()
+        login_response.status_code = 200
+        login_response.json.return_value = {"access_token": "test_token", "token_type": "bearer"}
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"zones": []}']
+        mock_response.__enter__.return_value = mock_response
+
+        with patch("requests.post", return_value=login_response) as mock_post, \
+             patch("requests.get", return_value=mock_response) as mock_get:
+            assert client.export_to_file(str(tmp_path / "backup.json")) is True
+
+            assert mock_post.call_args.args[0] == "http://test-api.example.com/token"
+            assert mock_get.call_args.kwargs["headers"]["Authorization"] == "Bearer test_token"
+
+    def test_export_to_file_interrupted(self, client, tmp_path):
+        """Тест сохранения предыдущей выгрузки при обрыве экспорта"""
+        output_file = tmp_path / "backup.json"
+        output_file.write_bytes(b'{"zones": []}')
+
+        def chunks(chunk_size):
+            yield b'{"zones": ['
+            raise ConnectionError("соединение разорвано")
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.side_effect = chunks
+        mock_response.__enter__.return_value = mock_response
+
+        with patch("requests.get", return_value=mock_response):
+            client.token = "test_token"
+            assert client.export_to_file(str(output_file)) is False
+
+        assert output_file.read_bytes() == b'{"zones": []}'
+        assert os.listdir(tmp_path) == ["backup.json"]
+
+    def test_export_to_file_error(self, client):
+        """Тест ошибки сервера при экспорте в файл"""
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_response.__enter__.return_value = mock_response
+
+        with patch("requests.get", return_value=mock_response):
+            client.token = "test_token"
+            assert client.export_to_file("backup.json") is False
+
     def test_export_to_json(self, client):
         """Тест экспорта данных в JSON-файл"""
         # Создаем тестовые зоны для экспорта